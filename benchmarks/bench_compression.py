@@ -0,0 +1,109 @@
+"""
+Compare archive compression throughput of the codecs and worker counts supported by grafana_backup.compression.
+
+Usage:
+    bench_compression.py [--source=<dir>] [--size-mb=<mb>] [--threads=<list>] [--level=<level>]
+
+Options:
+    --source=<dir>      Directory to archive, e.g. an unarchived backup created with 'save --no-archive'
+                        (default: a generated tree of dashboard JSON files)
+    --size-mb=<mb>      Size of the generated dashboard tree in MB [default: 200]
+    --threads=<list>    Comma separated worker counts for the parallel gzip and zstd runs [default: 1,2,4,8,16]
+    --level=<level>     Compression level, the codec's default level when not set
+"""
+from grafana_backup.compression import open_archive_writer
+from docopt import docopt
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+
+def generate_dashboards(folder_path, size_mb):
+    # Dashboard JSON is highly repetitive: many panels which only differ in titles, queries and grid positions
+    random.seed(42)
+    written = 0
+    dashboard_number = 0
+    while written < size_mb * 1024 * 1024:
+        panels = [{
+            'id': panel_id,
+            'type': random.choice(['timeseries', 'stat', 'table', 'gauge']),
+            'title': 'Panel {0} of dashboard {1}'.format(panel_id, dashboard_number),
+            'gridPos': {'h': 8, 'w': 12, 'x': (panel_id % 2) * 12, 'y': panel_id * 8},
+            'datasource': {'type': 'prometheus', 'uid': 'prometheus'},
+            'targets': [{'expr': 'sum(rate(http_requests_total{{job="job-{0}", code=~"5.."}}[5m])) by (instance)'.format(random.randint(0, 500)),
+                         'refId': 'A'}],
+            'fieldConfig': {'defaults': {'unit': 'reqps', 'thresholds': {'mode': 'absolute', 'steps': [{'color': 'green', 'value': None}]}}},
+        } for panel_id in range(random.randint(5, 60))]
+        content = json.dumps({'dashboard': {'uid': 'uid{0}'.format(dashboard_number), 'title': 'Dashboard {0}'.format(dashboard_number),
+                                            'panels': panels}, 'meta': {'folderUid': 'folder'}})
+        with open(os.path.join(folder_path, 'uid{0}.dashboard'.format(dashboard_number)), 'w') as f:
+            f.write(content)
+        written += len(content)
+        dashboard_number += 1
+    return written
+
+
+def get_tree_size(folder_path):
+    return sum(os.path.getsize(os.path.join(root, name)) for (root, dirnames, filenames) in os.walk(folder_path) for name in filenames)
+
+
+def run(source, codec, level, threads):
+    archive_dir = tempfile.mkdtemp()
+    settings = {
+        'ARCHIVE_CODEC': codec,
+        'ARCHIVE_COMPRESSION_LEVEL': level,
+        'ARCHIVE_COMPRESSION_THREADS': threads,
+    }
+    archive_file = os.path.join(archive_dir, 'benchmark')
+    start = time.time()
+    with open_archive_writer(archive_file, settings) as tar:
+        tar.add(source, arcname='benchmark')
+    elapsed = time.time() - start
+    archive_size = os.path.getsize(archive_file)
+    shutil.rmtree(archive_dir)
+    return (elapsed, archive_size)
+
+
+def main():
+    args = docopt(__doc__)
+    level = int(args['--level']) if args['--level'] else None
+    threads_list = [int(threads) for threads in args['--threads'].split(',')]
+
+    generated_dir = None
+    source = args['--source']
+    if not source:
+        generated_dir = tempfile.mkdtemp()
+        print('generating {0} MB of dashboard JSON in {1}'.format(args['--size-mb'], generated_dir))
+        generate_dashboards(generated_dir, int(args['--size-mb']))
+        source = generated_dir
+
+    source_size = get_tree_size(source)
+    print('source: {0} ({1:.1f} MB)\n'.format(source, source_size / 1024.0 / 1024.0))
+    print('{0:<28}{1:>10}{2:>12}{3:>12}{4:>10}'.format('codec', 'seconds', 'MB/s', 'size MB', 'ratio'))
+
+    # threads=1 for gzip is the tarfile 'w:gz' path used before parallel compression
+    runs = [('gzip (tarfile)', 'gzip', 1)]
+    runs += [('gzip parallel x{0}'.format(threads), 'gzip', threads) for threads in threads_list if threads > 1]
+    try:
+        import zstandard  # noqa: F401
+        runs += [('zstd x{0}'.format(threads), 'zstd', threads) for threads in threads_list]
+    except ImportError:
+        print('zstandard is not installed, skipping zstd')
+
+    baseline = None
+    for (name, codec, threads) in runs:
+        (elapsed, archive_size) = run(source, codec, level, threads)
+        baseline = baseline or elapsed
+        print('{0:<28}{1:>10.2f}{2:>12.1f}{3:>12.1f}{4:>10.2f}   x{5:.1f} vs tarfile'.format(
+            name, elapsed, source_size / elapsed / 1024.0 / 1024.0, archive_size / 1024.0 / 1024.0,
+            float(source_size) / archive_size, baseline / elapsed))
+
+    if generated_dir:
+        shutil.rmtree(generated_dir)
+
+
+if __name__ == '__main__':
+    main()
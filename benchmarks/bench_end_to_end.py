@@ -0,0 +1,139 @@
+"""
+Measure save, archive, upload and restore end to end against a local fake Grafana (benchmarks/fake_grafana.py).
+
+Every stage runs the real command code with a generated config: save fetches the objects into loose files,
+archive packs them, upload sends the archive to the S3 stand-in of the fake server and restore creates the
+archived objects again. Run it before and after a change to save_dashboards, archive or restore.
+
+Usage:
+    bench_end_to_end.py [--dashboards=<count>] [--versions=<count>] [--panels=<count>] [--folders=<count>]
+                        [--latency-ms=<ms>] [--components=<>] [--codec=<codec>] [--repeat=<count>] [--verbose]
+
+Options:
+    --dashboards=<count>    Number of dashboards served by the fake Grafana [default: 200]
+    --versions=<count>      Versions per dashboard [default: 3]
+    --panels=<count>        Panels per dashboard, sets the payload size [default: 20]
+    --folders=<count>       Number of folders [default: 10]
+    --latency-ms=<ms>       Latency added to every response of the fake Grafana [default: 0]
+    --components=<>         Components saved, the ones restore supports are restored
+                            [default: folder,dashboard,dashboard-version,datasource]
+    --codec=<codec>         Archive codec [default: gzip]
+    --repeat=<count>        Number of runs, the fastest run of every stage is reported [default: 1]
+    --verbose               Show the output of the commands
+"""
+from fake_grafana import FakeGrafana, get_fixtures
+from grafana_backup.grafanaSettings import main as conf
+from grafana_backup.save import main as save
+from grafana_backup.archive import main as archive, get_archive_file
+from grafana_backup.restore import main as restore
+from grafana_backup.report import get_report
+from docopt import docopt
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+
+# Components restore can create on the fake Grafana
+RESTORE_COMPONENTS = ('folder', 'dashboard', 'datasource')
+BUCKET_NAME = 'grafana-backup'
+
+
+def get_settings(grafana_url, backup_dir, codec):
+    # A generated config file, so the benchmark goes through the same settings code as the cli
+    config = {
+        'general': {'debug': False, 'backup_dir': backup_dir, 'archive_codec': codec, 'run_report': False, 'http_retries': 0},
+        'grafana': {'url': grafana_url, 'token': 'benchmark'},
+        'aws': {'s3_bucket_name': BUCKET_NAME, 's3_bucket_key': 'backups', 'default_region': 'us-east-1',
+                'access_key_id': 'benchmark', 'secret_access_key': 'benchmark', 'endpoint_url': grafana_url},
+    }
+    config_file = os.path.join(backup_dir, 'grafanaSettings.json')
+    with open(config_file, 'w') as f:
+        json.dump(config, f)
+    return conf(config_file)
+
+
+@contextlib.contextmanager
+def quiet(verbose):
+    if verbose:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def timed(function, *function_args):
+    start = time.time()
+    function(*function_args)
+    return time.time() - start
+
+
+def run(grafana, args):
+    backup_dir = tempfile.mkdtemp()
+    settings = get_settings(grafana.url, backup_dir, args['--codec'])
+    verbose = args['--verbose']
+    components = args['--components']
+    restore_components = ','.join(component for component in components.split(',') if component in RESTORE_COMPONENTS)
+    stages = []
+    try:
+        with quiet(verbose):
+            seconds = timed(save, {'--components': components, '--no-archive': True}, settings)
+        # Saved objects and their bytes from the run report, log files and the archive index are not objects
+        components = get_report()['components'].values()
+        saved_items = sum(stats.get('saved', 0) for stats in components)
+        saved_size = sum(stats['bytes_written'] for stats in components)
+        stages.append(('save', seconds, saved_items, saved_size))
+
+        with quiet(verbose):
+            seconds = timed(archive, {}, settings)
+        archive_file = get_archive_file(settings)
+        archive_size = os.path.getsize(archive_file)
+        stages.append(('archive', seconds, saved_items, saved_size))
+
+        # The cloud SDK is imported here like save does, its import time is not part of the upload
+        from grafana_backup.s3_upload import main as s3_upload
+        with quiet(verbose):
+            seconds = timed(s3_upload, {}, settings)
+        stages.append(('upload (s3 stand-in)', seconds, 1, archive_size))
+
+        # Restore reads the local archive, with a bucket configured it would download it first
+        restore_settings = dict(settings, AWS_S3_BUCKET_NAME='')
+        created_before = sum(grafana.created.values())
+        with quiet(verbose):
+            seconds = timed(restore, {'<archive_file>': archive_file, '--components': restore_components}, restore_settings)
+        stages.append(('restore', seconds, sum(grafana.created.values()) - created_before, saved_size))
+    finally:
+        shutil.rmtree(backup_dir)
+    return (stages, archive_size)
+
+
+def main():
+    args = docopt(__doc__)
+    grafana = FakeGrafana(get_fixtures(args), latency=float(args['--latency-ms']) / 1000.0)
+    grafana.start()
+    print('fake Grafana on {0}: {1} dashboards x {2} versions, {3} panels each, {4} ms latency'.format(
+        grafana.url, args['--dashboards'], args['--versions'], args['--panels'], args['--latency-ms']))
+
+    best = {}
+    archive_size = 0
+    try:
+        for _ in range(int(args['--repeat'])):
+            (stages, archive_size) = run(grafana, args)
+            for (name, seconds, items, size) in stages:
+                if name not in best or seconds < best[name][0]:
+                    best[name] = (seconds, items, size)
+    finally:
+        grafana.stop()
+
+    print('\n{0:<24}{1:>10}{2:>10}{3:>12}{4:>10}{5:>10}'.format('stage', 'seconds', 'items', 'items/s', 'MB', 'MB/s'))
+    for (name, (seconds, items, size)) in best.items():
+        print('{0:<24}{1:>10.2f}{2:>10}{3:>12.1f}{4:>10.1f}{5:>10.1f}'.format(
+            name, seconds, items, items / seconds, size / 1024.0 / 1024.0, size / seconds / 1024.0 / 1024.0))
+    print('\narchive: {0:.1f} MB ({1}), requests served: {2}'.format(
+        archive_size / 1024.0 / 1024.0, args['--codec'], sum(grafana.requests.values())))
+
+
+if __name__ == '__main__':
+    main()
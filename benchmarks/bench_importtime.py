@@ -0,0 +1,70 @@
+"""
+Measure the startup imports of the grafana-backup cli with 'python -X importtime'.
+
+Usage:
+    bench_importtime.py [--repeat=<count>] [--top=<count>] [--max-ms=<ms>] [--check]
+
+Options:
+    --repeat=<count>    Number of interpreter starts, the fastest one is reported [default: 5]
+    --top=<count>       Number of slowest imports listed [default: 15]
+    --max-ms=<ms>       Fail when importing the cli takes longer than this many milliseconds
+    --check             Fail when a cloud SDK is imported at startup, they must only be loaded when configured
+"""
+from docopt import docopt
+import os
+import subprocess
+import sys
+
+# The cli imports every command, docopt parses an empty command line
+IMPORT_STATEMENT = "import sys; sys.argv = ['grafana-backup']; import grafana_backup.cli"
+# Top level packages of the storage and metrics SDKs used by the upload and download modules
+LAZY_PACKAGES = ('boto3', 'botocore', 'azure', 'google', 'influxdb')
+
+
+def measure_imports():
+    # Runs from the repository root so the checked out package is imported, not an installed one
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', IMPORT_STATEMENT], cwd=root,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if process.returncode != 0:
+        raise Exception('importing the cli failed:\n{0}'.format(process.stderr))
+
+    imports = []
+    for line in process.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        (self_time, cumulative_time, name) = line[len('import time:'):].split('|')
+        imports.append((name.strip(), int(self_time), int(cumulative_time), len(name) - len(name.lstrip())))
+    return imports
+
+
+def main():
+    args = docopt(__doc__)
+    runs = [measure_imports() for _ in range(int(args['--repeat']))]
+    # Cumulative time of the first level imports of the fastest start, the cli itself is one of them
+    imports = min(runs, key=lambda run: sum(cumulative for (name, own, cumulative, depth) in run if depth == 1))
+    cli_ms = [cumulative for (name, own, cumulative, depth) in imports if name == 'grafana_backup.cli'][0] / 1000.0
+    total_ms = sum(cumulative for (name, own, cumulative, depth) in imports if depth == 1) / 1000.0
+
+    print('{0:<60}{1:>12}{2:>14}'.format('module', 'self ms', 'cumulative ms'))
+    for (name, own, cumulative, depth) in sorted(imports, key=lambda entry: -entry[2])[:int(args['--top'])]:
+        print('{0:<60}{1:>12.1f}{2:>14.1f}'.format(name, own / 1000.0, cumulative / 1000.0))
+    print('\nimport grafana_backup.cli: {0:.1f} ms, all startup imports: {1:.1f} ms ({2} modules)'.format(
+        cli_ms, total_ms, len(imports)))
+
+    failed = False
+    if args['--check']:
+        eager = sorted(set(name.split('.')[0] for (name, own, cumulative, depth) in imports) & set(LAZY_PACKAGES))
+        if eager:
+            print('[ERROR] imported at startup: {0}'.format(', '.join(eager)))
+            failed = True
+    if args['--max-ms'] and cli_ms > float(args['--max-ms']):
+        print('[ERROR] importing the cli takes {0:.1f} ms, more than {1} ms'.format(cli_ms, args['--max-ms']))
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Compare the json backends of grafana_backup.serializer on a corpus of dashboards.
+
+Usage:
+    bench_json.py [--source=<dir>] [--size-mb=<mb>] [--repeat=<count>]
+
+Options:
+    --source=<dir>      Directory with saved objects, e.g. an unarchived backup created with 'save --no-archive'
+                        (default: a generated tree of dashboard JSON files)
+    --size-mb=<mb>      Size of the generated dashboard tree in MB [default: 20]
+    --repeat=<count>    Number of passes over the corpus per backend [default: 3]
+"""
+from grafana_backup.serializer import JSON_BACKENDS, set_json_backend, dumps_json, loads_json
+from bench_compression import generate_dashboards
+from docopt import docopt
+import json
+import os
+import shutil
+import tempfile
+import time
+
+
+def load_corpus(folder_path):
+    corpus = []
+    for (root, dirnames, filenames) in os.walk(folder_path):
+        for name in filenames:
+            if name.endswith('.txt') or name.endswith('.journal'):
+                continue
+            with open(os.path.join(root, name), 'r') as f:
+                corpus.append(f.read())
+    return corpus
+
+
+def run(corpus, objects, repeat):
+    timings = {}
+    start = time.time()
+    for _ in range(repeat):
+        for data in corpus:
+            loads_json(data)
+    timings['loads'] = (time.time() - start) / repeat
+
+    for (name, pretty_print) in (('dumps pretty', True), ('dumps compact', False)):
+        start = time.time()
+        for _ in range(repeat):
+            for data in objects:
+                dumps_json(data, pretty_print)
+        timings[name] = (time.time() - start) / repeat
+    return timings
+
+
+def main():
+    args = docopt(__doc__)
+    repeat = int(args['--repeat'])
+
+    generated_dir = None
+    source = args['--source']
+    if not source:
+        generated_dir = tempfile.mkdtemp()
+        print('generating {0} MB of dashboard JSON in {1}'.format(args['--size-mb'], generated_dir))
+        generate_dashboards(generated_dir, int(args['--size-mb']))
+        source = generated_dir
+
+    corpus = load_corpus(source)
+    objects = [json.loads(data) for data in corpus]
+    corpus_size = sum(len(data) for data in corpus)
+    print('corpus: {0} objects ({1:.1f} MB)\n'.format(len(corpus), corpus_size / 1024.0 / 1024.0))
+    print('{0:<10}{1:>14}{2:>16}{3:>17}   {4}'.format('backend', 'loads MB/s', 'dumps pretty', 'dumps compact', 'output'))
+
+    # Save writes pretty printed or compact output, every backend has to produce exactly the stdlib bytes
+    expected = [(json.dumps(data, sort_keys=True, indent=4, separators=(',', ': ')), json.dumps(data)) for data in objects]
+    for backend_name in JSON_BACKENDS:
+        try:
+            set_json_backend(backend_name)
+        except Exception as e:
+            print('{0:<10}skipped: {1}'.format(backend_name, e))
+            continue
+        identical = all((dumps_json(data, True), dumps_json(data)) == contents for (data, contents) in zip(objects, expected))
+        timings = run(corpus, objects, repeat)
+        print('{0:<10}{1:>14.1f}{2:>16.1f}{3:>17.1f}   {4}'.format(
+            backend_name, *[corpus_size / timings[name] / 1024.0 / 1024.0 for name in ('loads', 'dumps pretty', 'dumps compact')],
+            'identical' if identical else 'DIFFERENT'))
+
+    if generated_dir:
+        shutil.rmtree(generated_dir)
+
+
+if __name__ == '__main__':
+    main()
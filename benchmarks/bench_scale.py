@@ -0,0 +1,88 @@
+"""
+Measure time and peak memory of save and restore as the number of dashboards grows, against a fake Grafana
+serving synthetic fixtures (benchmarks/fixtures.py).
+
+Every command runs in a fresh process so its peak resident memory is its own, not the one of an earlier run or of
+the fake Grafana. Save writes the archive, restore reads it back. Compare the MB column between sizes to find
+the code that keeps every object in memory.
+
+Usage:
+    bench_scale.py [--dashboards=<counts>] [--versions=<count>] [--panels=<count>] [--folders=<count>]
+                   [--folder-depth=<depth>] [--components=<>] [--codec=<codec>] [--verbose]
+
+Options:
+    --dashboards=<counts>       Comma separated numbers of dashboards [default: 1000,10000]
+    --versions=<count>          Versions per dashboard [default: 1]
+    --panels=<count>            Panels per dashboard, sets the payload size [default: 20]
+    --folders=<count>           Number of folders [default: 100]
+    --folder-depth=<depth>      Folders are nested in chains of this many levels [default: 1]
+    --components=<>             Components saved, the ones restore supports are restored
+                                [default: folder,dashboard,dashboard-version,datasource]
+    --codec=<codec>             Archive codec [default: gzip]
+    --verbose                   Show the output of the commands
+"""
+from fake_grafana import FakeGrafana, get_fixtures
+from generate_fixtures import get_settings
+from grafana_backup.save import main as save
+from grafana_backup.restore import main as restore
+from grafana_backup.archive import get_archive_file
+from docopt import docopt
+import contextlib
+import io
+import multiprocessing
+import resource
+import shutil
+import tempfile
+import time
+
+# Components restore can create on the fake Grafana
+RESTORE_COMPONENTS = ('folder', 'dashboard', 'datasource')
+
+
+def run_command(queue, command, command_args, settings, verbose):
+    # Runs in a spawned process: wall time and peak resident memory of one command
+    function = {'save': save, 'restore': restore}[command]
+    start = time.time()
+    with contextlib.ExitStack() as stack:
+        if not verbose:
+            stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+        function(command_args, settings)
+    # ru_maxrss is in kilobytes on Linux
+    queue.put((time.time() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0))
+
+
+def measure(context, command, command_args, settings, verbose):
+    queue = context.Queue()
+    process = context.Process(target=run_command, args=(queue, command, command_args, settings, verbose))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    args = docopt(__doc__)
+    context = multiprocessing.get_context('spawn')
+    components = args['--components']
+    restore_components = ','.join(component for component in components.split(',') if component in RESTORE_COMPONENTS)
+
+    print('{0:>10}{1:>10}{2:>10}{3:>12}{4:>10}'.format('dashboards', 'command', 'seconds', 'items/s', 'peak MB'))
+    for dashboards in args['--dashboards'].split(','):
+        grafana = FakeGrafana(get_fixtures(dict(args, **{'--dashboards': dashboards})))
+        grafana.start()
+        backup_dir = tempfile.mkdtemp()
+        try:
+            settings = get_settings(grafana.url, backup_dir, args['--codec'], grafana.fixtures)
+            (seconds, peak) = measure(context, 'save', {'--components': components}, settings, args['--verbose'])
+            print('{0:>10}{1:>10}{2:>10.2f}{3:>12.1f}{4:>10.1f}'.format(dashboards, 'save', seconds, int(dashboards) / seconds, peak))
+
+            restore_args = {'<archive_file>': get_archive_file(settings), '--components': restore_components}
+            (seconds, peak) = measure(context, 'restore', restore_args, settings, args['--verbose'])
+            print('{0:>10}{1:>10}{2:>10.2f}{3:>12.1f}{4:>10.1f}'.format(dashboards, 'restore', seconds, int(dashboards) / seconds, peak))
+        finally:
+            grafana.stop()
+            shutil.rmtree(backup_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,341 @@
+"""
+A local stand-in for the Grafana HTTP API and an S3 bucket, used by the benchmarks.
+
+It serves the state generated by benchmarks/fixtures.py on the endpoints grafana-backup calls to save folders,
+dashboards, dashboard versions, datasources, users, teams, team members, alert rules and annotations, accepts the
+objects restore creates and stores the archives uploaded with the S3 API.
+Small instances are rendered once at startup so the server adds no serialization cost of its own to the
+measurement, large ones are rendered on every request to keep the memory of the server flat.
+
+Used as a module:
+    grafana = FakeGrafana(Fixtures(dashboards=500, versions=3, panels=20, folders=10), latency=0.005)
+    url = grafana.start()
+    ...
+    grafana.stop()
+
+Faults are injected per endpoint template, the next requests to it get these answers (None serves the request)
+before it is served again:
+    grafana.add_faults('POST', '/api/dashboards/db', 503, None, STALL)
+
+Usage:
+    fake_grafana.py [--port=<port>] [--dashboards=<count>] [--versions=<count>] [--panels=<count>]
+                    [--folders=<count>] [--folder-depth=<depth>] [--datasources=<count>] [--users=<count>]
+                    [--teams=<count>] [--team-members=<count>] [--alert-rules=<count>] [--annotations=<count>]
+                    [--latency-ms=<ms>]
+
+Options:
+    --port=<port>               Port to listen on, 0 picks a free port [default: 3000]
+    --dashboards=<count>        Number of dashboards [default: 200]
+    --versions=<count>          Versions per dashboard [default: 3]
+    --panels=<count>            Panels per dashboard, sets the payload size (about 900 bytes per panel) [default: 20]
+    --folders=<count>           Number of folders the dashboards are spread over [default: 10]
+    --folder-depth=<depth>      Folders are nested in chains of this many levels [default: 1]
+    --datasources=<count>       Number of datasources [default: 5]
+    --users=<count>             Number of users [default: 0]
+    --teams=<count>             Number of teams [default: 0]
+    --team-members=<count>      Members per team, picked from the users [default: 5]
+    --alert-rules=<count>       Number of alert rules [default: 0]
+    --annotations=<count>       Number of annotations over the last 12 months [default: 0]
+    --latency-ms=<ms>           Time every response is delayed by, like a remote Grafana [default: 0]
+"""
+from fixtures import Fixtures
+from docopt import docopt
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import collections
+import json
+import re
+import threading
+import time
+
+GRAFANA_VERSION = '10.4.0'
+# Dashboards are rendered once at startup up to this many panels in total
+PRERENDER_PANELS = 100000
+# Fault of a request which is never answered, the connection is closed after STALL_SECONDS
+STALL = 'stall'
+STALL_SECONDS = 2.0
+# Objects restore creates, by the path it posts them to
+CREATE_PATHS = (
+    (re.compile(r'^/api/folders$'), 'folder'),
+    (re.compile(r'^/api/folders/[^/]+/permissions$'), 'folder_permissions'),
+    (re.compile(r'^/api/dashboards/db$'), 'dashboard'),
+    (re.compile(r'^/api/datasources$'), 'datasource'),
+    (re.compile(r'^/api/admin/users$'), 'user'),
+    (re.compile(r'^/api/orgs/\d+/users$'), 'org_user'),
+    (re.compile(r'^/api/teams$'), 'team'),
+    (re.compile(r'^/api/teams/\d+/members$'), 'team_member'),
+    (re.compile(r'^/api/v1/provisioning/alert-rules$'), 'alert_rule'),
+    (re.compile(r'^/api/annotations$'), 'annotation'),
+)
+
+
+class FakeGrafana(object):
+
+    def __init__(self, fixtures=None, latency=0.0, port=0):
+        self.fixtures = fixtures or Fixtures()
+        self.latency = latency
+        self.port = port
+        self.server = None
+        self.url = None
+        self.lock = threading.Lock()
+        # (method, path template) -> count of the requests served
+        self.requests = collections.Counter()
+        # Objects created by restore by kind, and the archives uploaded to the bucket
+        self.created = collections.Counter()
+        # X-Grafana-Org-Id of the requests which change the fake Grafana, None without the header
+        self.write_orgs = collections.Counter()
+        self.uploads = {}
+        # (method, path template) -> statuses or STALL answered instead of serving the next requests, None serves one
+        self.faults = collections.defaultdict(collections.deque)
+
+        self.dashboard_payloads = None
+        if self.fixtures.dashboard_count * self.fixtures.panel_count <= PRERENDER_PANELS:
+            self.dashboard_payloads = [encode(self.fixtures.dashboard(number)) for number in range(self.fixtures.dashboard_count)]
+
+    def start(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', self.port), FakeGrafanaRequestHandler)
+        self.server.daemon_threads = True
+        self.server.grafana = self
+        thread = threading.Thread(target=self.server.serve_forever, name='fake-grafana')
+        thread.daemon = True
+        thread.start()
+        self.url = 'http://127.0.0.1:{0}'.format(self.server.server_port)
+        return self.url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, counter, key):
+        with self.lock:
+            counter[key] += 1
+
+    def add_faults(self, method, path, *faults):
+        with self.lock:
+            self.faults[(method, path)].extend(faults)
+
+    def pop_fault(self, key):
+        with self.lock:
+            faults = self.faults.get(key)
+            return faults.popleft() if faults else None
+
+    def get_dashboard_payload(self, number):
+        if self.dashboard_payloads is not None:
+            return self.dashboard_payloads[number]
+        return encode(self.fixtures.dashboard(number))
+
+    def search(self, query):
+        fixtures = self.fixtures
+        limit = int(query.get('limit', ['1000'])[0])
+        page = int(query.get('page', ['1'])[0])
+        if query.get('type') == ['dash-folder']:
+            numbers = range((page - 1) * limit, min(page * limit, fixtures.folder_count))
+            return [dict(fixtures.folder(number), type='dash-folder') for number in numbers]
+        if not (query.get('folderUIDs') or query.get('dashboardUIDs') or query.get('tag')):
+            # Only the requested page is generated
+            numbers = range((page - 1) * limit, min(page * limit, fixtures.dashboard_count))
+            return [fixtures.search_hit(number) for number in numbers]
+        hits = [fixtures.search_hit(number) for number in range(fixtures.dashboard_count)]
+        if query.get('folderUIDs'):
+            hits = [hit for hit in hits if hit['folderUid'] in query['folderUIDs'][0].split(',')]
+        if query.get('dashboardUIDs'):
+            hits = [hit for hit in hits if hit['uid'] in query['dashboardUIDs'][0].split(',')]
+        for tag in query.get('tag', []):
+            hits = [hit for hit in hits if tag in hit['tags']]
+        return hits[(page - 1) * limit:page * limit]
+
+
+def encode(data):
+    return json.dumps(data).encode('utf8')
+
+
+def get_number(value, prefix, count, offset=0):
+    # Fixture number of 'dashboard12' for uids or of an id, ids start at offset; None when it does not exist
+    if not value.startswith(prefix) or not value[len(prefix):].isdigit():
+        return None
+    number = int(value[len(prefix):]) - offset
+    return number if 0 <= number < count else None
+
+
+class FakeGrafanaRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive like Grafana, the benchmarks measure pooled connections
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes, with Nagle's algorithm every response would wait for a delayed ack
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body, content_type='application/json', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for (name, value) in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, data):
+        self.send_body(status, encode(data))
+
+    def read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                if size == 0:
+                    # Trailers end with an empty line
+                    while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    return b''.join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+    def handle_request(self, method):
+        grafana = self.server.grafana
+        if grafana.latency:
+            time.sleep(grafana.latency)
+        url = urlparse(self.path)
+        path = url.path.rstrip('/') or '/'
+        body = self.read_body() if method in ('POST', 'PUT', 'PATCH') else b''
+        if not path.startswith('/api/'):
+            return self.handle_bucket(method, path, body)
+
+        # Ids, uids and version numbers are counted under one template
+        key = (method, re.sub(r'/[a-z]*\d+(?=/|$)', '/{id}', path))
+        grafana.count(grafana.requests, key)
+        fault = grafana.pop_fault(key)
+        if fault == STALL:
+            time.sleep(STALL_SECONDS)
+            self.close_connection = True
+            return
+        if fault:
+            return self.send_json(fault, {'message': 'injected fault'})
+        if method != 'GET':
+            grafana.count(grafana.write_orgs, self.headers.get('X-Grafana-Org-Id'))
+        if method == 'GET':
+            return self.handle_get(grafana, path, parse_qs(url.query))
+        if method == 'POST':
+            kind = next((kind for (pattern, kind) in CREATE_PATHS if pattern.match(path)), None)
+            if kind:
+                grafana.count(grafana.created, kind)
+                return self.send_json(200, {'status': 'success', 'message': '{0} created'.format(kind), 'id': 1})
+        if method in ('PUT', 'PATCH'):
+            # Updates, like the alert rules restore replaces
+            return self.send_json(200, {'status': 'success', 'message': 'updated'})
+        if method == 'DELETE':
+            # Deletes of 'restore --apply-plan', the served state stays the same
+            return self.send_json(200, {'message': 'deleted'})
+        self.send_json(404, {'message': 'Not found'})
+
+    def handle_get(self, grafana, path, query):
+        fixtures = grafana.fixtures
+        if path == '/api/health':
+            return self.send_json(200, {'commit': 'fake', 'database': 'ok', 'version': GRAFANA_VERSION})
+        if path == '/api/auth/keys':
+            return self.send_json(200, [])
+        if path == '/api/search':
+            return self.send_json(200, grafana.search(query))
+        if path == '/api/datasources':
+            return self.send_json(200, [fixtures.datasource(number) for number in range(fixtures.datasource_count)])
+        if path == '/api/library-elements':
+            return self.send_json(200, {'result': {'totalCount': 0, 'elements': [], 'page': 1, 'perPage': 5000}})
+        if path == '/api/orgs':
+            return self.send_json(200, [fixtures.org(number) for number in range(fixtures.org_count)])
+        if path == '/api/users':
+            limit = int(query.get('perpage', ['1000'])[0])
+            page = int(query.get('page', ['1'])[0])
+            numbers = range((page - 1) * limit, min(page * limit, fixtures.user_count))
+            return self.send_json(200, [fixtures.user(number) for number in numbers])
+        if path == '/api/teams/search':
+            teams = [fixtures.team(number) for number in range(fixtures.team_count)]
+            return self.send_json(200, {'totalCount': len(teams), 'teams': teams, 'page': 1, 'perPage': len(teams)})
+        if path == '/api/v1/provisioning/alert-rules':
+            return self.send_json(200, [fixtures.alert_rule(number) for number in range(fixtures.alert_rule_count)])
+        if path == '/api/annotations':
+            return self.send_json(200, fixtures.annotations_between(int(query.get('from', ['0'])[0]),
+                                                                    int(query.get('to', [str(fixtures.created)])[0]),
+                                                                    int(query.get('limit', ['100'])[0])))
+
+        parts = path.split('/')[2:]
+        if parts[:2] == ['dashboards', 'uid'] and len(parts) == 3:
+            number = get_number(parts[2], 'dashboard', fixtures.dashboard_count)
+            if number is not None:
+                return self.send_body(200, grafana.get_dashboard_payload(number))
+        elif parts[:2] == ['dashboards', 'id'] and len(parts) in (4, 5) and parts[3] == 'versions':
+            number = get_number(parts[2], '', fixtures.dashboard_count, offset=1)
+            if number is not None and len(parts) == 4:
+                return self.send_json(200, fixtures.versions(number))
+            if number is not None and parts[4].isdigit() and 0 < int(parts[4]) <= fixtures.version_count:
+                return self.send_json(200, fixtures.version(number, int(parts[4])))
+        elif parts[0] == 'folders' and len(parts) in (2, 3):
+            number = get_number(parts[1], 'folder', fixtures.folder_count)
+            if number is not None and len(parts) == 2:
+                return self.send_json(200, fixtures.folder(number))
+            if number is not None and parts[2] == 'permissions':
+                return self.send_json(200, fixtures.folder_permissions(number))
+        elif parts[0] == 'users' and len(parts) in (2, 3):
+            number = get_number(parts[1], '', fixtures.user_count, offset=2)
+            if number is not None and len(parts) == 2:
+                return self.send_json(200, fixtures.user(number))
+            if number is not None and parts[2] == 'orgs':
+                return self.send_json(200, fixtures.user_orgs(number))
+        elif parts[0] == 'teams' and len(parts) == 3 and parts[2] == 'members':
+            number = get_number(parts[1], '', fixtures.team_count, offset=1)
+            if number is not None:
+                return self.send_json(200, fixtures.team_members(number))
+        elif parts[:3] == ['v1', 'provisioning', 'alert-rules'] and len(parts) == 4:
+            number = get_number(parts[3], 'alertrule', fixtures.alert_rule_count)
+            if number is not None:
+                return self.send_json(200, fixtures.alert_rule(number))
+        self.send_json(404, {'message': 'Not found'})
+
+    def handle_bucket(self, method, path, body):
+        # Path style S3 requests: PUT and GET /<bucket>/<key>
+        grafana = self.server.grafana
+        if method == 'PUT':
+            grafana.uploads[path] = body
+            return self.send_body(200, b'', headers={'ETag': '"fake"'})
+        if method == 'GET' and path in grafana.uploads:
+            return self.send_body(200, grafana.uploads[path], content_type='application/octet-stream')
+        self.send_body(404, b'<Error><Code>NoSuchKey</Code></Error>', content_type='application/xml')
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def do_PUT(self):
+        self.handle_request('PUT')
+
+    def do_PATCH(self):
+        self.handle_request('PATCH')
+
+    def do_DELETE(self):
+        self.handle_request('DELETE')
+
+
+def get_fixtures(args):
+    # Fixtures from the count options the benchmark scripts share, the ones a script does not have keep their default
+    options = (('--dashboards', 'dashboards'), ('--versions', 'versions'), ('--panels', 'panels'), ('--folders', 'folders'),
+               ('--folder-depth', 'folder_depth'), ('--datasources', 'datasources'), ('--users', 'users'),
+               ('--teams', 'teams'), ('--team-members', 'team_members'), ('--alert-rules', 'alert_rules'),
+               ('--annotations', 'annotations'))
+    return Fixtures(**dict((name, int(args[option])) for (option, name) in options if args.get(option) is not None))
+
+
+def main():
+    args = docopt(__doc__)
+    grafana = FakeGrafana(get_fixtures(args), latency=float(args['--latency-ms']) / 1000.0, port=int(args['--port']))
+    print('fake Grafana listening on {0}, press ctrl+c to stop'.format(grafana.start()))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        grafana.stop()
+
+
+if __name__ == '__main__':
+    main()
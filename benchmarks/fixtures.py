@@ -0,0 +1,205 @@
+"""
+Synthetic Grafana state for scale tests: nested folders, dashboards with heavy panel JSON and their versions,
+datasources, users, teams and their members, alert rules and annotations.
+
+Every object is generated on demand from its number with its own seeded random generator, so the same counts
+always give the same state and 100k dashboards take no memory until they are served.
+Served by benchmarks/fake_grafana.py, written to a backup archive by benchmarks/generate_fixtures.py.
+"""
+import random
+import time
+
+PANEL_TYPES = ('timeseries', 'stat', 'table', 'gauge', 'barchart', 'heatmap', 'logs', 'text')
+ROLES = ('Viewer', 'Editor', 'Admin')
+
+
+class Fixtures(object):
+
+    def __init__(self, dashboards=200, versions=3, panels=20, folders=10, folder_depth=1, datasources=5, users=0, teams=0,
+                 team_members=5, alert_rules=0, annotations=0, orgs=1, seed=42):
+        self.dashboard_count = dashboards
+        self.version_count = versions
+        self.panel_count = panels
+        self.folder_count = folders
+        # Folders are nested in chains of folder_depth levels, dashboards are spread over all of them
+        self.folder_depth = max(1, folder_depth)
+        self.datasource_count = datasources
+        self.user_count = users
+        self.team_count = teams
+        self.team_member_count = min(team_members, users)
+        self.alert_rule_count = alert_rules
+        self.annotation_count = annotations
+        # Every organization serves the same objects
+        self.org_count = orgs
+        self.seed = seed
+        # Annotations are spread over the 12 months before the fixtures were created, save reads 13 months back
+        self.created = int(time.time() * 1000)
+        self.annotation_times = None
+
+    def get_random(self, kind, number):
+        return random.Random('{0}-{1}-{2}'.format(self.seed, kind, number))
+
+    def get_counts(self):
+        return {
+            'folders': self.folder_count,
+            'dashboards': self.dashboard_count,
+            'versions': self.dashboard_count * self.version_count,
+            'datasources': self.datasource_count,
+            'users': self.user_count,
+            'teams': self.team_count,
+            'team_members': self.team_count * self.team_member_count,
+            'alert_rules': self.alert_rule_count,
+            'annotations': self.annotation_count,
+        }
+
+    def folder(self, number):
+        level = number % self.folder_depth
+        folder = {
+            'id': number + 1,
+            'uid': 'folder{0}'.format(number),
+            'title': 'Folder {0}'.format(number),
+            'url': '/dashboards/f/folder{0}/folder-{0}'.format(number),
+            'version': 1,
+        }
+        if level:
+            folder['parentUid'] = 'folder{0}'.format(number - 1)
+        return folder
+
+    def folder_permissions(self, number):
+        return [{'role': role, 'permission': permission, 'permissionName': name, 'uid': 'folder{0}'.format(number)}
+                for (role, permission, name) in (('Viewer', 1, 'View'), ('Editor', 2, 'Edit'))]
+
+    def dashboard_folder(self, number):
+        return self.folder(number % self.folder_count) if self.folder_count else None
+
+    def dashboard_model(self, number, version=None):
+        generator = self.get_random('dashboard', number)
+        panels = []
+        for panel_id in range(self.panel_count):
+            panels.append({
+                'id': panel_id + 1,
+                'type': generator.choice(PANEL_TYPES),
+                'title': 'Panel {0} of dashboard {1}'.format(panel_id, number),
+                'gridPos': {'h': 8, 'w': 12, 'x': (panel_id % 2) * 12, 'y': (panel_id // 2) * 8},
+                'datasource': {'type': 'prometheus', 'uid': 'datasource{0}'.format(generator.randrange(max(1, self.datasource_count)))},
+                'targets': [{
+                    'expr': 'sum(rate(http_requests_total{{job="job-{0}", code=~"5.."}}[5m])) by (instance)'.format(generator.randint(0, 500)),
+                    'legendFormat': '{{instance}}',
+                    'refId': chr(ord('A') + target),
+                } for target in range(generator.randint(1, 3))],
+                'fieldConfig': {'defaults': {'unit': generator.choice(('reqps', 'short', 'percent', 'bytes', 's')), 'thresholds': {
+                    'mode': 'absolute', 'steps': [{'color': 'green', 'value': None}, {'color': 'red', 'value': generator.randint(50, 100)}]}},
+                    'overrides': []},
+                'options': {'legend': {'displayMode': 'list', 'placement': 'bottom'}, 'tooltip': {'mode': 'single'}},
+            })
+        return {
+            'id': number + 1,
+            'uid': 'dashboard{0}'.format(number),
+            'title': 'Dashboard {0}'.format(number),
+            'tags': ['team-{0}'.format(number % 5), 'scale-test'],
+            'timezone': 'browser',
+            'schemaVersion': 39,
+            'version': version or self.version_count or 1,
+            'templating': {'list': [{'name': 'instance', 'type': 'query', 'query': 'label_values(up, instance)'}]},
+            'panels': panels,
+        }
+
+    def dashboard_meta(self, number):
+        folder = self.dashboard_folder(number)
+        return {
+            'slug': 'dashboard-{0}'.format(number),
+            'url': '/d/dashboard{0}/dashboard-{0}'.format(number),
+            'folderId': folder['id'] if folder else 0,
+            'folderUid': folder['uid'] if folder else '',
+            'folderTitle': folder['title'] if folder else 'General',
+            'version': self.version_count or 1,
+        }
+
+    def dashboard(self, number):
+        return {'dashboard': self.dashboard_model(number), 'meta': self.dashboard_meta(number)}
+
+    def search_hit(self, number):
+        folder = self.dashboard_folder(number)
+        return {
+            'id': number + 1, 'uid': 'dashboard{0}'.format(number), 'title': 'Dashboard {0}'.format(number),
+            'uri': 'db/dashboard-{0}'.format(number), 'url': '/d/dashboard{0}/dashboard-{0}'.format(number), 'type': 'dash-db',
+            'tags': ['team-{0}'.format(number % 5), 'scale-test'],
+            'folderId': folder['id'] if folder else 0, 'folderUid': folder['uid'] if folder else '',
+            'folderTitle': folder['title'] if folder else '',
+        }
+
+    def versions(self, number):
+        return [{'id': (number + 1) * 1000 + version, 'dashboardId': number + 1, 'version': version, 'parentVersion': version - 1,
+                 'created': '2024-01-01T00:00:00Z', 'createdBy': 'admin', 'message': 'version {0}'.format(version)}
+                for version in range(self.version_count, 0, -1)]
+
+    def version(self, number, version):
+        return {'id': (number + 1) * 1000 + version, 'dashboardId': number + 1, 'version': version, 'parentVersion': version - 1,
+                'created': '2024-01-01T00:00:00Z', 'createdBy': 'admin', 'message': 'version {0}'.format(version),
+                'data': self.dashboard_model(number, version)}
+
+    def datasource(self, number):
+        return {'id': number + 1, 'uid': 'datasource{0}'.format(number), 'name': 'Prometheus {0}'.format(number), 'type': 'prometheus',
+                'access': 'proxy', 'url': 'http://prometheus-{0}:9090'.format(number), 'isDefault': number == 0, 'jsonData': {}}
+
+    def user(self, number):
+        return {'id': number + 2, 'name': 'User {0}'.format(number), 'login': 'user{0}'.format(number),
+                'email': 'user{0}@example.com'.format(number), 'isAdmin': False, 'isDisabled': False,
+                'lastSeenAt': '2024-01-01T00:00:00Z', 'authLabels': []}
+
+    def org(self, number):
+        return {'id': number + 1, 'name': 'Org {0}'.format(number) if number else 'Main Org.'}
+
+    def user_orgs(self, number):
+        return [{'orgId': 1, 'name': 'Main Org.', 'role': ROLES[number % len(ROLES)]}]
+
+    def team(self, number):
+        return {'id': number + 1, 'uid': 'team{0}'.format(number), 'orgId': 1, 'name': 'Team {0}'.format(number),
+                'email': 'team{0}@example.com'.format(number), 'memberCount': self.team_member_count, 'permission': 0}
+
+    def team_members(self, number):
+        generator = self.get_random('team', number)
+        members = sorted(generator.sample(range(self.user_count), self.team_member_count)) if self.user_count else []
+        return [dict(self.user(member), userId=member + 2, teamId=number + 1, orgId=1, permission=0) for member in members]
+
+    def alert_rule(self, number):
+        generator = self.get_random('alert_rule', number)
+        folder = self.dashboard_folder(number)
+        return {
+            'id': number + 1,
+            'uid': 'alertrule{0}'.format(number),
+            'orgID': 1,
+            'folderUID': folder['uid'] if folder else 'general',
+            'ruleGroup': 'group-{0}'.format(number % 10),
+            'title': 'Alert rule {0}'.format(number),
+            'condition': 'B',
+            'data': [
+                {'refId': 'A', 'relativeTimeRange': {'from': 600, 'to': 0}, 'datasourceUid': 'datasource0',
+                 'model': {'expr': 'rate(errors_total{{job="job-{0}"}}[5m])'.format(generator.randint(0, 500)), 'refId': 'A'}},
+                {'refId': 'B', 'datasourceUid': '__expr__',
+                 'model': {'type': 'threshold', 'expression': 'A', 'refId': 'B',
+                           'conditions': [{'evaluator': {'type': 'gt', 'params': [generator.randint(1, 100)]}}]}},
+            ],
+            'noDataState': 'NoData',
+            'execErrState': 'Error',
+            'for': '5m',
+            'annotations': {'summary': 'Alert rule {0} is firing'.format(number)},
+            'labels': {'severity': generator.choice(('info', 'warning', 'critical'))},
+            'isPaused': False,
+        }
+
+    def get_annotation_time(self, number):
+        return self.created - self.get_random('annotation', number).randint(0, 365 * 24 * 3600 * 1000)
+
+    def annotation(self, number):
+        annotation_time = self.get_annotation_time(number)
+        return {'id': number + 1, 'alertId': 0, 'dashboardUID': 'dashboard{0}'.format(number % max(1, self.dashboard_count)),
+                'panelId': 1, 'time': annotation_time, 'timeEnd': annotation_time, 'text': 'Deployment {0}'.format(number),
+                'tags': ['deploy'], 'type': 'annotation'}
+
+    def annotations_between(self, time_from, time_to, limit):
+        # Only the times are kept, save asks for 13 windows of one month
+        if self.annotation_times is None:
+            self.annotation_times = [self.get_annotation_time(number) for number in range(self.annotation_count)]
+        numbers = [number for (number, annotation_time) in enumerate(self.annotation_times) if time_from <= annotation_time <= time_to]
+        return [self.annotation(number) for number in numbers[:limit]]
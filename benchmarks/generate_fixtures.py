@@ -0,0 +1,88 @@
+"""
+Generate a synthetic Grafana instance (benchmarks/fixtures.py) and write it as a backup archive restore can read.
+
+The archive is written by the real save command against a fake Grafana (benchmarks/fake_grafana.py) serving the
+fixtures, so its layout is always the one restore expects. Use it to get 10k or 100k dashboard archives for
+restore tests without a large Grafana, or run benchmarks/fake_grafana.py with the same counts to test save.
+
+Usage:
+    generate_fixtures.py [--output=<dir>] [--dashboards=<count>] [--versions=<count>] [--panels=<count>]
+                         [--folders=<count>] [--folder-depth=<depth>] [--datasources=<count>] [--users=<count>]
+                         [--teams=<count>] [--team-members=<count>] [--alert-rules=<count>] [--annotations=<count>]
+                         [--codec=<codec>] [--verbose]
+
+Options:
+    --output=<dir>              Directory the archive is written to [default: _OUTPUT_]
+    --dashboards=<count>        Number of dashboards [default: 1000]
+    --versions=<count>          Versions per dashboard [default: 3]
+    --panels=<count>            Panels per dashboard, sets the payload size (about 900 bytes per panel) [default: 20]
+    --folders=<count>           Number of folders the dashboards are spread over [default: 50]
+    --folder-depth=<depth>      Folders are nested in chains of this many levels [default: 3]
+    --datasources=<count>       Number of datasources [default: 10]
+    --users=<count>             Number of users [default: 100]
+    --teams=<count>             Number of teams [default: 10]
+    --team-members=<count>      Members per team, picked from the users [default: 10]
+    --alert-rules=<count>       Number of alert rules [default: 100]
+    --annotations=<count>       Number of annotations over the last 12 months [default: 1000]
+    --codec=<codec>             Archive codec [default: gzip]
+    --verbose                   Show the output of save
+"""
+from fake_grafana import FakeGrafana, get_fixtures
+from grafana_backup.grafanaSettings import main as conf
+from grafana_backup.save import main as save
+from grafana_backup.archive import get_archive_file
+from docopt import docopt
+import contextlib
+import io
+import json
+import os
+import time
+
+# Components the fixtures have, in the order save runs them
+FIXTURE_COMPONENTS = 'folder,datasource,dashboard,dashboard-version,user,team,team-member,alert-rule,annotation'
+
+
+def get_settings(grafana_url, backup_dir, codec, fixtures):
+    # A generated config file, so the run goes through the same settings code as the cli
+    config = {
+        'general': {'debug': False, 'backup_dir': backup_dir, 'archive_codec': codec, 'run_report': False, 'http_retries': 0},
+        # Users are read with basic auth, in a single page
+        'grafana': {'url': grafana_url, 'token': 'fixtures', 'admin_account': 'admin', 'admin_password': 'admin',
+                    'search_api_limit': max(5000, fixtures.user_count)},
+    }
+    if not os.path.exists(backup_dir):
+        os.makedirs(backup_dir)
+    config_file = os.path.join(backup_dir, 'grafanaSettings.json')
+    with open(config_file, 'w') as f:
+        json.dump(config, f)
+    try:
+        return conf(config_file)
+    finally:
+        os.remove(config_file)
+
+
+def main():
+    args = docopt(__doc__)
+    fixtures = get_fixtures(args)
+    grafana = FakeGrafana(fixtures)
+    grafana.start()
+    settings = get_settings(grafana.url, args['--output'], args['--codec'], fixtures)
+
+    start = time.time()
+    try:
+        with contextlib.ExitStack() as stack:
+            if not args['--verbose']:
+                stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+            save({'--components': FIXTURE_COMPONENTS}, settings)
+    finally:
+        grafana.stop()
+
+    archive_file = get_archive_file(settings)
+    print('archive: {0} ({1:.1f} MB) in {2:.1f}s'.format(
+        archive_file, os.path.getsize(archive_file) / 1024.0 / 1024.0, time.time() - start))
+    for (kind, count) in fixtures.get_counts().items():
+        print('{0:<16}{1:>10}'.format(kind, count))
+
+
+if __name__ == '__main__':
+    main()
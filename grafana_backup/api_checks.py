@@ -1,8 +1,28 @@
 from grafana_backup.commons import print_horizontal_line
 from grafana_backup.dashboardApi import health_check, auth_check, uid_feature_check, paging_feature_check, contact_point_check
+import time
+
+# (grafana url, headers) -> (time, result) of successful pre-checks, reused by the runs of a long running 'serve'
+probe_cache = {}
 
 
 def main(settings):
+    cache_ttl = settings.get('API_CHECK_CACHE_TTL')
+    cache_key = (settings.get('GRAFANA_URL'), tuple(sorted((settings.get('HTTP_GET_HEADERS') or {}).items())))
+
+    if cache_ttl and cache_key in probe_cache:
+        (checked, result) = probe_cache[cache_key]
+        if time.time() - checked < cache_ttl:
+            print("[Pre-Check] using the pre-check results from {0}s ago".format(int(time.time() - checked)))
+            return result
+
+    result = run_api_checks(settings)
+    if cache_ttl and result[0] == 200:
+        probe_cache[cache_key] = (time.time(), result)
+    return result
+
+
+def run_api_checks(settings):
     grafana_url = settings.get('GRAFANA_URL')
     http_get_headers = settings.get('HTTP_GET_HEADERS')
     verify_ssl = settings.get('VERIFY_SSL')
@@ -1,31 +1,88 @@
 from glob import glob
+from grafana_backup.commons import CHECKPOINT_FILE
+from grafana_backup.compression import get_archive_file_name, open_archive_writer
+import contextlib
 import os
-import tarfile
 import shutil
 
+# 'index' holds the archive index of the backup, see commons.index_item
+ARCHIVE_FOLDERS = ['index', 'folders', 'datasources', 'dashboards', 'alert_channels', 'organizations', 'users',
+                   'snapshots', 'dashboard_versions', 'annotations', 'library_elements', 'teams', 'team_members',
+                   'alert_rules', 'contact_points', 'notification_policies', 'notification_templates']
+
 
 def main(args, settings):
+    archive_file = get_archive_file(settings)
+    backup_files = get_backup_files(settings)
+
+    if os.path.exists(archive_file):
+        os.remove(archive_file)
+
+    with open_archive_writer(archive_file, settings) as tar:
+        add_backup_files(tar, backup_files)
+    remove_org_partitions(settings)
+    print('\ncreated archive at: {0}'.format(archive_file))
+
+
+@contextlib.contextmanager
+def open_archive_stream(settings):
+    # Yields the open archive so objects can be written into it while they are fetched,
+    # whatever is left on disk in the component folders (log files) is added when the stream is closed
+    archive_file = get_archive_file(settings)
+
+    if os.path.exists(archive_file):
+        os.remove(archive_file)
+
+    try:
+        with open_archive_writer(archive_file, settings) as tar:
+            yield tar
+            add_backup_files(tar, get_backup_files(settings))
+        remove_org_partitions(settings)
+    except BaseException:
+        if os.path.exists(archive_file):
+            os.remove(archive_file)
+        raise
+    print('\ncreated archive at: {0}'.format(archive_file))
+
+
+def get_archive_file(settings):
+    return '{0}/{1}'.format(settings.get('BACKUP_DIR'), get_archive_file_name(settings))
+
+
+def get_backup_files(settings):
     backup_dir = settings.get('BACKUP_DIR')
     timestamp = settings.get('TIMESTAMP')
-
-    archive_file = '{0}/{1}.tar.gz'.format(backup_dir, timestamp)
     backup_files = list()
 
-    for folder_name in ['folders', 'datasources', 'dashboards', 'alert_channels', 'organizations', 'users', 'snapshots',
-                        'dashboard_versions', 'annotations', 'library_elements', 'teams', 'team_members', 'alert_rules',
-                        'contact_points', 'notification_policies', 'notification_templates']:
+    for folder_name in ARCHIVE_FOLDERS:
         backup_path = '{0}/{1}/{2}'.format(backup_dir, folder_name, timestamp)
+        # Partitions of 'save --all-orgs'
+        org_backup_path = '{0}/orgs/*/{1}/{2}'.format(backup_dir, folder_name, timestamp)
 
-        for file_path in glob(backup_path):
+        for file_path in glob(backup_path) + sorted(glob(org_backup_path)):
             print('backup {0} at: {1}'.format(folder_name, file_path))
             backup_files.append(file_path)
+    return backup_files
 
-    if os.path.exists(archive_file):
-        os.remove(archive_file)
 
-    with tarfile.open(archive_file, "w:gz") as tar:
-        for file_path in backup_files:
-            tar.add(file_path)
-            shutil.rmtree(os.path.abspath(os.path.join(file_path, os.pardir)))
-    tar.close()
-    print('\ncreated archive at: {0}'.format(archive_file))
+def add_backup_files(tar, backup_files):
+    for file_path in backup_files:
+        tar.add(file_path, filter=exclude_checkpoint)
+        shutil.rmtree(os.path.abspath(os.path.join(file_path, os.pardir)))
+
+
+def remove_org_partitions(settings):
+    # The component folders are gone once archived, only the empty partitions of 'save --all-orgs' are left
+    orgs_path = '{0}/orgs'.format(settings.get('BACKUP_DIR'))
+    for org_path in glob('{0}/*'.format(orgs_path)):
+        if not os.listdir(org_path):
+            os.rmdir(org_path)
+    if os.path.isdir(orgs_path) and not os.listdir(orgs_path):
+        os.rmdir(orgs_path)
+
+
+def exclude_checkpoint(tarinfo):
+    # Checkpoint journals are only needed while the backup is in progress
+    if os.path.basename(tarinfo.name) == CHECKPOINT_FILE:
+        return None
+    return tarinfo
@@ -1,4 +1,5 @@
 from azure.storage.blob import BlobServiceClient
+from grafana_backup.compression import get_archive_file_name
 
 
 def main(args, settings):
@@ -6,9 +7,8 @@ def main(args, settings):
     azure_storage_connection_string = settings.get('AZURE_STORAGE_CONNECTION_STRING')
 
     backup_dir = settings.get('BACKUP_DIR')
-    timestamp = settings.get('TIMESTAMP')
 
-    azure_file_name = '{0}.tar.gz'.format(timestamp)
+    azure_file_name = get_archive_file_name(settings)
     archive_file = '{0}/{1}'.format(backup_dir, azure_file_name)
 
     try:
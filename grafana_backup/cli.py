@@ -3,7 +3,12 @@ from grafana_backup.save import main as save
 from grafana_backup.restore import main as restore
 from grafana_backup.delete import main as delete
 from grafana_backup.tools import main as tools
+from grafana_backup.fleet import main as fleet
+from grafana_backup.serve import main as serve
+from grafana_backup.diff import main as diff
+from grafana_backup.verify import main as verify
 from grafana_backup.grafanaSettings import main as conf
+from grafana_backup.profiler import main as profile, get_profile_file
 from docopt import docopt
 import os
 import sys
@@ -12,9 +17,16 @@ docstring = """
 {0} {1}
 
 Usage:
-    grafana-backup save [--config=<filename>] [--components=<>] [--no-archive]
-    grafana-backup restore [--config=<filename>] [--components=<>] <archive_file>
+    grafana-backup save [--config=<filename>] [--components=<>] [--folder-uid=<>] [--tag=<>] [--uid=<>]
+                        [--all-orgs] [--no-archive] [--resume <timestamp>] [--profile]
+    grafana-backup restore [--config=<filename>] [--components=<>] [--uid=<>] [--folder=<>] [--title-glob=<>]
+                           [--org=<>] [--resume | --only-failed] [--plan | --apply-plan | --skip-unchanged] [--profile]
+                           <archive_file>
     grafana-backup delete [--config=<filename>] [--components=<>]
+    grafana-backup diff [--config=<filename>] [--components=<>] [--json-diff] <archive_file> <other_archive_file>
+    grafana-backup verify [--config=<filename>] <archive_file>
+    grafana-backup fleet [--config=<filename>] [--components=<>] [--concurrency=<>] [--no-archive] <fleet_file>
+    grafana-backup serve [--config=<filename>]
     grafana-backup tools [-h | --help] [--config=<filename>] [<optional-command>] [<optional-argument>]
     grafana-backup [--config=<filename>]
     grafana-backup [-h | --help]
@@ -29,8 +41,43 @@ Options:
                                             Delete implemented only to <dashboard,datasource,folder,alert_channel,snapshot,annotation,library_element,team_member>
                                             <folder,folder_permission,dashboard,datasource,alert-channel,alert-rule,organization,user,snapshot,dashboard-version,annotation,library_element,team,team_member,contact_point,notification_policy,notification-template>
 
+    --folder-uid=<>                         save: comma separated list of folder uids, only dashboards and dashboard
+                                            versions in these folders are saved
+    --tag=<>                                save: comma separated list of tags, only dashboards and dashboard versions
+                                            having all these tags are saved
+    --all-orgs                              Save every organization with the admin account, each into its own
+                                            partition of the archive (orgs/<org id>). By default dashboards, folders,
+                                            datasources, library elements and alerting are saved
+    --org=<>                                restore: org id of the partition of a save --all-orgs archive to restore,
+                                            it is restored into that organization (X-Grafana-Org-Id header, with the
+                                            admin account when it is configured). Required for such archives
     --no-archive                            Skip archive creation and do not delete unarchived files
                                             (used for troubleshooting purposes)
+    --resume                                save: resume the interrupted save of backup <timestamp>, only objects
+                                            missing from its checkpoint journal are fetched before archiving
+                                            restore: skip items the restore journal of <archive_file> confirms as
+                                            created, updated or already existing
+    --concurrency=<>                        fleet: number of instances saved at the same time, overrides the
+                                            'concurrency' of <fleet_file>
+    --only-failed                           Restore only items the restore journal of <archive_file> marks as failed
+    --uid=<>                                Comma separated list of uids, save only these dashboards and their
+                                            versions, restore only the items with these uids
+    --folder=<>                             Comma separated list of folder uids or titles, restore only these folders
+                                            and the items stored in them
+    --title-glob=<>                         Restore only the items whose title matches this pattern, e.g. 'Team A *'.
+                                            The filters are evaluated against the archive index, with the 'zip'
+                                            archive codec only the matching members are read
+    --profile                               Profile the save or restore run, write the profile next to the archive
+                                            and print the functions taking the most time per stage (http, json,
+                                            archive)
+    --plan                                  Compare the archive with the live Grafana and write the creates, updates
+                                            and deletes a restore needs to the restore plan of <archive_file>,
+                                            nothing is changed
+    --apply-plan                            Restore only the items the restore plan of <archive_file> creates or
+                                            updates, then delete the live objects it lists
+    --skip-unchanged                        Fetch the live folders, datasources, library elements and dashboards
+                                            first and do not post the ones identical to the archived objects
+    --json-diff                             diff: also print the changed values of every changed dashboard
 """.format(PKG_NAME, PKG_VERSION)
 
 
@@ -51,11 +98,28 @@ def main():
         settings = conf(default_config)
 
     if args.get('save', None):
-        save(args, settings)
+        if args.get('--profile', None):
+            profile(settings, get_profile_file(settings, 'save'), save, args, settings)
+        else:
+            save(args, settings)
         sys.exit()
     elif args.get('restore', None):
-        restore(args, settings)
+        if args.get('--profile', None):
+            profile(settings, get_profile_file(settings, 'restore', args.get('<archive_file>')), restore, args, settings)
+        else:
+            restore(args, settings)
         sys.exit()
+    elif args.get('fleet', None):
+        fleet(args, settings)
+        sys.exit()
+    elif args.get('serve', None):
+        serve(args, settings)
+        sys.exit()
+    elif args.get('diff', None):
+        # Exits with 1 if the archives differ, like diff
+        sys.exit(1 if diff(args, settings) else 0)
+    elif args.get('verify', None):
+        sys.exit(0 if verify(args, settings) else 1)
     elif args.get('delete', None):
         delete(args, settings)
         sys.exit()
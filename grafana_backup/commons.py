@@ -1,4 +1,37 @@
-import re, sys, json
+import io, os, re, sys, json, tarfile, threading, time, hashlib
+from grafana_backup.serializer import dumps_json
+from grafana_backup.report import get_current_component, report_component, report_item, report_saved_object
+
+# Journal of completed items kept in every component folder, used by 'save --resume'
+CHECKPOINT_FILE = 'checkpoint.journal'
+
+# Index of the uid, title and folder of every saved object, stored in the archive for selective restores.
+# It is the manifest of the archive: with the size and sha256 of every member it is used by diff and verify
+ARCHIVE_INDEX_FILE = 'archive.index'
+archive_index = {'path': None, 'lock': threading.Lock()}
+# Grafana API endpoint every component is read from, recorded in the archive index
+SOURCE_ENDPOINTS = {
+    'dashboard': '/api/dashboards/uid/{uid}',
+    'version': '/api/dashboards/id/{id}/versions/{version}',
+    'folder': '/api/folders/{uid}',
+    'folder_permission': '/api/folders/{uid}/permissions',
+    'datasource': '/api/datasources',
+    'library_element': '/api/library-elements',
+    'alert_channel': '/api/alert-notifications',
+    'alert_rule': '/api/v1/provisioning/alert-rules',
+    'contact_point': '/api/v1/provisioning/contact-points',
+    'notification_policy': '/api/v1/provisioning/policies',
+    'notification_template': '/api/v1/provisioning/templates',
+    'annotation': '/api/annotations',
+    'snapshot': '/api/snapshots/{key}',
+    'organization': '/api/orgs/{id}',
+    'user': '/api/users/{id}',
+    'team': '/api/teams/search',
+    'team_member': '/api/teams/{id}/members',
+}
+
+# Items which failed with a transient error during the run, retried once at the end instead of being dropped
+deferred_items = []
 
 
 def print_horizontal_line():
@@ -38,16 +71,164 @@ def load_config(path=None):
     return config
 
 
+class LooseFileWriter(object):
+    # Writes every object to its own file, they are put into the archive by archive.py afterwards.
+    # Content is written as bytes, so the file is exactly what the archive index hashed on every platform
+    keeps_files = True
+
+    def write(self, file_path, content):
+        with open(u"{0}".format(file_path), 'wb') as f:
+            f.write(content)
+
+
+class ArchiveStreamWriter(object):
+    # Appends every object as a member of an open tar stream, using the path it would have on disk as member name.
+    # A failed run deletes the partial archive, nothing it wrote is left to resume from
+    keeps_files = False
+
+    def __init__(self, tar):
+        self.tar = tar
+        self.lock = threading.Lock()
+
+    def write(self, file_path, content):
+        tarinfo = tarfile.TarInfo(file_path.lstrip('/'))
+        tarinfo.size = len(content)
+        tarinfo.mtime = int(time.time())
+        tarinfo.mode = 0o644
+        with self.lock:
+            self.tar.addfile(tarinfo, io.BytesIO(content))
+
+
+json_writer = LooseFileWriter()
+
+
+def set_json_writer(writer):
+    global json_writer
+    json_writer = writer
+
+
 def save_json(file_name, data, folder_path, extension, pretty_print):
     pattern = "^db/|^uid/"
     if re.match(pattern, file_name):
         file_name = re.sub(pattern, '', file_name)
 
     file_path = folder_path + '/' + file_name + '.' + extension
-    with open(u"{0}".format(file_path), 'w') as f:
-        if pretty_print:
-            f.write(json.dumps(data, sort_keys=True, indent=4, separators=(',', ': ')))
-        else:
-            f.write(json.dumps(data))
+    content = dumps_json(data, pretty_print).encode('utf8')
+    json_writer.write(file_path, content)
+    index_item(file_path, extension, data, content)
+    report_saved_object(file_path, extension, len(content))
     # Return file_path for showing in the console message
     return file_path
+
+
+def set_archive_index(index_path):
+    archive_index['path'] = index_path
+
+
+def get_member_key(file_path):
+    # Same name as the archive member of the file, whatever way the archive was written
+    return os.path.normpath(file_path).replace(os.sep, '/').lstrip('/')
+
+
+def get_index_entry(file_path, extension, data, content=None):
+    # content is the saved member, without it (objects read back from an archive) size and sha256 are unknown
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    entry = {'path': get_member_key(file_path), 'component': extension, 'uid': name, 'title': None,
+             'folder_uid': None, 'folder_title': None, 'version': None, 'endpoint': SOURCE_ENDPOINTS.get(extension),
+             'size': len(content) if content is not None else None,
+             'sha256': hashlib.sha256(content).hexdigest() if content is not None else None}
+    if extension == 'folder_permission':
+        # Saved under the uid of their folder
+        entry['folder_uid'] = name
+    if not isinstance(data, dict):
+        return entry
+
+    meta = data.get('meta') if isinstance(data.get('meta'), dict) else {}
+    if extension == 'dashboard':
+        dashboard = data.get('dashboard', {})
+        entry.update({'uid': dashboard.get('uid', name), 'title': dashboard.get('title'),
+                      'folder_uid': meta.get('folderUid', ''), 'folder_title': meta.get('folderTitle'),
+                      'version': dashboard.get('version', meta.get('version'))})
+    elif extension == 'folder':
+        entry.update({'uid': data.get('uid', name), 'title': data.get('title'),
+                      'folder_uid': data.get('uid', name), 'folder_title': data.get('title'), 'version': data.get('version')})
+    else:
+        entry.update({'uid': data.get('uid', name), 'title': data.get('title', data.get('name')),
+                      'folder_uid': data.get('folderUid', data.get('folderUID', meta.get('folderUid'))),
+                      'folder_title': meta.get('folderName'), 'version': data.get('version')})
+    return entry
+
+
+def index_item(file_path, extension, data, content=None):
+    if not archive_index['path']:
+        return
+    line = dumps_json(get_index_entry(file_path, extension, data, content)) + '\n'
+    with archive_index['lock']:
+        with open(archive_index['path'], 'a') as f:
+            f.write(line)
+
+
+def load_archive_index(lines):
+    # Objects saved twice (e.g. retried or resumed) are listed twice, the last entry wins
+    index = {}
+    for line in lines:
+        if line.strip():
+            entry = json.loads(line)
+            index[entry['path']] = entry
+    return index
+
+
+def defer_item(description, retry_function, *retry_args):
+    print("[WARN] {0} failed with a transient error, will retry at the end of the run".format(description))
+    deferred_items.append((description, retry_function, retry_args, get_current_component()))
+
+
+def retry_deferred_items():
+    items = list(deferred_items)
+    del deferred_items[:]
+    failed_items = []
+
+    if items:
+        print("retrying {0} deferred items:".format(len(items)))
+    for (description, retry_function, retry_args, component) in items:
+        # Retries are accounted to the component which deferred the item
+        with report_component(component):
+            if not retry_function(*retry_args):
+                print("[ERROR] {0} failed again, giving up".format(description))
+                report_item(description, 'failed')
+                failed_items.append(description)
+    return failed_items
+
+
+def load_checkpoint(folder_path):
+    checkpoint_path = os.path.join(folder_path, CHECKPOINT_FILE)
+    if not os.path.exists(checkpoint_path):
+        return set()
+    with open(checkpoint_path, 'r') as f:
+        completed_items = set(line.rstrip('\n') for line in f)
+    print("resuming from checkpoint: {0} items already saved in {1}".format(len(completed_items), folder_path))
+    return completed_items
+
+
+def checkpoint_item(folder_path, item_key):
+    # Only loose files can be resumed, a checkpoint of a streamed object would make 'save --resume' leave it out
+    if not json_writer.keeps_files:
+        return
+    with open(os.path.join(folder_path, CHECKPOINT_FILE), 'a') as f:
+        f.write('{0}\n'.format(item_key))
+
+
+def load_restore_journal(journal_path):
+    # The journal is append only, the last status recorded for an item wins
+    journal = {}
+    if os.path.exists(journal_path):
+        with open(journal_path, 'r') as f:
+            for line in f:
+                (item_key, status) = line.rstrip('\n').rsplit('\t', 1)
+                journal[item_key] = status
+    return journal
+
+
+def journal_restore_item(journal_path, item_key, status):
+    with open(journal_path, 'a') as f:
+        f.write('{0}\t{1}\n'.format(item_key, status))
@@ -0,0 +1,245 @@
+from concurrent.futures import ThreadPoolExecutor
+import collections
+import contextlib
+import os
+import struct
+import tarfile
+import time
+import zipfile
+import zlib
+
+ARCHIVE_EXTENSIONS = {
+    'gzip': '.tar.gz',
+    'zstd': '.tar.zst',
+    'xz': '.tar.xz',
+    'lz4': '.tar.lz4',
+    'none': '.tar',
+    'zip': '.zip',
+}
+
+# Restore picks the codec from the first bytes of the archive, whatever its file name is
+MAGIC_BYTES = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x04\x22\x4d\x18', 'lz4'),
+    (b'PK\x03\x04', 'zip'),
+)
+
+
+# Input block size of the parallel gzip writer, each block is compressed by one worker thread
+PARALLEL_GZIP_BLOCK_SIZE = 1024 * 1024
+# Deflate looks back at most 32 KiB, priming every block with this much of the previous one keeps the ratio of a single stream
+DEFLATE_WINDOW_SIZE = 32 * 1024
+
+
+class ParallelGzipWriter(object):
+    # pigz style gzip writer: the input is split into blocks which are deflated concurrently (zlib releases the GIL)
+    # and written in order as a single gzip member, readable by any gzip implementation.
+
+    def __init__(self, fileobj, level, threads, block_size=PARALLEL_GZIP_BLOCK_SIZE):
+        self.fileobj = fileobj
+        self.level = level
+        self.threads = threads
+        self.block_size = block_size
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        self.pending = collections.deque()
+        self.buffer = bytearray()
+        self.previous_block = b''
+        self.crc = 0
+        self.size = 0
+        self.fileobj.write(b'\x1f\x8b\x08\x00' + struct.pack('<I', int(time.time())) + b'\x00\xff')
+
+    def write(self, data):
+        self.buffer.extend(data)
+        while len(self.buffer) >= self.block_size:
+            block = bytes(self.buffer[:self.block_size])
+            del self.buffer[:self.block_size]
+            self.submit_block(block, False)
+        return len(data)
+
+    def submit_block(self, block, last):
+        self.crc = zlib.crc32(block, self.crc)
+        self.size += len(block)
+        self.pending.append(self.executor.submit(compress_block, block, self.previous_block[-DEFLATE_WINDOW_SIZE:], self.level, last))
+        self.previous_block = block
+        # Bound memory to a few blocks per worker, the oldest block is written as soon as it is done
+        while len(self.pending) > self.threads * 2:
+            self.fileobj.write(self.pending.popleft().result())
+
+    def close(self):
+        if self.executor is None:
+            return
+        self.submit_block(bytes(self.buffer), True)
+        while self.pending:
+            self.fileobj.write(self.pending.popleft().result())
+        self.fileobj.write(struct.pack('<II', self.crc & 0xffffffff, self.size & 0xffffffff))
+        self.executor.shutdown()
+        self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ZipArchiveWriter(object):
+    # Gives a zip file the parts of the TarFile interface used to write backups. Every member is compressed on its own
+    # and listed in the central directory, so restore can read single members without decompressing the whole archive.
+
+    def __init__(self, zip_file):
+        self.zip_file = zip_file
+
+    def add(self, name, filter=None):
+        for (root, dirnames, filenames) in os.walk(name):
+            for file_name in sorted(filenames):
+                file_path = os.path.join(root, file_name)
+                arcname = file_path.lstrip('/')
+                if filter and filter(tarfile.TarInfo(arcname)) is None:
+                    continue
+                self.zip_file.write(file_path, arcname)
+
+    def addfile(self, tarinfo, fileobj):
+        self.zip_file.writestr(tarinfo.name, fileobj.read())
+
+
+def compress_block(block, dictionary, level, last):
+    if dictionary:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, zlib.DEF_MEM_LEVEL, zlib.Z_DEFAULT_STRATEGY, dictionary)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    # A sync flush ends the block on a byte boundary without closing the deflate stream, so blocks can be concatenated
+    return compressor.compress(block) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def get_archive_file_name(settings):
+    return '{0}{1}'.format(settings.get('TIMESTAMP'), ARCHIVE_EXTENSIONS[settings.get('ARCHIVE_CODEC')])
+
+
+def get_compression_threads(settings):
+    # 0 means one thread per cpu core
+    threads = settings.get('ARCHIVE_COMPRESSION_THREADS')
+    if not threads:
+        return os.cpu_count() or 1
+    return threads
+
+
+def import_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise Exception("archive codec 'zstd' needs the 'zstandard' package, install it with: pip install grafana-backup[zstd]")
+    return zstandard
+
+
+def import_lz4_frame():
+    try:
+        import lz4.frame
+    except ImportError:
+        raise Exception("archive codec 'lz4' needs the 'lz4' package, install it with: pip install grafana-backup[lz4]")
+    return lz4.frame
+
+
+@contextlib.contextmanager
+def open_archive_writer(archive_file, settings):
+    codec = settings.get('ARCHIVE_CODEC')
+    level = settings.get('ARCHIVE_COMPRESSION_LEVEL')
+
+    if codec == 'gzip' and get_compression_threads(settings) > 1:
+        with open(archive_file, 'wb') as f:
+            with ParallelGzipWriter(f, 9 if level is None else level, get_compression_threads(settings)) as compressed:
+                with tarfile.open(fileobj=compressed, mode='w|') as tar:
+                    yield tar
+    elif codec == 'gzip':
+        with tarfile.open(archive_file, 'w:gz', compresslevel=9 if level is None else level) as tar:
+            yield tar
+    elif codec == 'xz':
+        with tarfile.open(archive_file, 'w:xz', preset=level) as tar:
+            yield tar
+    elif codec == 'none':
+        with tarfile.open(archive_file, 'w') as tar:
+            yield tar
+    elif codec == 'zip':
+        with zipfile.ZipFile(archive_file, 'w', zipfile.ZIP_DEFLATED, compresslevel=level) as zip_file:
+            yield ZipArchiveWriter(zip_file)
+    elif codec == 'zstd':
+        zstandard = import_zstandard()
+        compressor = zstandard.ZstdCompressor(level=3 if level is None else level, threads=get_compression_threads(settings))
+        with open(archive_file, 'wb') as f:
+            with compressor.stream_writer(f, closefd=False) as compressed:
+                with tarfile.open(fileobj=compressed, mode='w|') as tar:
+                    yield tar
+    elif codec == 'lz4':
+        lz4_frame = import_lz4_frame()
+        with lz4_frame.open(archive_file, 'wb', compression_level=0 if level is None else level) as compressed:
+            with tarfile.open(fileobj=compressed, mode='w|') as tar:
+                yield tar
+    else:
+        raise Exception("unknown archive codec '{0}', supported codecs: {1}".format(codec, ', '.join(sorted(ARCHIVE_EXTENSIONS))))
+
+
+def detect_codec(fileobj):
+    position = fileobj.tell()
+    header = fileobj.read(6)
+    fileobj.seek(position)
+
+    for (magic, codec) in MAGIC_BYTES:
+        if header.startswith(magic):
+            return codec
+    return 'none'
+
+
+def open_archive_reader(fileobj):
+    codec = detect_codec(fileobj)
+    print("detected archive codec: {0}".format(codec))
+
+    if codec == 'zip':
+        return zipfile.ZipFile(fileobj)
+    elif codec == 'gzip':
+        return tarfile.open(fileobj=fileobj, mode='r:gz')
+    elif codec == 'xz':
+        return tarfile.open(fileobj=fileobj, mode='r:xz')
+    elif codec == 'zstd':
+        zstandard = import_zstandard()
+        return tarfile.open(fileobj=zstandard.ZstdDecompressor().stream_reader(fileobj), mode='r|')
+    elif codec == 'lz4':
+        lz4_frame = import_lz4_frame()
+        return tarfile.open(fileobj=lz4_frame.open(fileobj, 'rb'), mode='r|')
+    return tarfile.open(fileobj=fileobj, mode='r:')
+
+
+def extract_archive(archive, path, select=None):
+    # Only the members accepted by select(member_name) are written to path. Zip archives are read through their
+    # central directory, tar archives have to be decompressed up to the last member
+    if isinstance(archive, zipfile.ZipFile):
+        archive.extractall(path, [name for name in archive.namelist() if select is None or select(name)])
+    else:
+        archive.extractall(path, members=(member for member in archive if select is None or select(member.name)))
+    archive.close()
+
+
+def iter_archive_members(archive):
+    # (member name, file object) of every file in the archive in archive order, tar archives are read as a stream
+    try:
+        if isinstance(archive, zipfile.ZipFile):
+            for name in archive.namelist():
+                if not name.endswith('/'):
+                    with archive.open(name) as f:
+                        yield (name, f)
+        else:
+            for member in archive:
+                if member.isfile():
+                    yield (member.name, archive.extractfile(member))
+    finally:
+        archive.close()
+
+
+def read_archive_member(archive, file_name):
+    # Only zip archives can read a single member without decompressing the ones in front of it
+    if not isinstance(archive, zipfile.ZipFile):
+        return None
+    for name in archive.namelist():
+        if os.path.basename(name) == file_name:
+            return archive.read(name).decode('utf8')
+    return None
@@ -1,4 +1,4 @@
-import json
+from grafana_backup.serializer import dumps_json, loads_json
 from grafana_backup.dashboardApi import create_alert_channel
 
 
@@ -12,6 +12,6 @@ def main(args, settings, file_path):
     with open(file_path, 'r') as f:
         data = f.read()
 
-    alert_channel = json.loads(data)
-    result = create_alert_channel(json.dumps(alert_channel), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
+    alert_channel = loads_json(data)
+    result = create_alert_channel(dumps_json(alert_channel), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
     print("create alert_channel: {0}, status: {1}, msg: {2}".format(alert_channel['name'], result[0], result[1]))
@@ -1,4 +1,4 @@
-import json
+from grafana_backup.serializer import dumps_json, loads_json
 from grafana_backup.dashboardApi import get_alert_rule, create_alert_rule, update_alert_rule, get_grafana_version
 from packaging import version
 
@@ -27,7 +27,7 @@ def main(args, settings, file_path):
         with open(file_path, 'r') as f:
             data = f.read()
 
-        alert_rule = json.loads(data)
+        alert_rule = loads_json(data)
         del alert_rule['id']
         uid = alert_rule['uid']
         get_response= get_alert_rule(uid, grafana_url, http_get_headers, verify_ssl, client_cert, debug)
@@ -36,9 +36,9 @@ def main(args, settings, file_path):
 
         print("Got a code: {0}", status_code)
         if status_code == 404:
-            result = create_alert_rule(json.dumps(alert_rule), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
+            result = create_alert_rule(dumps_json(alert_rule), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
         else:
-            result = update_alert_rule(alert_rule['uid'], json.dumps(alert_rule), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
+            result = update_alert_rule(alert_rule['uid'], dumps_json(alert_rule), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
 
         print("create alert rule: {0}, status: {1}, msg: {2}".format(alert_rule['title'], result[0], result[1]))
     else:
@@ -1,4 +1,4 @@
-import json
+from grafana_backup.serializer import dumps_json, loads_json
 from grafana_backup.dashboardApi import create_annotation
 
 
@@ -12,6 +12,6 @@ def main(args, settings, file_path):
     with open(file_path, 'r') as f:
         data = f.read()
 
-    annotation = json.loads(data)
-    result = create_annotation(json.dumps(annotation), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
+    annotation = loads_json(data)
+    result = create_annotation(dumps_json(annotation), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
     print("create annotation: {0}, status: {1}, msg: {2}".format(annotation['id'], result[0], result[1]))
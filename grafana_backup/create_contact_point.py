@@ -1,4 +1,4 @@
-import json
+from grafana_backup.serializer import dumps_json, loads_json
 from grafana_backup.dashboardApi import create_contact_point, get_grafana_version, search_contact_points, update_contact_point
 from packaging import version
 
@@ -36,18 +36,18 @@ def main(args, settings, file_path):
             for ecp in result[1]:
                 existing_contact_points.append(ecp["uid"])
 
-        contact_points = json.loads(data)
+        contact_points = loads_json(data)
         for cp in contact_points:
             if cp["uid"] in existing_contact_points:
                 print("Contact point {0} already exists, updating".format(cp["uid"]))
-                result = update_contact_point(cp["uid"], json.dumps(cp), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
+                result = update_contact_point(cp["uid"], dumps_json(cp), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
                 if result[0] == 202:
                     print("Successfully updated contact point")
                 else:
                     print("[ERROR] Contact point {0} failed to update. Return code:{1} - {2}".format(cp["uid"], result[0], result[1]))
             else:
                 print("Contact point {0} does not exist, creating".format(cp["uid"]))
-                result = create_contact_point(json.dumps(cp), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
+                result = create_contact_point(dumps_json(cp), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
                 if result[0] == 202:
                     print("Successfully create contact point")
                 else:
@@ -1,6 +1,7 @@
-import json
+from grafana_backup.serializer import dumps_json, loads_json
 from grafana_backup.commons import to_python2_and_3_compatible_string
 from grafana_backup.dashboardApi import get_folder_id, create_dashboard
+from grafana_backup.restore_plan import is_unchanged
 
 
 def main(args, settings, file_path):
@@ -13,7 +14,10 @@ def main(args, settings, file_path):
     with open(file_path, 'r') as f:
         data = f.read()
 
-    content = json.loads(data)
+    content = loads_json(data)
+    if is_unchanged(settings, 'dashboard', content):
+        print("skip unchanged dashboard {0}".format(to_python2_and_3_compatible_string(content['dashboard'].get('title', ''))))
+        return
     content['dashboard']['id'] = None
 
     payload = {
@@ -22,6 +26,6 @@ def main(args, settings, file_path):
         'overwrite': True
     }
 
-    result = create_dashboard(json.dumps(payload), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
+    result = create_dashboard(dumps_json(payload), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
     dashboard_title = to_python2_and_3_compatible_string(content['dashboard'].get('title', ''))
     print("create dashboard {0} response status: {1}, msg: {2} \n".format(dashboard_title, result[0], result[1]))
@@ -1,5 +1,6 @@
-import json
+from grafana_backup.serializer import dumps_json, loads_json
 from grafana_backup.dashboardApi import create_datasource
+from grafana_backup.restore_plan import is_unchanged
 
 
 def main(args, settings, file_path):
@@ -12,6 +13,9 @@ def main(args, settings, file_path):
     with open(file_path, 'r') as f:
         data = f.read()
 
-    datasource = json.loads(data)
-    result = create_datasource(json.dumps(datasource), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
+    datasource = loads_json(data)
+    if is_unchanged(settings, 'datasource', datasource):
+        print("skip unchanged datasource {0}".format(datasource['name']))
+        return
+    result = create_datasource(dumps_json(datasource), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
     print("create datasource: {0}, status: {1}, msg: {2}".format(datasource['name'], result[0], result[1]))
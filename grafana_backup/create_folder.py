@@ -1,5 +1,6 @@
-import json
+from grafana_backup.serializer import dumps_json, loads_json
 from grafana_backup.dashboardApi import create_folder
+from grafana_backup.restore_plan import is_unchanged
 
 
 def main(args, settings, file_path):
@@ -12,6 +13,9 @@ def main(args, settings, file_path):
     with open(file_path, 'r') as f:
         data = f.read()
 
-    folder = json.loads(data)
-    result = create_folder(json.dumps(folder), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
+    folder = loads_json(data)
+    if is_unchanged(settings, 'folder', folder):
+        print("skip unchanged folder {0}".format(folder.get('title', '')))
+        return
+    result = create_folder(dumps_json(folder), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
     print("create folder {0}, status: {1}, msg: {2}\n".format(folder.get('title', ''), result[0], result[1]))
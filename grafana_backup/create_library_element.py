@@ -1,5 +1,6 @@
-import json
+from grafana_backup.serializer import dumps_json, loads_json
 from grafana_backup.dashboardApi import create_library_element, get_folder
+from grafana_backup.restore_plan import is_unchanged
 
 
 def main(args, settings, file_path):
@@ -12,9 +13,13 @@ def main(args, settings, file_path):
     with open(file_path, 'r') as f:
         data = f.read()
 
+    library_element = loads_json(data)
+    if is_unchanged(settings, 'library_element', library_element):
+        print("skip unchanged library element {0}".format(library_element["name"]))
+        return
+
     # Library Elements can only be created referencing a folder id. However, this folder id is not unique across Grafana
     # instances. Therefore, we need to first find the folder id by the given folder uid.
-    library_element = json.loads(data)
     folder_uid = library_element["meta"]["folderUid"]
     folder_id_response = get_folder(
         folder_uid, grafana_url, http_post_headers, verify_ssl, client_cert, debug
@@ -24,7 +29,7 @@ def main(args, settings, file_path):
     else:
         library_element["folderUid"] = folder_id_response['uid']
     result = create_library_element(
-        json.dumps(library_element),
+        dumps_json(library_element),
         grafana_url,
         http_post_headers,
         verify_ssl,
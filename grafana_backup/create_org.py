@@ -1,4 +1,4 @@
-import json
+from grafana_backup.serializer import dumps_json, loads_json
 from grafana_backup.dashboardApi import create_org, update_org
 
 
@@ -13,14 +13,14 @@ def main(args, settings, file_path):
         with open(file_path, 'r') as f:
             data = f.read()
 
-        content = json.loads(data)
+        content = loads_json(data)
         org_id = content["id"]
 
         if (org_id == 1):
-            result = update_org(org_id, json.dumps(content), grafana_url, http_post_headers_basic_auth, verify_ssl, client_cert, debug)
+            result = update_org(org_id, dumps_json(content), grafana_url, http_post_headers_basic_auth, verify_ssl, client_cert, debug)
             print('update org "{0}" response status: {1}, msg: {2} \n'.format(content.get('name', ''), result[0], result[1]))
         else:
-            result = create_org(json.dumps(content), grafana_url, http_post_headers_basic_auth, verify_ssl, client_cert, debug)
+            result = create_org(dumps_json(content), grafana_url, http_post_headers_basic_auth, verify_ssl, client_cert, debug)
             print('create org "{0}" response status: {1}, msg: {2} \n'.format(content.get('name', ''), result[0], result[1]))
     else:
         print('[ERROR] Restoring organizations needs to set GRAFANA_ADMIN_ACCOUNT and GRAFANA_ADMIN_PASSWORD first. \n')
@@ -1,4 +1,4 @@
-import json
+from grafana_backup.serializer import dumps_json, loads_json
 from grafana_backup.dashboardApi import create_snapshot
 
 
@@ -12,13 +12,13 @@ def main(args, settings, file_path):
     with open(file_path, 'r') as f:
         data = f.read()
 
-    snapshot = json.loads(data)
+    snapshot = loads_json(data)
     try:
         snapshot['name'] = snapshot['dashboard']['title']
     except KeyError:
         snapshot['name'] = "Untitled Snapshot"
 
-    (status, content) = create_snapshot(json.dumps(snapshot), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
+    (status, content) = create_snapshot(dumps_json(snapshot), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
     if status == 200:
         print("create snapshot: {0}, status: {1}, msg: {2}".format(snapshot['name'], status, content))
     else:
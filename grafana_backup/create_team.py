@@ -1,4 +1,4 @@
-import json
+from grafana_backup.serializer import dumps_json, loads_json
 from grafana_backup.dashboardApi import create_team
 
 
@@ -12,7 +12,7 @@ def main(args, settings, file_path):
     with open(file_path, 'r') as f:
         data = f.read()
 
-    team = json.loads(data)
-    result = create_team(json.dumps(team), grafana_url, http_post_headers, verify_ssl,
+    team = loads_json(data)
+    result = create_team(dumps_json(team), grafana_url, http_post_headers, verify_ssl,
                                     client_cert, debug)
     print("create teams: {0}, status: {1}, msg: {2}".format(team['name'], result[0], result[1]))
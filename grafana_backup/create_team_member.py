@@ -1,4 +1,4 @@
-import json
+from grafana_backup.serializer import dumps_json, loads_json
 import urllib.parse
 
 from grafana_backup.dashboardApi import create_team_member, get_user_by_email_or_username
@@ -16,7 +16,7 @@ def main(args, settings, file_path):
         with open(file_path, 'r') as f:
             data = f.read()
 
-        team_member = json.loads(data)
+        team_member = loads_json(data)
         # A Team-Membership is a connection between a user and a team. However, userIds are not unique across Grafana
         # instances. Therefore, we need to first find the user id by the email.
         user_id = get_user_by_email_or_username(urllib.parse.quote(team_member['email']), grafana_url,
@@ -28,7 +28,7 @@ def main(args, settings, file_path):
         if 200 != user_id[0]:
             return
 
-        user = json.dumps({"userId": user_id[1]['id']})
+        user = dumps_json({"userId": user_id[1]['id']})
         result = create_team_member(user, team_member['teamId'], grafana_url, http_post_headers, verify_ssl,
                                         client_cert, debug)
         print("create team member: {0}, status: {1}, msg: {2}".format(team_member['name'], result[0], result[1]))
@@ -1,4 +1,4 @@
-import json
+from grafana_backup.serializer import dumps_json, loads_json
 from grafana_backup.dashboardApi import create_user, add_user_to_org
 
 
@@ -17,10 +17,10 @@ def main(args, settings, file_path):
         with open(file_path, 'r') as f:
             data = f.read()
 
-        user = json.loads(data)
+        user = loads_json(data)
         user.update({'password': default_password})
 
-        result = create_user(json.dumps(user), grafana_url, http_post_headers_basic_auth, verify_ssl, client_cert, debug)
+        result = create_user(dumps_json(user), grafana_url, http_post_headers_basic_auth, verify_ssl, client_cert, debug)
         print('create user "{0}" response status: {1}, msg: {2} \n'.format(user.get('login', ''), result[0], result[1]))
 
         if result[0] == 200:
@@ -29,7 +29,7 @@ def main(args, settings, file_path):
                     "loginOrEmail": user.get('login', 'email'),
                     "role": org.get('role', 'Viewer')
                 }
-                result = add_user_to_org(org.get('orgId'), json.dumps(org_payload), grafana_url, http_post_headers_basic_auth, verify_ssl, client_cert, debug)
+                result = add_user_to_org(org.get('orgId'), dumps_json(org_payload), grafana_url, http_post_headers_basic_auth, verify_ssl, client_cert, debug)
                 print('add user "{0}" to org: {1} response status: {2}, msg: {3}'.format(user.get('login', ''), org.get('name', ''), result[0], result[1]))
     else:
         print('[ERROR] Restoring users needs to set GRAFANA_ADMIN_ACCOUNT and GRAFANA_ADMIN_PASSWORD first. \n')
@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+# minute, hour, day of month, month, day of week (0 or 7 is sunday)
+CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+CRON_ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+}
+
+
+def parse_field(field, minimum, maximum):
+    values = set()
+    for part in field.split(','):
+        (value_range, _, step) = part.partition('/')
+        if value_range == '*':
+            (start, end) = (minimum, maximum)
+        elif '-' in value_range:
+            (start, end) = (int(value) for value in value_range.split('-', 1))
+        else:
+            start = end = int(value_range)
+            # 'n/step' runs from n to the end of the range
+            if step:
+                end = maximum
+        if start < minimum or end > maximum or start > end:
+            raise ValueError('{0} is out of range {1}-{2}'.format(part, minimum, maximum))
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return values
+
+
+def parse_cron(expression):
+    # Returns the allowed minutes, hours, days, months and weekdays of a 5 field cron expression
+    fields = CRON_ALIASES.get(expression.strip(), expression).split()
+    if len(fields) != 5:
+        raise ValueError("cron expression '{0}' must have 5 fields: minute hour day month weekday".format(expression))
+    try:
+        (minutes, hours, days, months, weekdays) = [parse_field(field, minimum, maximum)
+                                                    for (field, (minimum, maximum)) in zip(fields, CRON_FIELDS)]
+    except ValueError as e:
+        raise ValueError("invalid cron expression '{0}': {1}".format(expression, e))
+    if 7 in weekdays:
+        weekdays.add(0)
+    # Like cron, a restricted day of month and day of week match when either of them matches
+    return (minutes, hours, days, months, weekdays, fields[2] != '*', fields[4] != '*')
+
+
+def matches_day(schedule, moment):
+    (minutes, hours, days, months, weekdays, days_restricted, weekdays_restricted) = schedule
+    day_match = moment.day in days
+    # datetime.weekday() counts from monday, cron from sunday
+    weekday_match = (moment.weekday() + 1) % 7 in weekdays
+    if days_restricted and weekdays_restricted:
+        return moment.month in months and (day_match or weekday_match)
+    return moment.month in months and day_match and weekday_match
+
+
+def get_next_run(schedule, after):
+    # First minute after 'after' matching the parsed cron schedule
+    (minutes, hours) = schedule[:2]
+    moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    # Schedules like '0 0 29 2 *' only match in leap years, 5 years covers every valid expression
+    limit = moment + timedelta(days=5 * 366)
+    while moment < limit:
+        if not matches_day(schedule, moment):
+            moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+        elif moment.hour not in hours:
+            moment = moment.replace(minute=0) + timedelta(hours=1)
+        elif moment.minute not in minutes:
+            moment += timedelta(minutes=1)
+        else:
+            return moment
+    raise ValueError('cron schedule never matches')
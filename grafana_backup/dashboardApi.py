@@ -1,10 +1,31 @@
 import re
 import json
+import random
 import requests
 import sys
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import quote
 from grafana_backup.commons import log_response, to_python2_and_3_compatible_string
+from grafana_backup.report import report_request, report_item
+from grafana_backup.tracing import trace_request, NO_RESPONSE
 from packaging import version
 
+# Gateway errors and rate limiting are worth another attempt, everything else is returned to the caller as is
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+# Status of a request which got no response after all retries (connection error or timeout)
+NO_RESPONSE_STATUS = 599
+
+# timeout is in seconds, for connecting and for every read of the response, so a stalled connection is retried
+retry_settings = {'retries': 3, 'backoff': 0.5, 'max_backoff': 30.0, 'timeout': 60.0}
+request_stats = {'requests': 0, 'retries': 0, 'failed': 0}
+request_stats_lock = threading.Lock()
+# Requests of the item the current thread works on, used by restore to tell the outcome of a single item
+item_requests = threading.local()
+# One requests session per thread keeps the connections to Grafana open between requests (and runs of 'serve')
+http_sessions = threading.local()
+
 
 def health_check(grafana_url, http_get_headers, verify_ssl, client_cert, debug):
     url = '{0}/api/health'.format(grafana_url)
@@ -112,9 +133,18 @@ def contact_point_check(grafana_url, http_get_headers, verify_ssl, client_cert,
         return False
 
 
-def search_dashboard(page, limit, grafana_url, http_get_headers, verify_ssl, client_cert, debug):
-    url = '{0}/api/search/?type=dash-db&limit={1}&page={2}'.format(
-        grafana_url, limit, page)
+def build_search_query(folder_uids, tags, dashboard_uids):
+    # Filters of the search api, each given as a comma separated list. Dashboards must have all tags.
+    search_query = ''
+    for (parameter, values) in (('folderUIDs', folder_uids), ('tag', tags), ('dashboardUIDs', dashboard_uids)):
+        for value in (values.split(',') if values else []):
+            search_query += '&{0}={1}'.format(parameter, quote(value))
+    return search_query
+
+
+def search_dashboard(page, limit, grafana_url, http_get_headers, verify_ssl, client_cert, debug, search_query=''):
+    url = '{0}/api/search/?type=dash-db&limit={1}&page={2}{3}'.format(
+        grafana_url, limit, page, search_query)
     print("search dashboard in grafana: {0}".format(url))
     return send_grafana_get(url, http_get_headers, verify_ssl, client_cert, debug)
 
@@ -138,6 +168,17 @@ def create_library_element(library_element, grafana_url, http_post_headers, veri
     return send_grafana_post(url, library_element, http_post_headers, verify_ssl, client_cert, debug)
 
 
+def get_library_element(uid, grafana_url, http_get_headers, verify_ssl, client_cert, debug):
+    return send_grafana_get('{0}/api/library-elements/{1}'.format(grafana_url, uid), http_get_headers, verify_ssl,
+                            client_cert, debug)
+
+
+def update_library_element(uid, payload, grafana_url, http_post_headers, verify_ssl, client_cert, debug):
+    # The payload carries the version of the live element, a concurrent change makes the request fail instead of being lost
+    return send_grafana_patch('{0}/api/library-elements/{1}'.format(grafana_url, uid), payload, http_post_headers, verify_ssl,
+                              client_cert, debug)
+
+
 def delete_library_element(id_, grafana_url, http_get_headers, verify_ssl, client_cert, debug):
     return send_grafana_delete('{0}/api/library-elements/{1}'.format(grafana_url, id_), http_get_headers,
                                verify_ssl, client_cert)
@@ -256,7 +297,7 @@ def pause_alert(id_, grafana_url, http_post_headers, verify_ssl, client_cert, de
     url = '{0}/api/alerts/{1}/pause'.format(grafana_url, id_)
     payload = '{ "paused": true }'
     (status_code, content) = send_grafana_post(
-        url, payload, http_post_headers, verify_ssl, client_cert, debug)
+        url, payload, http_post_headers, verify_ssl, client_cert, debug, idempotent=True)
     return (status_code, content)
 
 
@@ -264,7 +305,7 @@ def unpause_alert(id_, grafana_url, http_post_headers, verify_ssl, client_cert,
     url = '{0}/api/alerts/{1}/pause'.format(grafana_url, id_)
     payload = '{ "paused": false }'
     (status_code, content) = send_grafana_post(
-        url, payload, http_post_headers, verify_ssl, client_cert, debug)
+        url, payload, http_post_headers, verify_ssl, client_cert, debug, idempotent=True)
     return (status_code, content)
 
 
@@ -289,8 +330,9 @@ def delete_dashboard_by_slug(slug, grafana_url, http_post_headers, verify_ssl, c
 
 
 def create_dashboard(payload, grafana_url, http_post_headers, verify_ssl, client_cert, debug):
+    # Dashboards are always posted with 'overwrite: True', so repeating the request is safe
     return send_grafana_post('{0}/api/dashboards/db'.format(grafana_url), payload, http_post_headers, verify_ssl,
-                             client_cert, debug)
+                             client_cert, debug, idempotent=True)
 
 
 def search_datasource(grafana_url, http_get_headers, verify_ssl, client_cert, debug):
@@ -320,6 +362,11 @@ def create_datasource(payload, grafana_url, http_post_headers, verify_ssl, clien
                              client_cert, debug)
 
 
+def update_datasource(uid, payload, grafana_url, http_post_headers, verify_ssl, client_cert, debug):
+    return send_grafana_put('{0}/api/datasources/uid/{1}'.format(grafana_url, uid), payload, http_post_headers, verify_ssl,
+                            client_cert, debug)
+
+
 def delete_datasource_by_uid(uid, grafana_url, http_post_headers, verify_ssl, client_cert, debug):
     return send_grafana_delete('{0}/api/datasources/uid/{1}'.format(grafana_url, uid), http_post_headers, verify_ssl,
                                client_cert, debug)
@@ -336,6 +383,12 @@ def search_folders(grafana_url, http_get_headers, verify_ssl, client_cert, debug
                             client_cert, debug)
 
 
+def search_folder_page(page, limit, grafana_url, http_get_headers, verify_ssl, client_cert, debug):
+    url = '{0}/api/search/?type=dash-folder&limit={1}&page={2}'.format(grafana_url, limit, page)
+    print("search folder in grafana: {0}".format(url))
+    return send_grafana_get(url, http_get_headers, verify_ssl, client_cert, debug)
+
+
 def get_folder(uid, grafana_url, http_get_headers, verify_ssl, client_cert, debug):
     (status_code, content) = send_grafana_get('{0}/api/folders/{1}'.format(grafana_url, uid), http_get_headers,
                                               verify_ssl, client_cert, debug)
@@ -352,8 +405,9 @@ def get_folder_permissions(uid, grafana_url, http_get_headers, verify_ssl, clien
 
 def update_folder_permissions(payload, grafana_url, http_post_headers, verify_ssl, client_cert, debug):
     items = json.dumps({'items': payload})
+    # The permissions endpoint replaces the whole permission list, so repeating the request is safe
     return send_grafana_post('{0}/api/folders/{1}/permissions'.format(grafana_url, payload[0]['uid']), items, http_post_headers, verify_ssl, client_cert,
-                             debug)
+                             debug, idempotent=True)
 
 
 def get_folder_id(dashboard, grafana_url, http_post_headers, verify_ssl, client_cert, debug):
@@ -385,6 +439,11 @@ def get_folder_id(dashboard, grafana_url, http_post_headers, verify_ssl, client_
         return 0
 
 
+def update_folder(uid, payload, grafana_url, http_post_headers, verify_ssl, client_cert, debug):
+    return send_grafana_put('{0}/api/folders/{1}'.format(grafana_url, uid), payload, http_post_headers, verify_ssl,
+                            client_cert, debug)
+
+
 def create_folder(payload, grafana_url, http_post_headers, verify_ssl, client_cert, debug):
     return send_grafana_post('{0}/api/folders'.format(grafana_url), payload, http_post_headers, verify_ssl, client_cert,
                              debug)
@@ -503,7 +562,7 @@ def update_notification_template(name, json_payload, grafana_url, http_post_head
 
 def get_grafana_version(grafana_url, verify_ssl, http_get_headers):
     r = requests.get('{0}/api/health'.format(grafana_url),
-                     verify=verify_ssl, headers=http_get_headers)
+                     verify=verify_ssl, headers=http_get_headers, timeout=retry_settings['timeout'])
     if r.status_code == 200:
         if 'version' in r.json().keys():
             version_str = r.json()['version']
@@ -526,9 +585,125 @@ def get_grafana_version(grafana_url, verify_ssl, http_get_headers):
             "Unable to get version, returned response: {0}".format(r.status_code))
 
 
+def configure_retries(settings):
+    retry_settings['retries'] = int(settings.get('HTTP_RETRIES', retry_settings['retries']))
+    retry_settings['backoff'] = float(settings.get('HTTP_RETRY_BACKOFF', retry_settings['backoff']))
+    retry_settings['max_backoff'] = float(settings.get('HTTP_RETRY_MAX_BACKOFF', retry_settings['max_backoff']))
+    retry_settings['timeout'] = float(settings.get('HTTP_TIMEOUT', retry_settings['timeout']))
+
+
+def is_transient_status(status_code):
+    return status_code in RETRY_STATUS_CODES or status_code == NO_RESPONSE_STATUS
+
+
+class NoResponse(object):
+    # Returned instead of raising when a request got no response after all retries, so callers defer or fail
+    # the item like any other transient error instead of aborting the run
+
+    def __init__(self, error):
+        self.status_code = NO_RESPONSE_STATUS
+        self.text = str(error)
+        self.content = b''
+        self.headers = {}
+
+    def json(self):
+        raise ValueError(self.text)
+
+
+def get_retry_delay(attempt, response=None):
+    # Honour Retry-After (in seconds) when Grafana or a proxy sends it, otherwise use full jitter exponential backoff
+    if response is not None and response.headers.get('Retry-After', '').isdigit():
+        return min(float(response.headers['Retry-After']), retry_settings['max_backoff'])
+    return random.uniform(0, min(retry_settings['max_backoff'], retry_settings['backoff'] * (2 ** attempt)))
+
+
+def print_request_summary():
+    print("requests: {0}, retries: {1}, failed after retries: {2}".format(
+        request_stats['requests'], request_stats['retries'], request_stats['failed']))
+
+
+def reset_request_stats():
+    with request_stats_lock:
+        for key in request_stats:
+            request_stats[key] = 0
+
+
+def count_request(key):
+    # Requests are sent from worker threads too ('save --all-orgs', the live fetch of 'restore --plan')
+    with request_stats_lock:
+        request_stats[key] += 1
+
+
+def start_item_requests():
+    item_requests.write_statuses = []
+    item_requests.failures = []
+
+
+def get_item_requests():
+    # ((method, status) of the write requests, idempotent flag of every request failed after all retries)
+    # since start_item_requests
+    return (getattr(item_requests, 'write_statuses', []), getattr(item_requests, 'failures', []))
+
+
+def count_item_failure(idempotent):
+    count_request('failed')
+    if hasattr(item_requests, 'failures'):
+        item_requests.failures.append(idempotent)
+
+
+def get_http_session():
+    session = getattr(http_sessions, 'session', None)
+    if session is None:
+        session = requests.Session()
+        # Only the pooled connections are shared, cookies could mix up the credentials of different orgs
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        http_sessions.session = session
+    return session
+
+
+def send_grafana_request(method, url, idempotent, **kwargs):
+    # Only requests which can be repeated without side effects are retried, everything else gets exactly one attempt
+    retries = retry_settings['retries'] if idempotent else 0
+    attempt = 0
+    while True:
+        count_request('requests')
+        response = None
+        start = time.time()
+        try:
+            response = get_http_session().request(method, url, timeout=retry_settings['timeout'], **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            report_request(time.time() - start)
+            trace_request(method, url, NO_RESPONSE, 0, start, time.time() - start)
+            if attempt >= retries:
+                count_item_failure(idempotent)
+                print("[ERROR] {0} {1} failed: {2}".format(method, url, str(e)))
+                response = NoResponse(e)
+                break
+            print("[WARN] {0} {1} failed: {2}, retrying ({3}/{4})".format(method, url, str(e), attempt + 1, retries))
+        else:
+            elapsed = time.time() - start
+            report_request(elapsed)
+            trace_request(method, url, response.status_code, len(response.content), start, elapsed)
+            if not is_transient_status(response.status_code):
+                break
+            if attempt >= retries:
+                count_item_failure(idempotent)
+                break
+            print("[WARN] {0} {1} returned {2}, retrying ({3}/{4})".format(
+                method, url, response.status_code, attempt + 1, retries))
+
+        count_request('retries')
+        time.sleep(get_retry_delay(attempt, response))
+        attempt += 1
+
+    if method != 'GET' and hasattr(item_requests, 'write_statuses'):
+        item_requests.write_statuses.append((method, response.status_code))
+    return response
+
+
 def send_grafana_get(url, http_get_headers, verify_ssl, client_cert, debug):
-    r = requests.get(url, headers=http_get_headers,
-                     verify=verify_ssl, cert=client_cert)
+    r = send_grafana_request('GET', url, True, headers=http_get_headers,
+                             verify=verify_ssl, cert=client_cert)
     try:
         status_message = r.json()
     except ValueError:
@@ -539,9 +714,9 @@ def send_grafana_get(url, http_get_headers, verify_ssl, client_cert, debug):
     return (r.status_code, status_message)
 
 
-def send_grafana_post(url, json_payload, http_post_headers, verify_ssl=False, client_cert=None, debug=True):
-    r = requests.post(url, headers=http_post_headers,
-                      data=json_payload, verify=verify_ssl, cert=client_cert)
+def send_grafana_post(url, json_payload, http_post_headers, verify_ssl=False, client_cert=None, debug=True, idempotent=False):
+    r = send_grafana_request('POST', url, idempotent, headers=http_post_headers,
+                             data=json_payload, verify=verify_ssl, cert=client_cert)
     if debug:
         log_response(r)
     try:
@@ -550,15 +725,30 @@ def send_grafana_post(url, json_payload, http_post_headers, verify_ssl=False, cl
         return (r.status_code, r.text)
 
 
-def send_grafana_put(url, json_payload, http_post_headers, verify_ssl=False, client_cert=None, debug=True):
-    r = requests.put(url, headers=http_post_headers,
-                     data=json_payload, verify=verify_ssl, cert=client_cert)
+def send_grafana_put(url, json_payload, http_post_headers, verify_ssl=False, client_cert=None, debug=True, idempotent=True):
+    r = send_grafana_request('PUT', url, idempotent, headers=http_post_headers,
+                             data=json_payload, verify=verify_ssl, cert=client_cert)
     if debug:
         log_response(r)
-    return (r.status_code, r.json())
+    try:
+        return (r.status_code, r.json())
+    except ValueError:
+        return (r.status_code, r.text)
+
+
+def send_grafana_patch(url, json_payload, http_post_headers, verify_ssl=False, client_cert=None, debug=True):
+    r = send_grafana_request('PATCH', url, False, headers=http_post_headers,
+                             data=json_payload, verify=verify_ssl, cert=client_cert)
+    if debug:
+        log_response(r)
+    try:
+        return (r.status_code, r.json())
+    except ValueError:
+        return (r.status_code, r.text)
 
 
 def send_grafana_delete(url, http_get_headers, verify_ssl=False, client_cert=None, debug=True):
-    r = requests.delete(url, headers=http_get_headers,
-                        verify=verify_ssl, cert=client_cert)
+    r = send_grafana_request('DELETE', url, True, headers=http_get_headers,
+                             verify=verify_ssl, cert=client_cert)
+    report_item(url, 'deleted' if r.status_code < 300 else 'failed')
     return int(r.status_code)
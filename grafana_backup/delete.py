@@ -7,6 +7,10 @@ from grafana_backup.delete_alert_channels import main as delete_alert_channels
 from grafana_backup.delete_snapshots import main as delete_snapshots
 from grafana_backup.delete_annotations import main as delete_annotations
 from grafana_backup.delete_team_members import main as delete_team_members
+from grafana_backup.dashboardApi import configure_retries, print_request_summary, reset_request_stats, request_stats
+from grafana_backup.tracing import configure_tracing
+from grafana_backup.report import start_report, report_component, get_report, write_report
+from grafana_backup.commons import print_horizontal_line
 import sys
 
 
@@ -24,6 +28,11 @@ def main(args, settings):
                         'library-element': delete_library_elements,
                         'team-member': delete_team_members}
 
+    configure_retries(settings)
+    reset_request_stats()
+    configure_tracing(settings)
+    start_report('delete')
+
     (status, json_resp, dashboard_uid_support,
      datasource_uid_support, paging_support, is_contact_point_available) = api_checks(settings)
 
@@ -41,8 +50,14 @@ def main(args, settings):
 
         # Delete only the components that provided via an argument
         for delete_function in arg_components_list:
-            delete_functions[delete_function](args, settings)
+            with report_component(delete_function):
+                delete_functions[delete_function](args, settings)
     else:
         # delete every component
         for delete_function in delete_functions.keys():
-            delete_functions[delete_function](args, settings)
+            with report_component(delete_function):
+                delete_functions[delete_function](args, settings)
+
+    print_horizontal_line()
+    print_request_summary()
+    write_report(settings, get_report(request_stats=dict(request_stats)))
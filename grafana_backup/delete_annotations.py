@@ -1,6 +1,7 @@
 import time
 from grafana_backup.dashboardApi import search_annotations, delete_annotation
 from grafana_backup.commons import print_horizontal_line
+from grafana_backup.report import count_found
 
 
 def main(args, settings):
@@ -28,6 +29,7 @@ def get_all_annotations_and_delete(grafana_url, http_get_headers, verify_ssl, cl
         if status_code_and_content[0] == 200:
             annotations = status_code_and_content[1]
             print("There are {0} annotations:".format(len(annotations)))
+            count_found(len(annotations))
             for annotation in annotations:
                 status = delete_annotation(annotation['id'], grafana_url, http_get_headers, verify_ssl, client_cert, debug)
                 if status == 200:
@@ -1,5 +1,6 @@
 from grafana_backup.dashboardApi import search_dashboard, delete_dashboard_by_uid, delete_dashboard_by_slug
 from grafana_backup.commons import to_python2_and_3_compatible_string, print_horizontal_line
+from grafana_backup.report import count_found
 
 
 def main(args, settings):
@@ -29,6 +30,7 @@ def get_all_dashboards_in_grafana(page, limit, grafana_url, http_get_headers, ve
     if status == 200:
         dashboards = content
         print("There are {0} dashboards:".format(len(dashboards)))
+        count_found(len(dashboards))
         for board in dashboards:
             print('name: {0}'.format(to_python2_and_3_compatible_string(board['title'])))
         return dashboards
@@ -1,5 +1,6 @@
 from grafana_backup.dashboardApi import search_datasource, delete_datasource_by_uid, delete_datasource_by_id
 from grafana_backup.commons import print_horizontal_line
+from grafana_backup.report import count_found
 
 
 def main(args, settings):
@@ -20,6 +21,7 @@ def get_all_datasources_and_delete(grafana_url, http_get_headers, verify_ssl, cl
     if status_code_and_content[0] == 200:
         datasources = status_code_and_content[1]
         print("There are {0} datasources:".format(len(datasources)))
+        count_found(len(datasources))
         for datasource in datasources:
             print(datasource)
             if uid_support:
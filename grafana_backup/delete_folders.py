@@ -1,5 +1,6 @@
 from grafana_backup.dashboardApi import search_folders, delete_folder
 from grafana_backup.commons import to_python2_and_3_compatible_string, print_horizontal_line
+from grafana_backup.report import count_found
 
 
 def main(args, settings):
@@ -24,6 +25,7 @@ def get_all_folders_in_grafana(grafana_url, http_get_headers, verify_ssl, client
     if status == 200:
         folders = content
         print("There are {0} folders:".format(len(content)))
+        count_found(len(content))
         for folder in folders:
             print("name: {0}".format(to_python2_and_3_compatible_string(folder['title'])))
         return folders
@@ -1,6 +1,7 @@
 from grafana_backup.dashboardApi import search_library_elements
 from grafana_backup.dashboardApi import delete_library_element
 from grafana_backup.commons import to_python2_and_3_compatible_string, print_horizontal_line
+from grafana_backup.report import count_found
 
 
 def main(args, settings):
@@ -23,6 +24,7 @@ def get_all_library_elements_in_grafana(grafana_url, http_get_headers, verify_ss
     if status == 200:
         library_elements = content['result']['elements']
         print("There are {0} library elements:".format(len(library_elements)))
+        count_found(len(library_elements))
         for library_element in library_elements:
             print("name: {0}".format(to_python2_and_3_compatible_string(library_element['name'])))
         return library_elements
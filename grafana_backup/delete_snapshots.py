@@ -1,5 +1,6 @@
 from grafana_backup.dashboardApi import search_snapshot, delete_snapshot
 from grafana_backup.commons import print_horizontal_line
+from grafana_backup.report import count_found
 
 
 def main(args, settings):
@@ -19,6 +20,7 @@ def get_all_snapshots_and_delete(grafana_url, http_get_headers, verify_ssl, clie
     if status_code_and_content[0] == 200:
         snapshots = status_code_and_content[1]
         print("There are {0} snapshots:".format(len(snapshots)))
+        count_found(len(snapshots))
         for snapshot in snapshots:
             print(snapshot)
             status = delete_snapshot(snapshot['key'], grafana_url, http_get_headers, verify_ssl, client_cert, debug)
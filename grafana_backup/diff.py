@@ -0,0 +1,187 @@
+from grafana_backup.archive import ARCHIVE_FOLDERS
+from grafana_backup.compression import open_archive_reader, iter_archive_members
+from grafana_backup.commons import load_archive_index, get_member_key, ARCHIVE_INDEX_FILE, CHECKPOINT_FILE
+from grafana_backup.serializer import loads_json, dumps_json
+from grafana_backup.verify import get_member_hash
+import collections
+import os
+import sys
+
+# Changed values printed per dashboard with --json-diff
+MAX_JSON_CHANGES = 20
+MAX_VALUE_LENGTH = 80
+
+
+class Missing(object):
+    # Value of a key or list item which only one of the objects has
+
+    def __repr__(self):
+        return '(missing)'
+
+
+MISSING = Missing()
+
+
+def main(args, settings):
+    # Returns True if the archives differ
+    archive_file = args.get('<archive_file>')
+    other_archive_file = args.get('<other_archive_file>')
+    arg_components = args.get('--components', None)
+    components = arg_components.replace('-', '_').split(',') if arg_components else None
+
+    (hashes, titles) = get_archive_hashes(archive_file, components)
+    (other_hashes, other_titles) = get_archive_hashes(other_archive_file, components)
+    titles.update(other_titles)
+
+    changes = get_changes(hashes, other_hashes)
+    print_changes(changes, titles, archive_file, other_archive_file)
+
+    changed_dashboards = set(key for key in changes['changed'] if get_component(key) == 'dashboard')
+    if args.get('--json-diff', False) and changed_dashboards:
+        print_json_diff(archive_file, other_archive_file, changed_dashboards)
+    return any(changes[change] for change in ('added', 'removed', 'changed'))
+
+
+def open_archive(archive_file):
+    try:
+        return open_archive_reader(open(archive_file, 'rb'))
+    except Exception as e:
+        print(str(e))
+        sys.exit(1)
+
+
+def get_object_key(member_name):
+    # Path of an object without the backup dir and the timestamp, the same in every backup of an instance:
+    # '<backup dir>/orgs/2/dashboards/<timestamp>/abc.dashboard' -> 'orgs/2/dashboards/abc.dashboard'.
+    # Component folders are followed by the timestamp and at least one more part, searched from the right
+    # so a backup dir or a uid named like a component folder is not taken for one
+    parts = get_member_key(member_name).split('/')
+    for position in range(len(parts) - 3, -1, -1):
+        if parts[position] in ARCHIVE_FOLDERS:
+            prefix = parts[position - 2:position] if position >= 2 and parts[position - 2] == 'orgs' else []
+            return '/'.join(prefix + [parts[position]] + parts[position + 2:])
+    return None
+
+
+def get_component(object_key):
+    return os.path.splitext(object_key)[1][1:]
+
+
+def is_object(object_key):
+    # Log files and checkpoints are not objects
+    if object_key is None or os.path.basename(object_key) == CHECKPOINT_FILE:
+        return False
+    return get_component(object_key) not in ('', 'txt')
+
+
+def get_archive_hashes(archive_file, components=None):
+    # object key -> (sha256, size) of every object, and object key -> title from the archive index.
+    # When the archive index comes first and has the hash of every object the rest of the archive is not read
+    print('hashing {0}'.format(archive_file))
+    hashes = {}
+    index_hashes = {}
+    index_complete = True
+    titles = {}
+    for (member_name, f) in iter_archive_members(open_archive(archive_file)):
+        if os.path.basename(member_name) == ARCHIVE_INDEX_FILE:
+            for (path, entry) in load_archive_index(line.decode('utf8') for line in f).items():
+                object_key = get_object_key(path)
+                titles[object_key] = entry.get('title')
+                if not is_selected(object_key, components):
+                    continue
+                if entry.get('sha256'):
+                    index_hashes[object_key] = (entry['sha256'], entry.get('size'))
+                else:
+                    # Archives created before the index had hashes
+                    index_complete = False
+            continue
+        if index_hashes and index_complete and not hashes:
+            print('using the hashes of the archive index')
+            return (index_hashes, titles)
+        object_key = get_object_key(member_name)
+        if not is_selected(object_key, components):
+            continue
+        hashes[object_key] = get_member_hash(f)
+    return (hashes or index_hashes, titles)
+
+
+def is_selected(object_key, components):
+    return is_object(object_key) and (not components or get_component(object_key) in components)
+
+
+def get_changes(hashes, other_hashes):
+    changes = {'added': [], 'removed': [], 'changed': [], 'unchanged': []}
+    for object_key in sorted(set(hashes) | set(other_hashes)):
+        if object_key not in hashes:
+            changes['added'].append(object_key)
+        elif object_key not in other_hashes:
+            changes['removed'].append(object_key)
+        elif hashes[object_key][0] != other_hashes[object_key][0]:
+            changes['changed'].append(object_key)
+        else:
+            changes['unchanged'].append(object_key)
+    return changes
+
+
+def print_changes(changes, titles, archive_file, other_archive_file):
+    print('\ncomparing {0} to {1}'.format(archive_file, other_archive_file))
+    counts = collections.OrderedDict()
+    for (change, object_keys) in changes.items():
+        for object_key in object_keys:
+            counts.setdefault(get_component(object_key), collections.Counter())[change] += 1
+
+    print('{0:<24}{1:>10}{2:>10}{3:>10}{4:>10}'.format('component', 'added', 'removed', 'changed', 'unchanged'))
+    for (component, component_counts) in sorted(counts.items()):
+        print('{0:<24}{1:>10}{2:>10}{3:>10}{4:>10}'.format(component, component_counts['added'], component_counts['removed'],
+                                                           component_counts['changed'], component_counts['unchanged']))
+
+    for (change, sign) in (('added', '+'), ('removed', '-'), ('changed', '~')):
+        for object_key in changes[change]:
+            title = titles.get(object_key)
+            print('{0} {1}{2}'.format(sign, object_key, ' ({0})'.format(title) if title else ''))
+
+
+def read_objects(archive_file, object_keys):
+    # Content of the given objects, the archive is read once more but only these members are decoded
+    objects = {}
+    for (member_name, f) in iter_archive_members(open_archive(archive_file)):
+        object_key = get_object_key(member_name)
+        if object_key in object_keys:
+            objects[object_key] = loads_json(f.read().decode('utf8'))
+    return objects
+
+
+def print_json_diff(archive_file, other_archive_file, object_keys):
+    # Only the changed objects of the first archive are held in memory, the other archive is compared as it is read
+    objects = read_objects(archive_file, object_keys)
+    for (member_name, f) in iter_archive_members(open_archive(other_archive_file)):
+        object_key = get_object_key(member_name)
+        if object_key not in objects:
+            continue
+        print('\n~ {0}'.format(object_key))
+        changed_values = list(get_json_changes(objects.pop(object_key), loads_json(f.read().decode('utf8'))))
+        for (path, value, other_value) in changed_values[:MAX_JSON_CHANGES]:
+            print('  {0}: {1} -> {2}'.format(path or '.', format_value(value), format_value(other_value)))
+        if len(changed_values) > MAX_JSON_CHANGES:
+            print('  ... {0} more changes'.format(len(changed_values) - MAX_JSON_CHANGES))
+
+
+def get_json_changes(value, other_value, path=''):
+    # (path, value, other value) of every value which differs, lists are compared item by item
+    if isinstance(value, dict) and isinstance(other_value, dict):
+        for key in sorted(set(value) | set(other_value), key=str):
+            for change in get_json_changes(value.get(key, MISSING), other_value.get(key, MISSING), '{0}.{1}'.format(path, key)):
+                yield change
+    elif isinstance(value, list) and isinstance(other_value, list):
+        for position in range(max(len(value), len(other_value))):
+            for change in get_json_changes(value[position] if position < len(value) else MISSING,
+                                           other_value[position] if position < len(other_value) else MISSING,
+                                           '{0}[{1}]'.format(path, position)):
+                yield change
+    elif value != other_value:
+        yield (path, value, other_value)
+
+
+def format_value(value):
+    text = repr(value) if value is MISSING else dumps_json(value)
+    return text if len(text) <= MAX_VALUE_LENGTH else text[:MAX_VALUE_LENGTH - 3] + '...'
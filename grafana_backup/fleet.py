@@ -0,0 +1,149 @@
+from grafana_backup.grafanaSettings import main as conf
+from grafana_backup.save import main as save
+from grafana_backup.archive import get_archive_file
+from grafana_backup.commons import load_config, print_horizontal_line
+from datetime import datetime
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import sys
+import time
+import traceback
+
+
+def main(args, settings):
+    arg_fleet_file = args.get('<fleet_file>', None)
+    fleet = load_config(arg_fleet_file)
+
+    instances = fleet.get('instances', [])
+    concurrency = args.get('--concurrency') or fleet.get('concurrency', 4)
+    report_dir = fleet.get('report_dir', settings.get('BACKUP_DIR'))
+    timestamp = datetime.today().strftime(settings.get('BACKUP_FILE_FORMAT'))
+
+    names = [instance['name'] for instance in instances]
+    if len(set(names)) != len(names):
+        print('[ERROR] instance names of {0} must be unique, they are used as backup folder'.format(arg_fleet_file))
+        sys.exit(1)
+
+    log_dir = '{0}/fleet_{1}'.format(report_dir, timestamp)
+    if not os.path.exists(log_dir):
+        os.makedirs(log_dir)
+
+    print('saving {0} instances, {1} at a time, logs in {2}'.format(len(instances), concurrency, log_dir))
+    start = time.time()
+    results = run_instances(args, instances, int(concurrency), log_dir)
+
+    report = {
+        'timestamp': timestamp,
+        'duration': round(time.time() - start, 3),
+        'summary': dict((status, sum(1 for result in results if result['status'] == status))
+                        for status in ('ok', 'partial', 'failed', 'timeout')),
+        'instances': results,
+    }
+    report_file = '{0}/fleet_{1}.json'.format(report_dir, timestamp)
+    with open(report_file, 'w') as f:
+        f.write(json.dumps(report, sort_keys=True, indent=4, separators=(',', ': ')))
+
+    print_horizontal_line()
+    for result in results:
+        print('{0}: {1} in {2}s, archive: {3}, failed items: {4}'.format(
+            result['name'], result['status'], result['duration'], result['archive_file'], len(result['failed_items'])))
+    print('fleet report: {0}'.format(report_file))
+
+    if report['summary']['failed'] or report['summary']['timeout']:
+        sys.exit(1)
+
+
+def run_instances(args, instances, concurrency, log_dir):
+    # Every instance runs in its own process: the component modules keep per run state in module globals.
+    # Forked workers start with all modules already imported.
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context()
+
+    pending = list(instances)
+    running = {}
+    results = {}
+    while pending or running:
+        while pending and len(running) < concurrency:
+            instance = pending.pop(0)
+            # One pipe per instance, a worker terminated on timeout can not block the others
+            (receiver, sender) = context.Pipe(duplex=False)
+            process = context.Process(target=run_instance, args=(args, instance, log_dir, sender))
+            process.start()
+            sender.close()
+            running[instance['name']] = (process, instance, receiver, time.time())
+            print('started {0} ({1})'.format(instance['name'], instance['config']))
+
+        multiprocessing.connection.wait([receiver for (process, instance, receiver, started) in running.values()], timeout=1)
+
+        for (name, (process, instance, receiver, started)) in list(running.items()):
+            try:
+                if receiver.poll():
+                    results[name] = receiver.recv()
+            except EOFError:
+                pass
+
+            timeout = instance.get('timeout')
+            if name not in results and timeout and time.time() - started > timeout:
+                process.terminate()
+                results[name] = get_result(instance, log_dir, 'timeout', time.time() - started)
+            elif name not in results and process.is_alive():
+                continue
+
+            process.join()
+            receiver.close()
+            if name not in results:
+                # The process died before it could report
+                results[name] = get_result(instance, log_dir, 'failed', time.time() - started)
+            results[name]['exit_code'] = process.exitcode
+            print('finished {0}: {1}'.format(name, results[name]['status']))
+            del running[name]
+
+    return [results[instance['name']] for instance in instances]
+
+
+def get_result(instance, log_dir, status, duration):
+    return {
+        'name': instance['name'],
+        'config': instance['config'],
+        'status': status,
+        'duration': round(duration, 3),
+        'archive_file': None,
+        'failed_items': [],
+        'log_file': '{0}/{1}.log'.format(log_dir, instance['name']),
+        'exit_code': None,
+    }
+
+
+def run_instance(args, instance, log_dir, sender):
+    start = time.time()
+    result = get_result(instance, log_dir, 'failed', 0)
+
+    with open(result['log_file'], 'w') as log_file:
+        sys.stdout = log_file
+        sys.stderr = log_file
+        try:
+            settings = conf(instance['config'])
+            # Instances may share a config template, each one gets its own folder for archives and journals
+            settings['BACKUP_DIR'] = '{0}/{1}'.format(settings.get('BACKUP_DIR'), instance['name'])
+
+            instance_args = dict(args)
+            instance_args['--components'] = instance.get('components', args.get('--components'))
+            failed_items = save(instance_args, settings)
+
+            result['failed_items'] = failed_items
+            result['status'] = 'partial' if failed_items else 'ok'
+            if not args.get('--no-archive', False):
+                result['archive_file'] = get_archive_file(settings)
+        except SystemExit as e:
+            print('save exited with status {0}'.format(e.code))
+        except Exception:
+            traceback.print_exc()
+        finally:
+            result['duration'] = round(time.time() - start, 3)
+            log_file.flush()
+            sender.send(result)
+            sender.close()
@@ -1,16 +1,16 @@
 from google import api_core
 from google.cloud import storage
+from grafana_backup.compression import get_archive_file_name
 
 
 def main(args, settings):
     bucket_name = settings.get('GCS_BUCKET_NAME')
     bucket_path = settings.get('GCS_BUCKET_PATH').strip('/')
     backup_dir = settings.get('BACKUP_DIR')
-    timestamp = settings.get('TIMESTAMP')
 
     storage_client = storage.Client()
 
-    gcs_file_name = '{0}.tar.gz'.format(timestamp)
+    gcs_file_name = get_archive_file_name(settings)
     archive_file = '{0}/{1}'.format(backup_dir, gcs_file_name)
     gcs_blob_name = gcs_file_name if bucket_path == '' else '{0}/{1}'.format(bucket_path, gcs_file_name)
 
@@ -23,12 +23,33 @@ def main(config_path):
     debug = config.get('general', {}).get('debug', True)
     api_health_check = config.get('general', {}).get('api_health_check', True)
     api_auth_check = config.get('general', {}).get('api_auth_check', True)
+    api_check_cache_ttl = config.get('general', {}).get('api_check_cache_ttl', 3600)
     verify_ssl = config.get('general', {}).get('verify_ssl', False)
     client_cert = config.get('general', {}).get('client_cert', None)
     backup_dir = config.get('general', {}).get('backup_dir', '_OUTPUT_')
     backup_file_format = config.get('general', {}).get('backup_file_format', '%Y%m%d%H%M')
     uid_dashboard_slug_suffix = config.get('general', {}).get('uid_dashboard_slug_suffix', False)
     pretty_print = config.get('general', {}).get('pretty_print', False)
+    http_retries = config.get('general', {}).get('http_retries', 3)
+    http_retry_backoff = config.get('general', {}).get('http_retry_backoff', 0.5)
+    http_retry_max_backoff = config.get('general', {}).get('http_retry_max_backoff', 30)
+    http_timeout = config.get('general', {}).get('http_timeout', 60)
+    archive_codec = config.get('general', {}).get('archive_codec', 'gzip')
+    archive_compression_level = config.get('general', {}).get('archive_compression_level', None)
+    archive_compression_threads = config.get('general', {}).get('archive_compression_threads', 1)
+    archive_stream = config.get('general', {}).get('archive_stream', False)
+    json_backend = config.get('general', {}).get('json_backend', 'auto')
+    profiler = config.get('general', {}).get('profiler', 'auto')
+    org_workers = config.get('general', {}).get('org_workers', 4)
+    restore_workers = config.get('general', {}).get('restore_workers', 8)
+    run_report = config.get('general', {}).get('run_report', True)
+    otel_traces = config.get('general', {}).get('otel_traces', False)
+    otel_service_name = config.get('general', {}).get('otel_service_name', 'grafana-backup')
+
+    # Settings of the long running 'serve' mode
+    serve_host = config.get('serve', {}).get('host', '127.0.0.1')
+    serve_port = config.get('serve', {}).get('port', 8765)
+    serve_schedules = config.get('serve', {}).get('schedules', [])
 
     # Cloud storage settings - AWS
     aws_s3_bucket_name = config.get('aws', {}).get('s3_bucket_name', '')
@@ -53,6 +74,10 @@ def main(config_path):
     influxdb_password = config.get('influxdb', {}).get('password', '')
     influxdb_database = config.get('influxdb', {}).get('database', '')
 
+    prometheus_textfile = config.get('prometheus', {}).get('textfile', '')
+    prometheus_pushgateway_url = config.get('prometheus', {}).get('pushgateway_url', '')
+    prometheus_job = config.get('prometheus', {}).get('job', 'grafana_backup')
+
     admin_account = config.get('grafana', {}).get('admin_account', '')
     admin_password = config.get('grafana', {}).get('admin_password', '')
 
@@ -84,6 +109,10 @@ def main(config_path):
     INFLUXDB_PASSWORD = os.getenv('INFLUXDB_PASSWORD', influxdb_password)
     INFLUXDB_DATABASE = os.getenv('INFLUXDB_DATABASE', influxdb_database)
 
+    PROMETHEUS_TEXTFILE = os.getenv('PROMETHEUS_TEXTFILE', prometheus_textfile)
+    PROMETHEUS_PUSHGATEWAY_URL = os.getenv('PROMETHEUS_PUSHGATEWAY_URL', prometheus_pushgateway_url)
+    PROMETHEUS_JOB = os.getenv('PROMETHEUS_JOB', prometheus_job)
+
     ADMIN_ACCOUNT = os.getenv('GRAFANA_ADMIN_ACCOUNT', admin_account)
     ADMIN_PASSWORD = os.getenv('GRAFANA_ADMIN_PASSWORD', admin_password)
     GRAFANA_BASIC_AUTH = os.getenv('GRAFANA_BASIC_AUTH', None)
@@ -104,6 +133,8 @@ def main(config_path):
     if isinstance(API_AUTH_CHECK, str):
         API_AUTH_CHECK = json.loads(API_AUTH_CHECK.lower())  # convert environment variable string to bool
 
+    API_CHECK_CACHE_TTL = int(os.getenv('API_CHECK_CACHE_TTL', api_check_cache_ttl))
+
     CLIENT_CERT = os.getenv('CLIENT_CERT', client_cert)
 
     BACKUP_DIR = os.getenv('BACKUP_DIR', backup_dir)
@@ -117,6 +148,41 @@ def main(config_path):
     if isinstance(PRETTY_PRINT, str):
         PRETTY_PRINT = json.loads(PRETTY_PRINT.lower())  # convert environment variable string to bool
 
+    HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', http_retries))
+    HTTP_RETRY_BACKOFF = float(os.getenv('HTTP_RETRY_BACKOFF', http_retry_backoff))
+    HTTP_RETRY_MAX_BACKOFF = float(os.getenv('HTTP_RETRY_MAX_BACKOFF', http_retry_max_backoff))
+    HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', http_timeout))
+
+    ARCHIVE_CODEC = os.getenv('ARCHIVE_CODEC', archive_codec).lower()
+    ARCHIVE_COMPRESSION_LEVEL = os.getenv('ARCHIVE_COMPRESSION_LEVEL', archive_compression_level)
+    if ARCHIVE_COMPRESSION_LEVEL is not None:
+        ARCHIVE_COMPRESSION_LEVEL = int(ARCHIVE_COMPRESSION_LEVEL)
+    ARCHIVE_COMPRESSION_THREADS = int(os.getenv('ARCHIVE_COMPRESSION_THREADS', archive_compression_threads))
+
+    ARCHIVE_STREAM = os.getenv('ARCHIVE_STREAM', archive_stream)
+    if isinstance(ARCHIVE_STREAM, str):
+        ARCHIVE_STREAM = json.loads(ARCHIVE_STREAM.lower())  # convert environment variable string to bool
+
+    JSON_BACKEND = os.getenv('JSON_BACKEND', json_backend)
+    PROFILER = os.getenv('PROFILER', profiler)
+    ORG_WORKERS = int(os.getenv('ORG_WORKERS', org_workers))
+    RESTORE_WORKERS = int(os.getenv('RESTORE_WORKERS', restore_workers))
+
+    RUN_REPORT = os.getenv('RUN_REPORT', run_report)
+    if isinstance(RUN_REPORT, str):
+        RUN_REPORT = json.loads(RUN_REPORT.lower())  # convert environment variable string to bool
+
+    OTEL_TRACES = os.getenv('OTEL_TRACES', otel_traces)
+    if isinstance(OTEL_TRACES, str):
+        OTEL_TRACES = json.loads(OTEL_TRACES.lower())  # convert environment variable string to bool
+    OTEL_SERVICE_NAME = os.getenv('OTEL_SERVICE_NAME', otel_service_name)
+
+    SERVE_HOST = os.getenv('SERVE_HOST', serve_host)
+    SERVE_PORT = int(os.getenv('SERVE_PORT', serve_port))
+    SERVE_SCHEDULES = os.getenv('SERVE_SCHEDULES', serve_schedules)
+    if isinstance(SERVE_SCHEDULES, str):
+        SERVE_SCHEDULES = json.loads(SERVE_SCHEDULES)  # list of schedules as json
+
     EXTRA_HEADERS = dict(
         h.split(':') for h in os.getenv('GRAFANA_HEADERS', '').split(',') if 'GRAFANA_HEADERS' in os.environ)
 
@@ -158,12 +224,31 @@ def main(config_path):
     config_dict['DEBUG'] = DEBUG
     config_dict['API_HEALTH_CHECK'] = API_HEALTH_CHECK
     config_dict['API_AUTH_CHECK'] = API_AUTH_CHECK
+    config_dict['API_CHECK_CACHE_TTL'] = API_CHECK_CACHE_TTL
     config_dict['VERIFY_SSL'] = VERIFY_SSL
     config_dict['CLIENT_CERT'] = CLIENT_CERT
     config_dict['BACKUP_DIR'] = BACKUP_DIR
     config_dict['BACKUP_FILE_FORMAT'] = BACKUP_FILE_FORMAT
     config_dict['PRETTY_PRINT'] = PRETTY_PRINT
     config_dict['UID_DASHBOARD_SLUG_SUFFIX'] = UID_DASHBOARD_SLUG_SUFFIX
+    config_dict['HTTP_RETRIES'] = HTTP_RETRIES
+    config_dict['HTTP_RETRY_BACKOFF'] = HTTP_RETRY_BACKOFF
+    config_dict['HTTP_RETRY_MAX_BACKOFF'] = HTTP_RETRY_MAX_BACKOFF
+    config_dict['HTTP_TIMEOUT'] = HTTP_TIMEOUT
+    config_dict['ARCHIVE_CODEC'] = ARCHIVE_CODEC
+    config_dict['ARCHIVE_COMPRESSION_LEVEL'] = ARCHIVE_COMPRESSION_LEVEL
+    config_dict['ARCHIVE_COMPRESSION_THREADS'] = ARCHIVE_COMPRESSION_THREADS
+    config_dict['ARCHIVE_STREAM'] = ARCHIVE_STREAM
+    config_dict['JSON_BACKEND'] = JSON_BACKEND
+    config_dict['PROFILER'] = PROFILER
+    config_dict['ORG_WORKERS'] = ORG_WORKERS
+    config_dict['RESTORE_WORKERS'] = RESTORE_WORKERS
+    config_dict['RUN_REPORT'] = RUN_REPORT
+    config_dict['OTEL_TRACES'] = OTEL_TRACES
+    config_dict['OTEL_SERVICE_NAME'] = OTEL_SERVICE_NAME
+    config_dict['SERVE_HOST'] = SERVE_HOST
+    config_dict['SERVE_PORT'] = SERVE_PORT
+    config_dict['SERVE_SCHEDULES'] = SERVE_SCHEDULES
     config_dict['EXTRA_HEADERS'] = EXTRA_HEADERS
     config_dict['HTTP_GET_HEADERS'] = HTTP_GET_HEADERS
     config_dict['HTTP_POST_HEADERS'] = HTTP_POST_HEADERS
@@ -186,5 +271,8 @@ def main(config_path):
     config_dict['INFLUXDB_USERNAME'] = INFLUXDB_USERNAME
     config_dict['INFLUXDB_PASSWORD'] = INFLUXDB_PASSWORD
     config_dict['INFLUXDB_DATABASE'] = INFLUXDB_DATABASE
+    config_dict['PROMETHEUS_TEXTFILE'] = PROMETHEUS_TEXTFILE
+    config_dict['PROMETHEUS_PUSHGATEWAY_URL'] = PROMETHEUS_PUSHGATEWAY_URL
+    config_dict['PROMETHEUS_JOB'] = PROMETHEUS_JOB
 
     return config_dict
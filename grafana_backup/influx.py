@@ -1,10 +1,8 @@
-import datetime
 import influxdb
 import sys
 
 
-def main(args, settings):
-    influxdb_measurement = settings.get('INFLUXDB_MEASUREMENT')
+def main(args, settings, points):
     influxdb_host = settings.get('INFLUXDB_HOST')
     influxdb_port = settings.get('INFLUXDB_PORT')
     influxdb_username = settings.get('INFLUXDB_USERNAME')
@@ -23,13 +21,8 @@ def main(args, settings):
     )
 
     try:
-        result = influx.write_points([{
-            "measurement": influxdb_measurement,
-            "time": datetime.datetime.now(datetime.timezone.utc).isoformat(),
-            "fields": {
-                "backed_up": True
-            }
-        }])
+        # Run, component and upload points are sent in one request
+        result = influx.write_points(points)
         if result is True:
             print("InfluxDB metrics written successfully.")
     except Exception as e:
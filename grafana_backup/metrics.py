@@ -0,0 +1,175 @@
+from grafana_backup.report import get_error_count
+from urllib.parse import quote, urlparse
+import collections
+import datetime
+import os
+import requests
+import sys
+import time
+
+METRIC_PREFIX = 'grafana_backup_'
+# Per component fields of the run report exported as metrics, in seconds and bytes like Prometheus expects
+COMPONENT_METRICS = (
+    ('wall_time', 'component_duration_seconds', 'Time spent saving the component'),
+    ('requests', 'component_requests', 'Requests sent to Grafana for the component'),
+    ('bytes_written', 'component_bytes_written', 'Bytes of JSON written for the component'),
+)
+LATENCY_QUANTILES = (('0.5', 'latency_p50_ms'), ('0.95', 'latency_p95_ms'))
+ITEM_STATUSES = ('found', 'saved', 'created', 'updated', 'exists', 'skipped', 'deleted', 'failed')
+
+
+def main(args, settings, report):
+    if settings.get('INFLUXDB_HOST'):
+        # The influxdb client is only imported when configured
+        from grafana_backup.influx import main as influx
+        influx(args, settings, get_influx_points(settings, report))
+
+    textfile = settings.get('PROMETHEUS_TEXTFILE')
+    pushgateway_url = settings.get('PROMETHEUS_PUSHGATEWAY_URL')
+    if textfile or pushgateway_url:
+        content = format_prometheus(get_metrics(report)) + format_prometheus_histograms(report.get('endpoints', []))
+        if textfile:
+            write_prometheus_textfile(textfile, content)
+        if pushgateway_url:
+            push_prometheus(pushgateway_url, settings, content)
+
+
+def get_metrics(report):
+    # name -> (help, [(labels, value)]), every metric is a gauge describing the last run
+    metrics = collections.OrderedDict()
+
+    def add(name, help_text, value, **labels):
+        if value is None:
+            return
+        metrics.setdefault(METRIC_PREFIX + name, (help_text, []))[1].append((labels, value))
+
+    add('last_run_timestamp_seconds', 'Time the last run finished', time.time())
+    add('duration_seconds', 'Duration of the last run', report.get('wall_time'))
+    add('failed_items', 'Items which could not be saved', len(report.get('failed_items') or []))
+    add('archive_size_bytes', 'Size of the archive', report.get('archive_size'))
+    request_stats = report.get('request_stats') or {}
+    add('requests', 'Requests sent to Grafana including retries', request_stats.get('requests'))
+    add('request_retries', 'Requests retried after a transient error', request_stats.get('retries'))
+    add('request_errors', 'Requests which still failed after all retries', request_stats.get('failed'))
+
+    for (component, stats) in report['components'].items():
+        for (field, name, help_text) in COMPONENT_METRICS:
+            add(name, help_text, stats.get(field), component=component)
+        for (quantile, field) in LATENCY_QUANTILES:
+            latency = stats.get(field)
+            add('component_request_latency_seconds', 'Request latency quantiles of the component',
+                latency / 1000.0 if latency is not None else None, component=component, quantile=quantile)
+        for status in ITEM_STATUSES:
+            if status in stats:
+                add('component_items', 'Items of the component by status', stats[status], component=component, status=status)
+
+    for upload in report.get('uploads', []):
+        add('upload_duration_seconds', 'Duration of the archive upload', upload['seconds'], target=upload['target'])
+        add('upload_bytes_per_second', 'Throughput of the archive upload', upload['bytes_per_second'], target=upload['target'])
+        add('upload_success', '1 if the archive upload succeeded', int(upload['success']), target=upload['target'])
+    return metrics
+
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_prometheus(metrics):
+    # Prometheus text exposition format, understood by the node_exporter textfile collector and the pushgateway
+    lines = []
+    for (name, (help_text, samples)) in metrics.items():
+        lines.append('# HELP {0} {1}'.format(name, help_text))
+        lines.append('# TYPE {0} gauge'.format(name))
+        for (labels, value) in samples:
+            label_text = ','.join('{0}="{1}"'.format(key, escape_label_value(labels[key])) for key in sorted(labels))
+            lines.append('{0}{1} {2}'.format(name, '{' + label_text + '}' if label_text else '', float(value)))
+    return '\n'.join(lines) + '\n'
+
+
+def format_prometheus_histograms(endpoints):
+    # Request latency per endpoint template, cumulative buckets like a Prometheus client histogram
+    if not endpoints:
+        return ''
+    name = METRIC_PREFIX + 'request_duration_seconds'
+    lines = ['# HELP {0} Latency of the requests sent to Grafana by endpoint'.format(name), '# TYPE {0} histogram'.format(name)]
+    for stats in endpoints:
+        labels = 'endpoint="{0}",method="{1}"'.format(escape_label_value(stats['endpoint']), stats['method'])
+        for (bound, count) in stats['histogram']:
+            lines.append('{0}_bucket{{{1},le="{2}"}} {3}'.format(name, labels, '+Inf' if bound == 'inf' else bound, count))
+        lines.append('{0}_sum{{{1}}} {2}'.format(name, labels, stats['seconds']))
+        lines.append('{0}_count{{{1}}} {2}'.format(name, labels, stats['requests']))
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus_textfile(textfile, content):
+    # Written next to the target and renamed, the collector never reads a partial file
+    temporary_file = '{0}.{1}.tmp'.format(textfile, os.getpid())
+    with open(temporary_file, 'w') as f:
+        f.write(content)
+    os.replace(temporary_file, textfile)
+    print('Prometheus metrics written to {0}'.format(textfile))
+
+
+def push_prometheus(pushgateway_url, settings, content):
+    # Grouped by job and Grafana host, so the instances of a fleet do not replace each other's metrics
+    instance = urlparse(settings.get('GRAFANA_URL')).netloc or settings.get('GRAFANA_URL')
+    url = '{0}/metrics/job/{1}/instance/{2}'.format(pushgateway_url.rstrip('/'), quote(settings.get('PROMETHEUS_JOB'), safe=''),
+                                                    quote(instance, safe=''))
+    try:
+        response = requests.put(url, data=content.encode('utf8'), headers={'Content-Type': 'text/plain; version=0.0.4'}, timeout=30)
+    except requests.exceptions.RequestException as e:
+        print('Prometheus pushgateway exception: \n{0}'.format(str(e)))
+        sys.exit(1)
+    if response.status_code >= 300:
+        print('Prometheus pushgateway returned {0}: {1}'.format(response.status_code, response.text))
+        sys.exit(1)
+    print('Prometheus metrics pushed to {0}'.format(url))
+
+
+def get_influx_points(settings, report):
+    # One point for the run, one per component, upload and endpoint, written in a single batch
+    measurement = settings.get('INFLUXDB_MEASUREMENT')
+    timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    request_stats = report.get('request_stats') or {}
+
+    run_fields = {
+        'backed_up': True,
+        'duration_seconds': report.get('wall_time'),
+        'failed_items': len(report.get('failed_items') or []),
+        'archive_size_bytes': report.get('archive_size'),
+        'requests': request_stats.get('requests'),
+        'request_retries': request_stats.get('retries'),
+        'request_errors': request_stats.get('failed'),
+    }
+    points = [{'measurement': measurement, 'time': timestamp, 'fields': get_influx_fields(run_fields)}]
+
+    for (component, stats) in report['components'].items():
+        fields = dict((status, stats[status]) for status in ITEM_STATUSES if status in stats)
+        fields.update({
+            'duration_seconds': stats['wall_time'],
+            'requests': stats['requests'],
+            'latency_p50_ms': stats['latency_p50_ms'],
+            'latency_p95_ms': stats['latency_p95_ms'],
+            'bytes_written': stats['bytes_written'],
+        })
+        points.append({'measurement': measurement, 'time': timestamp, 'tags': {'component': component},
+                       'fields': get_influx_fields(fields)})
+
+    for upload in report.get('uploads', []):
+        points.append({'measurement': measurement, 'time': timestamp, 'tags': {'upload': upload['target']},
+                       'fields': get_influx_fields({'duration_seconds': upload['seconds'], 'bytes': upload['bytes'],
+                                                    'bytes_per_second': upload['bytes_per_second'],
+                                                    'success': upload['success']})})
+
+    for stats in report.get('endpoints', []):
+        points.append({'measurement': measurement, 'time': timestamp, 'tags': {'method': stats['method'], 'endpoint': stats['endpoint']},
+                       'fields': get_influx_fields({'requests': stats['requests'], 'errors': get_error_count(stats),
+                                                    'duration_seconds': stats['seconds'], 'mean_ms': stats['mean_ms'],
+                                                    'max_ms': stats['max_ms'], 'bytes': stats['bytes']})})
+    return points
+
+
+def get_influx_fields(fields):
+    # InfluxDB keeps the type of a field forever: numbers are always sent as floats, missing values are left out
+    return dict((key, value if isinstance(value, bool) else float(value))
+                for (key, value) in fields.items() if value is not None)
@@ -0,0 +1,128 @@
+import cProfile
+import os
+import pstats
+import re
+import time
+
+# Stage of a function, matched against '<file> <function>' in this order, everything else is 'other'
+PROFILE_STAGES = (
+    ('http', re.compile(r'requests/|urllib3/|urllib/request\.py|http/client\.py|email/|socket|ssl|dashboardApi\.py')),
+    ('json', re.compile(r'json|serializer\.py')),
+    ('archive', re.compile(r'tarfile\.py|zipfile|gzip\.py|zlib|Compress|lzma|zstandard|lz4|compression\.py|archive\.py')),
+)
+OTHER_STAGE = 'other'
+# Functions listed in the printed summary
+TOP_FUNCTIONS = 20
+
+
+def main(settings, profile_file, function, *function_args):
+    # Runs function(*function_args) under the configured profiler and returns its result
+    profiler_name = get_profiler_name(settings.get('PROFILER'))
+    print('profiling with {0}'.format(profiler_name))
+    if profiler_name == 'pyinstrument':
+        return run_pyinstrument(profile_file, function, *function_args)
+    return run_cprofile(profile_file, function, *function_args)
+
+
+def get_profiler_name(profiler):
+    # 'auto' prefers the sampling profiler, it adds less overhead to the many small calls of a backup
+    if profiler == 'auto':
+        try:
+            import pyinstrument  # noqa: F401
+            return 'pyinstrument'
+        except ImportError:
+            return 'cprofile'
+    if profiler not in ('cprofile', 'pyinstrument'):
+        raise Exception("unknown profiler '{0}', use auto, cprofile or pyinstrument".format(profiler))
+    return profiler
+
+
+def get_profile_file(settings, command, archive_file=None):
+    # Next to the archive: the archive being written by save, the archive being restored by restore
+    if archive_file:
+        return '{0}/{1}.{2}'.format(settings.get('BACKUP_DIR'), os.path.basename(archive_file), command)
+    return '{0}/{1}'.format(settings.get('BACKUP_DIR'), settings.get('TIMESTAMP'))
+
+
+def get_stage(file_path, function):
+    description = '{0} {1}'.format(file_path, function)
+    for (stage, pattern) in PROFILE_STAGES:
+        if pattern.search(description):
+            return stage
+    return OTHER_STAGE
+
+
+def run_cprofile(profile_file, function, *function_args):
+    profile = cProfile.Profile()
+    start = time.time()
+    try:
+        return profile.runcall(function, *function_args)
+    finally:
+        wall_time = time.time() - start
+        stats = pstats.Stats(profile)
+        stats_file = '{0}.pstats'.format(profile_file)
+        create_parent_dir(stats_file)
+        stats.dump_stats(stats_file)
+        # (file, line, function) -> (primitive calls, calls, own time, cumulative time, callers)
+        functions = [(file_path, line, name, calls, own_time, cumulative_time)
+                     for ((file_path, line, name), (primitive_calls, calls, own_time, cumulative_time, callers))
+                     in stats.stats.items()]
+        print_profile_summary(functions, wall_time, stats_file)
+
+
+def run_pyinstrument(profile_file, function, *function_args):
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+
+    profiler = Profiler()
+    start = time.time()
+    profiler.start()
+    try:
+        return function(*function_args)
+    finally:
+        profiler.stop()
+        wall_time = time.time() - start
+        speedscope_file = '{0}.speedscope.json'.format(profile_file)
+        create_parent_dir(speedscope_file)
+        with open(speedscope_file, 'w') as f:
+            f.write(profiler.output(renderer=SpeedscopeRenderer()))
+
+        # Own time of every function summed over all the call stacks it appears in, samples have no call counts
+        own_times = {}
+        frames = [profiler.last_session.root_frame()]
+        while frames:
+            frame = frames.pop()
+            if frame is None:
+                continue
+            frames.extend(frame.children)
+            if frame.is_synthetic:
+                continue
+            key = (frame.file_path or '~', frame.line_no or 0, frame.function)
+            own_times[key] = own_times.get(key, 0.0) + frame.total_self_time
+        functions = [(file_path, line, name, None, own_time, None)
+                     for ((file_path, line, name), own_time) in own_times.items()]
+        print_profile_summary(functions, wall_time, speedscope_file)
+
+
+def create_parent_dir(path):
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+
+def print_profile_summary(functions, wall_time, profile_file):
+    stage_times = dict((stage, 0.0) for (stage, pattern) in PROFILE_STAGES)
+    stage_times[OTHER_STAGE] = 0.0
+    for (file_path, line, name, calls, own_time, cumulative_time) in functions:
+        stage_times[get_stage(file_path, name)] += own_time
+
+    print('profile: {0}, wall time {1:.2f}s'.format(profile_file, wall_time))
+    total_time = sum(stage_times.values()) or 1.0
+    for (stage, own_time) in stage_times.items():
+        print('{0:<10}{1:>10.2f}s{2:>8.1f}%'.format(stage, own_time, own_time / total_time * 100))
+
+    print('{0:<8}{1:>10}{2:>10}{3:>10}  {4}'.format('stage', 'calls', 'own s', 'cum s', 'function'))
+    for (file_path, line, name, calls, own_time, cumulative_time) in sorted(functions, key=lambda entry: -entry[4])[:TOP_FUNCTIONS]:
+        print('{0:<8}{1:>10}{2:>10.3f}{3:>10}  {4} ({5}:{6})'.format(
+            get_stage(file_path, name), calls if calls is not None else '-', own_time,
+            '{0:.3f}'.format(cumulative_time) if cumulative_time is not None else '-', name, file_path, line))
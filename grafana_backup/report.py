@@ -0,0 +1,193 @@
+from grafana_backup.tracing import get_endpoint_stats, reset_endpoint_stats
+from datetime import datetime
+import collections
+import contextlib
+import json
+import math
+import os
+import threading
+import time
+
+# Written together with the object they belong to, counted in bytes_written but not as items
+SECONDARY_EXTENSIONS = ('folder_permission',)
+# Requests sent outside of a component, e.g. the pre-checks
+OTHER_COMPONENT = 'other'
+# Endpoints listed in the printed report, the json report has all of them
+SLOWEST_ENDPOINTS = 10
+# Request latencies are counted in logarithmic buckets 10% wide starting at 0.1 ms, so p50 and p95 are accurate
+# to 10% and the memory of a component does not grow with the number of requests
+LATENCY_BUCKET_BASE = 0.0001
+LATENCY_BUCKET_GROWTH = 1.1
+
+run_report = {'command': None, 'started': None, 'start_time': None, 'components': collections.OrderedDict(),
+              'uploads': [], 'lock': threading.Lock()}
+# Component the current thread is working on, 'save --all-orgs' saves several orgs at the same time
+current = threading.local()
+
+
+def start_report(command):
+    with run_report['lock']:
+        run_report['command'] = command
+        run_report['started'] = datetime.now().isoformat()
+        run_report['start_time'] = time.time()
+        run_report['components'].clear()
+        del run_report['uploads'][:]
+    reset_endpoint_stats()
+
+
+def get_component_stats(component):
+    # Caller holds the lock
+    if component not in run_report['components']:
+        run_report['components'][component] = {'wall_time': 0.0, 'requests': 0, 'latency_buckets': collections.Counter(),
+                                               'bytes_written': 0, 'counts': collections.Counter(), 'failed_items': set()}
+    return run_report['components'][component]
+
+
+def get_current_component():
+    return getattr(current, 'component', None)
+
+
+@contextlib.contextmanager
+def report_component(component):
+    if component is None:
+        yield
+        return
+    previous = get_current_component()
+    current.component = component
+    start = time.time()
+    try:
+        yield
+    finally:
+        current.component = previous
+        with run_report['lock']:
+            get_component_stats(component)['wall_time'] += time.time() - start
+
+
+def count_found(count):
+    component = get_current_component()
+    if component is None:
+        return
+    with run_report['lock']:
+        get_component_stats(component)['counts']['found'] += count
+
+
+def report_item(key, status, size=0, component=None):
+    # Items are counted by status. Only the keys of failed items are kept, so an item which failed first and
+    # succeeded when retried counts once with its last status
+    component = component or get_current_component()
+    if component is None:
+        return
+    with run_report['lock']:
+        stats = get_component_stats(component)
+        stats['bytes_written'] += size
+        if status is None:
+            return
+        if key in stats['failed_items']:
+            stats['failed_items'].discard(key)
+            stats['counts']['failed'] -= 1
+        if status == 'failed':
+            stats['failed_items'].add(key)
+        stats['counts'][status] += 1
+
+
+def report_saved_object(file_path, extension, size):
+    report_item(file_path, None if extension in SECONDARY_EXTENSIONS else 'saved', size)
+
+
+def get_latency_bucket(elapsed):
+    if elapsed <= LATENCY_BUCKET_BASE:
+        return 0
+    return int(math.ceil(math.log(elapsed / LATENCY_BUCKET_BASE, LATENCY_BUCKET_GROWTH)))
+
+
+def report_request(elapsed):
+    component = get_current_component() or OTHER_COMPONENT
+    bucket = get_latency_bucket(elapsed)
+    with run_report['lock']:
+        stats = get_component_stats(component)
+        stats['requests'] += 1
+        stats['latency_buckets'][bucket] += 1
+
+
+def report_upload(target, seconds, size, success):
+    with run_report['lock']:
+        run_report['uploads'].append({'target': target, 'seconds': round(seconds, 3), 'bytes': size, 'success': bool(success),
+                                      'bytes_per_second': round(size / seconds, 1) if seconds else None})
+
+
+def get_percentile(latency_buckets, count, fraction):
+    # Nearest rank percentile, the upper bound of the bucket holding the request of that rank
+    if not count:
+        return None
+    rank = min(count - 1, int(fraction * count))
+    seen = 0
+    for bucket in sorted(latency_buckets):
+        seen += latency_buckets[bucket]
+        if seen > rank:
+            return LATENCY_BUCKET_BASE * LATENCY_BUCKET_GROWTH ** bucket
+    return None
+
+
+def get_report(**extra):
+    with run_report['lock']:
+        components = collections.OrderedDict()
+        for (component, stats) in run_report['components'].items():
+            counts = collections.Counter(stats['counts'])
+            requests = stats['requests']
+            components[component] = dict(counts, **{
+                'wall_time': round(stats['wall_time'], 3),
+                'requests': requests,
+                'latency_p50_ms': round(get_percentile(stats['latency_buckets'], requests, 0.5) * 1000, 1) if requests else None,
+                'latency_p95_ms': round(get_percentile(stats['latency_buckets'], requests, 0.95) * 1000, 1) if requests else None,
+                'bytes_written': stats['bytes_written'],
+            })
+            components[component]['items_per_second'] = round(
+                (counts['saved'] + sum(counts[status] for status in ('created', 'updated', 'deleted'))) / stats['wall_time'], 1
+            ) if stats['wall_time'] else None
+        report = {
+            'command': run_report['command'],
+            'started': run_report['started'],
+            'wall_time': round(time.time() - run_report['start_time'], 3) if run_report['start_time'] else None,
+            'components': components,
+            'uploads': list(run_report['uploads']),
+        }
+    report['endpoints'] = get_endpoint_stats()
+    report.update(extra)
+    return report
+
+
+def get_error_count(endpoint_stats):
+    # Requests without a response or answered with a 4xx or 5xx status
+    return sum(count for (status, count) in endpoint_stats['statuses'].items() if not status.isdigit() or int(status) >= 400)
+
+
+def write_report(settings, report):
+    print('{0:<24}{1:>8}{2:>8}{3:>8}{4:>10}{5:>10}{6:>10}{7:>10}{8:>12}'.format(
+        'component', 'found', 'done', 'failed', 'requests', 'p50 ms', 'p95 ms', 'seconds', 'MB written'))
+    for (component, stats) in report['components'].items():
+        done = sum(stats.get(status, 0) for status in ('saved', 'created', 'updated', 'exists', 'deleted'))
+        print('{0:<24}{1:>8}{2:>8}{3:>8}{4:>10}{5:>10}{6:>10}{7:>10.2f}{8:>12.2f}'.format(
+            component, stats.get('found', '-'), done, stats.get('failed', 0), stats['requests'],
+            stats['latency_p50_ms'] if stats['latency_p50_ms'] is not None else '-',
+            stats['latency_p95_ms'] if stats['latency_p95_ms'] is not None else '-',
+            stats['wall_time'], stats['bytes_written'] / 1024.0 / 1024.0))
+
+    if report['endpoints']:
+        print('slowest endpoints:')
+        print('{0:<8}{1:<48}{2:>10}{3:>10}{4:>10}{5:>10}{6:>10}'.format(
+            'method', 'endpoint', 'requests', 'errors', 'mean ms', 'max ms', 'seconds'))
+        for stats in report['endpoints'][:SLOWEST_ENDPOINTS]:
+            print('{0:<8}{1:<48}{2:>10}{3:>10}{4:>10}{5:>10}{6:>10.2f}'.format(
+                stats['method'], stats['endpoint'], stats['requests'], get_error_count(stats), stats['mean_ms'],
+                stats['max_ms'], stats['seconds']))
+
+    if not settings.get('RUN_REPORT'):
+        return None
+    report_dir = '{0}/reports'.format(settings.get('BACKUP_DIR'))
+    if not os.path.exists(report_dir):
+        os.makedirs(report_dir)
+    report_file = '{0}/{1}_{2}.json'.format(report_dir, settings.get('TIMESTAMP'), report['command'])
+    with open(report_file, 'w') as f:
+        f.write(json.dumps(report, sort_keys=True, indent=4, separators=(',', ': ')))
+    print('run report: {0}'.format(report_file))
+    return report_file
@@ -15,23 +15,49 @@ from grafana_backup.create_library_element import main as create_library_element
 from grafana_backup.create_contact_point import main as create_contact_point
 from grafana_backup.update_notification_policy import main as update_notification_policy
 from grafana_backup.update_notification_template import main as update_notification_template
-from grafana_backup.s3_download import main as s3_download
-from grafana_backup.azure_storage_download import main as azure_storage_download
-from grafana_backup.gcs_download import main as gcs_download
+from grafana_backup.update_folder import main as update_folder
+from grafana_backup.update_datasource import main as update_datasource
+from grafana_backup.update_library_element import main as update_library_element
+from grafana_backup.restore_plan import (plan_restore, load_restore_plan, get_plan_action, apply_plan_deletes, get_plan_components,
+                                         prefetch_live_hashes, APPLIED_ACTIONS)
+from grafana_backup.compression import open_archive_reader, extract_archive, read_archive_member
+from grafana_backup.dashboardApi import (configure_retries, print_request_summary, reset_request_stats, request_stats,
+                                         start_item_requests, get_item_requests)
+from grafana_backup.tracing import configure_tracing
+from grafana_backup.serializer import set_json_backend
+from grafana_backup.serializer import loads_json
+from grafana_backup.report import start_report, report_component, report_item, count_found, get_report, write_report
+from grafana_backup.commons import (print_horizontal_line, defer_item, retry_deferred_items, load_restore_journal,
+                                    journal_restore_item, load_archive_index, get_index_entry, get_member_key,
+                                    ARCHIVE_INDEX_FILE)
 from glob import glob
 import sys
-import tarfile
 import tempfile
 import os
 import shutil
 import fnmatch
 import collections
+import re
+
+# Annotations and snapshots have no natural key in Grafana, posting them twice creates duplicates
+NOT_RETRYABLE_COMPONENTS = ('annotation', 'snapshot')
+# Journal statuses which confirm an item is present in Grafana, 'restore --resume' skips them
+CONFIRMED_STATUSES = ('created', 'updated', 'exists')
+# Functions 'restore --apply-plan' uses for the objects which differ from the live ones, dashboards are posted with overwrite
+UPDATE_FUNCTIONS = {
+    'folder': update_folder,
+    'datasource': update_datasource,
+    'library_element': update_library_element,
+    'dashboard': create_dashboard,
+}
+# Members of the organization partitions of 'save --all-orgs': <backup dir>/orgs/<org id>/<component>/<timestamp>/<file>
+ORG_PARTITION_PATTERN = re.compile(r'(?:^|/)orgs/(\d+)/[^/]+/[^/]+/[^/]+$')
 
 
 def main(args, settings):
     def open_compressed_backup(compressed_backup):
         try:
-            tar = tarfile.open(fileobj=compressed_backup, mode='r:gz')
+            tar = open_archive_reader(compressed_backup)
             return tar
         except Exception as e:
             print(str(e))
@@ -41,6 +67,21 @@ def main(args, settings):
     aws_s3_bucket_name = settings.get('AWS_S3_BUCKET_NAME')
     azure_storage_container_name = settings.get('AZURE_STORAGE_CONTAINER_NAME')
     gcs_bucket_name = settings.get('GCS_BUCKET_NAME')
+    backup_dir = settings.get('BACKUP_DIR')
+
+    if args.get('--org', None):
+        set_org_headers(settings, args.get('--org'))
+    configure_retries(settings)
+    reset_request_stats()
+    configure_tracing(settings)
+    set_json_backend(settings.get('JSON_BACKEND'))
+    start_report('restore')
+
+    if not os.path.exists(backup_dir):
+        os.makedirs(backup_dir)
+    settings.update({'RESTORE_JOURNAL': '{0}/{1}.restore.journal'.format(backup_dir, os.path.basename(arg_archive_file))})
+    settings.update({'RESTORE_PLAN': '{0}/{1}.restore.plan'.format(backup_dir, os.path.basename(arg_archive_file))})
+    plan = load_restore_plan(settings['RESTORE_PLAN'], args, settings) if args.get('--apply-plan', False) else None
 
     (status, json_resp, dashboard_uid_support, datasource_uid_support,
      paging_support, contact_point_support) = api_checks(settings)
@@ -50,33 +91,32 @@ def main(args, settings):
     if not status == 200:
         sys.exit(1)
 
-    # Use tar data stream if S3 bucket name is specified
+    # Use tar data stream if S3 bucket name is specified, the cloud SDKs are only imported when configured
     if aws_s3_bucket_name:
+        from grafana_backup.s3_download import main as s3_download
         print('Download archives from S3:')
         s3_data = s3_download(args, settings)
         tar = open_compressed_backup(s3_data)
 
     elif azure_storage_container_name:
+        from grafana_backup.azure_storage_download import main as azure_storage_download
         print('Download archives from Azure:')
         azure_storage_data = azure_storage_download(args, settings)
         tar = open_compressed_backup(azure_storage_data)
 
     elif gcs_bucket_name:
+        from grafana_backup.gcs_download import main as gcs_download
         print('Download archives from GCS:')
         gcs_storage_data = gcs_download(args, settings)
         tar = open_compressed_backup(gcs_storage_data)
 
     else:
         try:
-            tarfile.is_tarfile(name=arg_archive_file)
+            archive_data = open(arg_archive_file, 'rb')
         except IOError as e:
             print(str(e))
             sys.exit(1)
-        try:
-            tar = tarfile.open(name=arg_archive_file, mode='r:gz')
-        except Exception as e:
-            print(str(e))
-            sys.exit(1)
+        tar = open_compressed_backup(archive_data)
 
     restore_functions = collections.OrderedDict()
     # Folders must be restored before Library-Elements
@@ -98,24 +138,156 @@ def main(args, settings):
     restore_functions['notification_policy'] = update_notification_policy # Note! Can cause conflict in case policy is provisioned
     restore_functions['notification_template'] = update_notification_template
 
+    # The index of a zip archive is read on its own, so only the matching objects are extracted
+    index_content = read_archive_member(tar, ARCHIVE_INDEX_FILE)
+    index = load_archive_index(index_content.splitlines()) if index_content is not None else None
+    partitions = set()
+    select = get_member_filter(args, restore_functions, index, partitions)
     if sys.version_info >= (3,):
         with tempfile.TemporaryDirectory() as tmpdir:
-            tar.extractall(tmpdir)
-            tar.close()
-            restore_components(args, settings, restore_functions, tmpdir)
+            extract_archive(tar, tmpdir, select)
+            check_org_partition(args, partitions)
+            if args.get('--plan', False):
+                plan_restore(args, settings, iter_selected_items(args, restore_functions, tmpdir))
+            else:
+                if args.get('--skip-unchanged', False):
+                    prefetch_skip_unchanged(args, settings, restore_functions, tmpdir)
+                restore_components(args, settings, restore_functions, tmpdir, plan)
     else:
         tmpdir = tempfile.mkdtemp()
-        tar.extractall(tmpdir)
-        tar.close()
-        restore_components(args, settings, restore_functions, tmpdir)
+        extract_archive(tar, tmpdir, select)
+        check_org_partition(args, partitions)
+        if args.get('--plan', False):
+            plan_restore(args, settings, iter_selected_items(args, restore_functions, tmpdir))
+        else:
+            if args.get('--skip-unchanged', False):
+                prefetch_skip_unchanged(args, settings, restore_functions, tmpdir)
+            restore_components(args, settings, restore_functions, tmpdir, plan)
         try:
             shutil.rmtree(tmpdir)
         except OSError as e:
             print("Error: %s : %s" % (tmpdir, e.strerror))
 
+    print_horizontal_line()
+    print_request_summary()
+    write_report(settings, get_report(archive_file=arg_archive_file, request_stats=dict(request_stats)))
+
+
+def get_item_filter(args):
+    # Filters evaluated against the archive index entry of an item, None if no filter is set
+    uids = args.get('--uid').split(',') if args.get('--uid', None) else []
+    folders = args.get('--folder').split(',') if args.get('--folder', None) else []
+    title_glob = args.get('--title-glob', None)
+    if not uids and not folders and not title_glob:
+        return None
+
+    def item_filter(entry):
+        if uids and entry.get('uid') not in uids:
+            return False
+        if folders and entry.get('folder_uid') not in folders and entry.get('folder_title') not in folders:
+            return False
+        if title_glob and not fnmatch.fnmatch(entry.get('title') or '', title_glob):
+            return False
+        return True
+    return item_filter
+
+
+def set_org_headers(settings, org_id):
+    # The partition of an org is restored into that org, with the admin account when one is configured
+    org_header = {'X-Grafana-Org-Id': str(org_id)}
+    for name in ('HTTP_GET_HEADERS', 'HTTP_POST_HEADERS'):
+        settings[name] = dict(settings.get('{0}_BASIC_AUTH'.format(name)) or settings.get(name), **org_header)
+
+
+def get_org_partition(member_name):
+    match = ORG_PARTITION_PATTERN.search(member_name)
+    return match.group(1) if match else None
+
+
+def check_org_partition(args, partitions):
+    # Restoring every partition of a 'save --all-orgs' archive would post all orgs into the org of the token, where
+    # the objects overwrite each other, so exactly one of them is restored
+    arg_org = args.get('--org', None)
+    if partitions and arg_org not in partitions:
+        print('[ERROR] the archive holds the organizations {0} of save --all-orgs, '
+              'restore one of them with --org=<org id>'.format(', '.join(sorted(partitions, key=int))))
+        sys.exit(1)
+    if arg_org and not partitions:
+        print('[ERROR] --org={0} is given but the archive has no organizations of save --all-orgs'.format(arg_org))
+        sys.exit(1)
+
+
+def get_member_filter(args, restore_functions, index, partitions):
+    # Only the members which are going to be restored are extracted from the archive, the org partitions found in it
+    # are added to partitions and only the one of --org is extracted
+    arg_components = args.get('--components', None)
+    arg_org = args.get('--org', None)
+    item_filter = get_item_filter(args)
+
+    components = arg_components.replace("-", "_").split(',') if arg_components else list(restore_functions.keys())
+
+    def select(member_name):
+        partition = get_org_partition(member_name)
+        if partition is not None:
+            partitions.add(partition)
+            if partition != arg_org:
+                return False
+        if os.path.basename(member_name) == ARCHIVE_INDEX_FILE or (not arg_components and not item_filter):
+            return True
+        if os.path.splitext(member_name)[1][1:] not in components:
+            return False
+        # Without an index up front (tar archives) the filters are evaluated once the archive is extracted
+        entry = index.get(get_member_key(member_name)) if index is not None and item_filter else None
+        return entry is None or item_filter(entry)
+    return select
+
 
-def restore_components(args, settings, restore_functions, tmpdir):
+def load_extracted_index(tmpdir):
+    index = {}
+    for index_path in glob('{0}/**/{1}'.format(tmpdir, ARCHIVE_INDEX_FILE), recursive=True):
+        with open(index_path, 'r') as f:
+            index.update(load_archive_index(f))
+    return index
+
+
+def iter_selected_items(args, restore_functions, tmpdir):
+    # (component, file path, item key) of the extracted items a restore with the same arguments would restore
+    arg_components = args.get('--components', None)
+    components = arg_components.replace("-", "_").split(',') if arg_components else list(restore_functions.keys())
+    item_filter = get_item_filter(args)
+    index = load_extracted_index(tmpdir)
+    for ext in components:
+        for root, dirnames, filenames in os.walk('{0}'.format(tmpdir)):
+            for filename in sorted(fnmatch.filter(filenames, '*.{0}'.format(ext))):
+                file_path = os.path.join(root, filename)
+                item_key = os.path.relpath(file_path, tmpdir)
+                if item_filter and not item_filter(get_item_index_entry(index, item_key, ext, file_path)):
+                    continue
+                yield (ext, file_path, item_key)
+
+
+def prefetch_skip_unchanged(args, settings, restore_functions, tmpdir):
+    # Only the archived dashboards are fetched from Grafana, their uids are taken from the archive index
+    index = load_extracted_index(tmpdir)
+    dashboard_uids = [get_item_index_entry(index, item_key, ext, file_path).get('uid')
+                      for (ext, file_path, item_key) in iter_selected_items(args, restore_functions, tmpdir) if ext == 'dashboard']
+    prefetch_live_hashes(settings, get_plan_components(args), dashboard_uids)
+
+
+def restore_components(args, settings, restore_functions, tmpdir, plan=None):
     arg_components = args.get('--components', [])
+    journal_path = settings.get('RESTORE_JOURNAL')
+
+    item_filter = get_item_filter(args)
+    index = load_extracted_index(tmpdir)
+
+    if args.get('--resume', False) or args.get('--only-failed', False):
+        journal = load_restore_journal(journal_path)
+        print("loaded restore journal {0} with {1} items".format(journal_path, len(journal)))
+    else:
+        # A fresh restore starts a fresh journal
+        open(journal_path, 'w').close()
+        journal = {}
 
     if arg_components:
         arg_components_list = arg_components.replace("-", "_").split(',')
@@ -123,26 +295,107 @@ def restore_components(args, settings, restore_functions, tmpdir):
         # Restore only the components that provided via an argument
         # but must also exist in extracted archive
         for ext in arg_components_list:
-            if sys.version_info >= (3,):
-                for file_path in glob('{0}/**/*.{1}'.format(tmpdir, ext), recursive=True):
-                    print('restoring {0}: {1}'.format(ext, file_path))
-                    restore_functions[ext](args, settings, file_path)
-            else:
-                for root, dirnames, filenames in os.walk('{0}'.format(tmpdir)):
-                    for filename in fnmatch.filter(filenames, '*.{0}'.format(ext)):
-                        file_path = os.path.join(root, filename)
-                        print('restoring {0}: {1}'.format(ext, file_path))
-                        restore_functions[ext](args, settings, file_path)
+            with report_component(ext):
+                if sys.version_info >= (3,):
+                    for file_path in glob('{0}/**/*.{1}'.format(tmpdir, ext), recursive=True):
+                        restore_item(args, settings, restore_functions, ext, file_path, tmpdir, journal, item_filter, index, plan)
+                else:
+                    for root, dirnames, filenames in os.walk('{0}'.format(tmpdir)):
+                        for filename in fnmatch.filter(filenames, '*.{0}'.format(ext)):
+                            file_path = os.path.join(root, filename)
+                            restore_item(args, settings, restore_functions, ext, file_path, tmpdir, journal, item_filter, index, plan)
     else:
         # Restore every component included in extracted archive
         for ext in restore_functions.keys():
-            if sys.version_info >= (3,):
-                for file_path in glob('{0}/**/*.{1}'.format(tmpdir, ext), recursive=True):
-                    print('restoring {0}: {1}'.format(ext, file_path))
-                    restore_functions[ext](args, settings, file_path)
-            else:
-                for root, dirnames, filenames in os.walk('{0}'.format(tmpdir)):
-                    for filename in fnmatch.filter(filenames, '*.{0}'.format(ext)):
-                        file_path = os.path.join(root, filename)
-                        print('restoring {0}: {1}'.format(ext, file_path))
-                        restore_functions[ext](args, settings, file_path)
+            with report_component(ext):
+                if sys.version_info >= (3,):
+                    for file_path in glob('{0}/**/*.{1}'.format(tmpdir, ext), recursive=True):
+                        restore_item(args, settings, restore_functions, ext, file_path, tmpdir, journal, item_filter, index, plan)
+                else:
+                    for root, dirnames, filenames in os.walk('{0}'.format(tmpdir)):
+                        for filename in fnmatch.filter(filenames, '*.{0}'.format(ext)):
+                            file_path = os.path.join(root, filename)
+                            restore_item(args, settings, restore_functions, ext, file_path, tmpdir, journal, item_filter, index, plan)
+
+    failed_items = retry_deferred_items()
+    if failed_items:
+        print("{0} items could not be restored: {1}".format(len(failed_items), ', '.join(failed_items)))
+    if plan is not None:
+        apply_plan_deletes(settings, plan)
+
+    journal = load_restore_journal(journal_path)
+    status_counts = collections.Counter(journal.values())
+    print("restore journal {0}: {1}".format(
+        journal_path, ', '.join('{0}: {1}'.format(status, count) for (status, count) in sorted(status_counts.items()))))
+
+
+def restore_item(args, settings, restore_functions, ext, file_path, tmpdir, journal, item_filter, index, plan):
+    # Items are identified by their path inside the archive, which is the same for every run
+    item_key = os.path.relpath(file_path, tmpdir)
+    if item_filter and not item_filter(get_item_index_entry(index, item_key, ext, file_path)):
+        return
+    if args.get('--resume', False) and journal.get(item_key) in CONFIRMED_STATUSES:
+        return
+    if args.get('--only-failed', False) and journal.get(item_key) != 'failed':
+        return
+    restore_function = restore_functions[ext]
+    if plan is not None:
+        # Only the items the plan creates or updates are sent, unchanged ones cost no request
+        action = get_plan_action(plan, item_key)
+        if action not in APPLIED_ACTIONS:
+            return
+        if action == 'update':
+            restore_function = UPDATE_FUNCTIONS[ext]
+
+    count_found(1)
+    print('restoring {0}: {1}'.format(ext, file_path))
+    if restore_single_item(args, settings, restore_function, file_path, item_key):
+        return
+    if ext in NOT_RETRYABLE_COMPONENTS or not all(get_item_requests()[1]):
+        # A create which got a gateway error or no response may have been applied by Grafana anyway,
+        # only items whose failed requests are all safe to repeat are sent again
+        print("[ERROR] {0}: {1} failed and is not retried, check it and use 'restore --only-failed'".format(ext, file_path))
+        report_item(item_key, 'failed')
+    else:
+        defer_item('{0}: {1}'.format(ext, file_path), restore_single_item,
+                   args, settings, restore_function, file_path, item_key)
+
+
+def get_item_index_entry(index, item_key, ext, file_path):
+    entry = index.get(get_member_key(item_key))
+    if entry is None:
+        # Archives created before the archive index was added
+        with open(file_path, 'r') as f:
+            entry = get_index_entry(file_path, ext, loads_json(f.read()))
+    return entry
+
+
+def restore_single_item(args, settings, restore_function, file_path, item_key):
+    # An item is considered failed if any of its requests still hit a transient error after all retries.
+    # Requests are tracked per thread, so requests sent by other threads are never accounted to this item
+    start_item_requests()
+    restore_function(args, settings, file_path)
+    (write_statuses, failures) = get_item_requests()
+    transient_failure = len(failures) > 0
+
+    status = get_restore_status(write_statuses, transient_failure)
+    journal_restore_item(settings.get('RESTORE_JOURNAL'), item_key, status)
+    if not transient_failure:
+        # Items with a transient failure are retried at the end of the run, which reports them if they fail again
+        report_item(item_key, status)
+    return not transient_failure
+
+
+def get_restore_status(write_statuses, transient_failure):
+    # 409 and 412 are returned by Grafana when the object already exists
+    if transient_failure:
+        return 'failed'
+    if not write_statuses:
+        return 'skipped'
+    if any(status >= 400 and status not in (409, 412) for (method, status) in write_statuses):
+        return 'failed'
+    if all(status in (409, 412) for (method, status) in write_statuses):
+        return 'exists'
+    if any(method in ('PUT', 'PATCH') for (method, status) in write_statuses):
+        return 'updated'
+    return 'created'
@@ -0,0 +1,297 @@
+from grafana_backup.dashboardApi import (search_folder_page, search_datasource, search_library_elements, search_dashboard,
+                                         get_dashboard, delete_dashboard_by_uid, delete_library_element,
+                                         delete_datasource_by_uid, delete_folder)
+from grafana_backup.commons import print_horizontal_line
+from grafana_backup.serializer import loads_json
+from grafana_backup.report import report_component
+from concurrent.futures import ThreadPoolExecutor
+import collections
+import hashlib
+import json
+import os
+import sys
+import time
+
+# Components compared against the live Grafana, the others are restored as usual when the plan is applied
+PLAN_COMPONENTS = ('folder', 'datasource', 'library_element', 'dashboard')
+# Actions of the plan which send requests when it is applied
+APPLIED_ACTIONS = ('create', 'update', 'restore')
+# Deletes run after the restore, dashboards and library elements before the folders they are in
+DELETE_ORDER = ('dashboard', 'library_element', 'datasource', 'folder')
+
+
+class LiveStateError(Exception):
+    # A query of the live Grafana failed, raised in the worker threads and handled by the callers of get_live_objects
+    pass
+
+
+def get_canonical_object(component, data):
+    # (uid, title, canonical object) of an archived or a live object. The canonical object only keeps what a restore
+    # writes, ids, versions and metadata Grafana sets itself differ between instances and are left out
+    if component == 'dashboard':
+        dashboard = dict(data.get('dashboard', {}))
+        for key in ('id', 'version'):
+            dashboard.pop(key, None)
+        meta = data.get('meta', {})
+        dashboard['folder_uid'] = meta.get('folderUid', '')
+        return (dashboard.get('uid'), dashboard.get('title'), dashboard)
+    if component == 'folder':
+        return (data.get('uid'), data.get('title'),
+                {'title': data.get('title'), 'parent_uid': data.get('parentUid', data.get('folderUid')) or ''})
+    if component == 'datasource':
+        datasource = dict((key, value) for (key, value) in data.items() if key not in ('id', 'orgId', 'version'))
+        return (data.get('uid') or data.get('name'), data.get('name'), datasource)
+    if component == 'library_element':
+        meta = data.get('meta', {})
+        return (data.get('uid'), data.get('name'),
+                {'name': data.get('name'), 'kind': data.get('kind'), 'model': data.get('model'),
+                 'folder_uid': data.get('folderUid', meta.get('folderUid')) or ''})
+    return (None, None, data)
+
+
+def get_object_hash(canonical):
+    content = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(content.encode('utf8')).hexdigest()
+
+
+def get_live_objects(settings, components, dashboard_uids):
+    # (component -> uid -> listed object, component -> uid -> canonical hash) of the live Grafana. The listings are
+    # fetched at the same time and the archived dashboards that exist live in parallel, a fetched dashboard is
+    # hashed right away so only its hash is held
+    grafana_url = settings.get('GRAFANA_URL')
+    http_get_headers = settings.get('HTTP_GET_HEADERS')
+    verify_ssl = settings.get('VERIFY_SSL')
+    client_cert = settings.get('CLIENT_CERT')
+    debug = settings.get('DEBUG')
+    workers = settings.get('RESTORE_WORKERS')
+
+    def list_folders():
+        return list_pages('folders', search_folder_page)
+
+    def list_datasources():
+        return check_live_response('datasources', search_datasource(grafana_url, http_get_headers, verify_ssl, client_cert, debug))
+
+    def list_library_elements():
+        content = check_live_response('library elements',
+                                      search_library_elements(grafana_url, http_get_headers, verify_ssl, client_cert, debug))
+        return content['result']['elements']
+
+    def list_pages(name, search_page):
+        # Every page is checked, a listing cut short by a failed page would plan deletes of the objects after it
+        hits = []
+        page = 1
+        while True:
+            content = check_live_response('{0} page {1}'.format(name, page),
+                                          search_page(page, 5000, grafana_url, http_get_headers, verify_ssl, client_cert, debug))
+            if not content:
+                return hits
+            hits.extend(content)
+            page += 1
+
+    def list_dashboards():
+        return list_pages('dashboards', search_dashboard)
+
+    def get_live_dashboard_hash(uid):
+        dashboard = check_live_response('dashboard {0}'.format(uid),
+                                        get_dashboard('uid/{0}'.format(uid), grafana_url, http_get_headers, verify_ssl, client_cert, debug))
+        return get_object_hash(get_canonical_object('dashboard', dashboard)[2])
+
+    listings = {'folder': list_folders, 'datasource': list_datasources,
+                'library_element': list_library_elements, 'dashboard': list_dashboards}
+    live = {}
+    live_hashes = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = dict((component, executor.submit(listings[component])) for component in components)
+        for (component, future) in futures.items():
+            if component == 'dashboard':
+                # Dashboards are listed as search hits, without their model
+                live[component] = dict((hit['uid'], hit) for hit in future.result())
+                live_hashes[component] = {}
+                continue
+            live[component] = {}
+            live_hashes[component] = {}
+            for data in future.result():
+                (uid, title, canonical) = get_canonical_object(component, data)
+                live[component][uid] = data
+                live_hashes[component][uid] = get_object_hash(canonical)
+
+        uids = [uid for uid in dashboard_uids if uid in live.get('dashboard', {})]
+        for (uid, object_hash) in zip(uids, executor.map(get_live_dashboard_hash, uids)):
+            live_hashes['dashboard'][uid] = object_hash
+    return (live, live_hashes)
+
+
+def get_plan_components(args):
+    # Planned components selected by --components, in restore order
+    arg_components = args.get('--components', None)
+    components = arg_components.replace('-', '_').split(',') if arg_components else PLAN_COMPONENTS
+    return [component for component in PLAN_COMPONENTS if component in components]
+
+
+def prefetch_live_hashes(settings, components, dashboard_uids):
+    # Used by 'restore --skip-unchanged', the create functions compare the archived objects with these hashes
+    try:
+        (live, live_hashes) = get_live_objects(settings, components, dashboard_uids)
+    except LiveStateError as e:
+        print("[ERROR] {0}, nothing was restored".format(e))
+        sys.exit(1)
+    print("prefetched {0} live objects to skip unchanged ones".format(sum(len(hashes) for hashes in live_hashes.values())))
+    settings.update({'LIVE_OBJECT_HASHES': live_hashes})
+
+
+def is_unchanged(settings, component, data):
+    # True if the live object has the same canonical hash as the archived one, only after a prefetch
+    live_hashes = settings.get('LIVE_OBJECT_HASHES')
+    if not live_hashes or component not in live_hashes:
+        return False
+    (uid, title, canonical) = get_canonical_object(component, data)
+    return live_hashes[component].get(uid) == get_object_hash(canonical)
+
+
+def check_live_response(name, response):
+    (status, content) = response
+    if status != 200:
+        # A plan made from partial live state would create or delete the wrong objects
+        raise LiveStateError("query {0} failed, status: {1}, msg: {2}".format(name, status, content))
+    return content
+
+
+def plan_restore(args, settings, items):
+    # items are (component, file path, item key) of the archive, filtered like restore filters them
+    plan_path = settings.get('RESTORE_PLAN')
+    archived = []
+    for (component, file_path, item_key) in items:
+        if component not in PLAN_COMPONENTS:
+            archived.append((component, item_key, None, None, None))
+            continue
+        with open(file_path, 'r') as f:
+            (uid, title, canonical) = get_canonical_object(component, loads_json(f.read()))
+        archived.append((component, item_key, uid, title, get_object_hash(canonical)))
+
+    components = get_plan_components(args)
+    dashboard_uids = [uid for (component, item_key, uid, title, object_hash) in archived if component == 'dashboard']
+    try:
+        (live, live_hashes) = get_live_objects(settings, components, dashboard_uids)
+    except LiveStateError as e:
+        print("[ERROR] {0}, no restore plan was written".format(e))
+        sys.exit(1)
+
+    plan = {'archive_file': os.path.abspath(args.get('<archive_file>')), 'grafana_url': settings.get('GRAFANA_URL'),
+            'org': args.get('--org', None),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'items': collections.OrderedDict(), 'deletes': []}
+    archived_uids = collections.defaultdict(set)
+    for (component, item_key, uid, title, object_hash) in archived:
+        if component not in PLAN_COMPONENTS:
+            action = 'restore'
+        elif uid not in live[component]:
+            action = 'create'
+        elif live_hashes[component].get(uid) == object_hash:
+            action = 'unchanged'
+        else:
+            action = 'update'
+        archived_uids[component].add(uid)
+        plan['items'][item_key] = {'component': component, 'uid': uid, 'title': title, 'action': action}
+
+    # Live objects missing from the archive are only deleted when the whole archive is restored, a restore
+    # filtered by uid, folder or title would otherwise delete everything it left out
+    if not (args.get('--uid', None) or args.get('--folder', None) or args.get('--title-glob', None)):
+        for component in components:
+            if not archived_uids[component]:
+                # Archives saved without the component
+                continue
+            for (uid, data) in sorted(live[component].items()):
+                if uid in archived_uids[component]:
+                    continue
+                if component == 'datasource' and (data.get('readOnly') or not data.get('uid')):
+                    # Provisioned datasources can not be deleted through the API, old ones without a uid are left alone
+                    continue
+                plan['deletes'].append({'component': component, 'uid': uid,
+                                        'title': get_canonical_object(component, data)[1] or data.get('title'),
+                                        'depth': get_folder_depth(uid, live) if component == 'folder' else 0})
+
+    with open(plan_path, 'w') as f:
+        json.dump(plan, f, indent=2)
+    print_restore_plan(plan)
+    print("restore plan written to {0}, apply it with 'restore --apply-plan'".format(plan_path))
+    return plan
+
+
+def get_folder_depth(uid, live):
+    # Nested folders are deleted before their parents, a deleted parent has already removed them
+    depth = 0
+    parents = dict((folder_uid, get_canonical_object('folder', data)[2]['parent_uid']) for (folder_uid, data) in live['folder'].items())
+    while parents.get(uid) and depth < len(parents):
+        uid = parents[uid]
+        depth += 1
+    return depth
+
+
+def print_restore_plan(plan):
+    print_horizontal_line()
+    counts = collections.OrderedDict()
+    for item in plan['items'].values():
+        counts.setdefault(item['component'], collections.Counter())[item['action']] += 1
+    for item in plan['deletes']:
+        counts.setdefault(item['component'], collections.Counter())['delete'] += 1
+
+    print('{0:<24}{1:>10}{2:>10}{3:>10}{4:>10}{5:>10}'.format('component', 'create', 'update', 'delete', 'unchanged', 'restore'))
+    for (component, component_counts) in counts.items():
+        print('{0:<24}{1:>10}{2:>10}{3:>10}{4:>10}{5:>10}'.format(
+            component, component_counts['create'], component_counts['update'], component_counts['delete'],
+            component_counts['unchanged'], component_counts['restore']))
+
+    for (item_key, item) in plan['items'].items():
+        if item['action'] in ('create', 'update'):
+            print('{0} {1}{2}'.format('+' if item['action'] == 'create' else '~', item_key,
+                                      ' ({0})'.format(item['title']) if item['title'] else ''))
+    for item in plan['deletes']:
+        print('- {0} {1}{2}'.format(item['component'], item['uid'], ' ({0})'.format(item['title']) if item['title'] else ''))
+
+
+def load_restore_plan(plan_path, args, settings):
+    try:
+        with open(plan_path, 'r') as f:
+            plan = json.load(f)
+    except (IOError, ValueError) as e:
+        print("[ERROR] could not read restore plan {0}: {1}, create it with 'restore --plan'".format(plan_path, e))
+        sys.exit(1)
+
+    # The plan deletes what was missing from its archive on its Grafana, applied to another one it would delete the
+    # wrong objects
+    mismatches = []
+    if (plan.get('grafana_url') or '').rstrip('/') != (settings.get('GRAFANA_URL') or '').rstrip('/'):
+        mismatches.append('grafana_url {0}, not {1}'.format(plan.get('grafana_url'), settings.get('GRAFANA_URL')))
+    if os.path.abspath(plan.get('archive_file') or '') != os.path.abspath(args.get('<archive_file>')):
+        mismatches.append('archive_file {0}, not {1}'.format(plan.get('archive_file'), args.get('<archive_file>')))
+    if plan.get('org') != args.get('--org', None):
+        mismatches.append('--org={0}, not --org={1}'.format(plan.get('org'), args.get('--org', None)))
+    if mismatches:
+        print("[ERROR] restore plan {0} was made for {1}, create a new one with 'restore --plan'".format(
+            plan_path, ' and '.join(mismatches)))
+        sys.exit(1)
+    return plan
+
+
+def get_plan_action(plan, item_key):
+    # Items missing from the plan were not selected when it was made
+    return plan['items'].get(item_key, {}).get('action')
+
+
+def apply_plan_deletes(settings, plan):
+    grafana_url = settings.get('GRAFANA_URL')
+    http_post_headers = settings.get('HTTP_POST_HEADERS')
+    verify_ssl = settings.get('VERIFY_SSL')
+    client_cert = settings.get('CLIENT_CERT')
+    debug = settings.get('DEBUG')
+    delete_functions = {'dashboard': delete_dashboard_by_uid, 'library_element': delete_library_element,
+                        'datasource': delete_datasource_by_uid, 'folder': delete_folder}
+
+    for component in DELETE_ORDER:
+        items = sorted((item for item in plan['deletes'] if item['component'] == component),
+                       key=lambda item: -item.get('depth', 0))
+        if not items:
+            continue
+        with report_component(component):
+            for item in items:
+                status = delete_functions[component](item['uid'], grafana_url, http_post_headers, verify_ssl, client_cert, debug)
+                print("delete {0} {1}, status: {2}".format(component, item['uid'], status))
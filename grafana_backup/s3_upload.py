@@ -2,13 +2,13 @@ import boto3
 from botocore.exceptions import NoCredentialsError
 
 from grafana_backup.s3_common import get_s3_object
+from grafana_backup.compression import get_archive_file_name
 
 
 def main(args, settings):
     backup_dir = settings.get('BACKUP_DIR')
-    timestamp = settings.get('TIMESTAMP')
 
-    s3_file_name = '{0}.tar.gz'.format(timestamp)
+    s3_file_name = get_archive_file_name(settings)
     archive_file = '{0}/{1}'.format(backup_dir, s3_file_name)
 
     s3_object = get_s3_object(settings, s3_file_name=s3_file_name)
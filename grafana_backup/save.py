@@ -10,23 +10,34 @@ from grafana_backup.save_annotations import main as save_annotations
 from grafana_backup.save_contact_points import main as save_contact_points
 from grafana_backup.save_notification_policies import main as save_notification_policies
 from grafana_backup.save_notification_templates import main as save_notification_templates
-from grafana_backup.archive import main as archive
-from grafana_backup.s3_upload import main as s3_upload
-from grafana_backup.influx import main as influx
-from grafana_backup.save_orgs import main as save_orgs
+from grafana_backup.archive import main as archive, open_archive_stream, get_archive_file
+from grafana_backup.save_orgs import main as save_orgs, get_all_orgs_in_grafana
 from grafana_backup.save_users import main as save_users
 from grafana_backup.save_library_elements import main as save_library_elements
 from grafana_backup.save_teams import main as save_teams
 from grafana_backup.save_team_members import main as save_team_members
-from grafana_backup.azure_storage_upload import main as azure_storage_upload
-from grafana_backup.gcs_upload import main as gcs_upload
-from grafana_backup.commons import print_horizontal_line
+from grafana_backup.dashboardApi import configure_retries, print_request_summary, reset_request_stats, request_stats
+from grafana_backup.tracing import configure_tracing
+from grafana_backup.serializer import set_json_backend
+from grafana_backup.report import start_report, report_component, report_upload, get_report, write_report
+from grafana_backup.metrics import main as metrics
+from grafana_backup.commons import (print_horizontal_line, retry_deferred_items, set_json_writer, LooseFileWriter,
+                                    ArchiveStreamWriter, set_archive_index, ARCHIVE_INDEX_FILE)
+from concurrent.futures import ThreadPoolExecutor
+import os
 import sys
+import time
+
+# Components saved for every organization with 'save --all-orgs' unless --components is given
+ORG_COMPONENTS = ['folder', 'datasource', 'library-element', 'dashboard', 'alert-channel', 'alert-rule', 'contact-point',
+                  'notification-policy', 'notification-template']
 
 
 def main(args, settings):
     arg_components = args.get('--components', False)
     arg_no_archive = args.get('--no-archive', False)
+    # '--resume' is shared with restore, for save it takes the timestamp of the interrupted backup
+    arg_resume = args.get('<timestamp>', None) if args.get('--resume', False) else None
 
     backup_functions = {'dashboard': save_dashboards,
                         'datasource': save_datasources,
@@ -47,6 +58,18 @@ def main(args, settings):
                         'notification-template': save_notification_templates
                         }
 
+    configure_retries(settings)
+    configure_tracing(settings)
+    reset_request_stats()
+    start_report('save')
+    set_json_backend(settings.get('JSON_BACKEND'))
+
+    if arg_resume:
+        # Reuse the folders of the interrupted run, the checkpoint journals in there tell what is already saved
+        print("resuming backup: {0}".format(arg_resume))
+        settings.update({'TIMESTAMP': arg_resume})
+        settings.update({'RESUME': True})
+
     (status,
      json_resp,
      dashboard_uid_support,
@@ -64,36 +87,118 @@ def main(args, settings):
         print("grafana server status is not ok: {0}".format(json_resp))
         sys.exit(1)
 
-    if arg_components:
-        arg_components_list = arg_components.replace("_", "-").split(',')
+    # Every saved object is listed in the archive index, 'restore --uid/--folder/--title-glob' only reads the index
+    index_path = '{0}/index/{1}'.format(settings.get('BACKUP_DIR'), settings.get('TIMESTAMP'))
+    if not os.path.exists(index_path):
+        os.makedirs(index_path)
+    set_archive_index('{0}/{1}'.format(index_path, ARCHIVE_INDEX_FILE))
 
-        # Backup only the components that provided via an argument
-        for backup_function in arg_components_list:
-            backup_functions[backup_function](args, settings)
+    if settings.get('ARCHIVE_STREAM') and not arg_no_archive and not arg_resume:
+        # Objects are written straight into the archive, only the log files of the components touch the disk
+        with open_archive_stream(settings) as tar:
+            set_json_writer(ArchiveStreamWriter(tar))
+            try:
+                failed_items = save_components(args, settings, backup_functions, arg_components)
+            finally:
+                set_json_writer(LooseFileWriter())
     else:
-        # Backup every component
-        for backup_function in backup_functions.keys():
-            backup_functions[backup_function](args, settings)
+        failed_items = save_components(args, settings, backup_functions, arg_components)
+        if not arg_no_archive:
+            archive(args, settings)
 
     aws_s3_bucket_name = settings.get('AWS_S3_BUCKET_NAME')
     azure_storage_container_name = settings.get('AZURE_STORAGE_CONTAINER_NAME')
     gcs_bucket_name = settings.get('GCS_BUCKET_NAME')
-    influxdb_host = settings.get('INFLUXDB_HOST')
-
-    if not arg_no_archive:
-        archive(args, settings)
+    archive_file = None if arg_no_archive else get_archive_file(settings)
+    archive_size = os.path.getsize(archive_file) if archive_file and os.path.exists(archive_file) else None
 
+    # The cloud SDKs take longer to import than the rest of the tool, they are only loaded when configured
     if aws_s3_bucket_name:
+        from grafana_backup.s3_upload import main as s3_upload
         print('Upload archives to S3:')
-        s3_upload(args, settings)
+        upload_archive('s3', s3_upload, args, settings, archive_size)
 
     if azure_storage_container_name:
+        from grafana_backup.azure_storage_upload import main as azure_storage_upload
         print('Upload archives to Azure Storage:')
-        azure_storage_upload(args, settings)
+        upload_archive('azure', azure_storage_upload, args, settings, archive_size)
 
     if gcs_bucket_name:
+        from grafana_backup.gcs_upload import main as gcs_upload
         print('Upload archives to GCS:')
-        gcs_upload(args, settings)
+        upload_archive('gcs', gcs_upload, args, settings, archive_size)
+
+    print_horizontal_line()
+    print_request_summary()
+    if failed_items:
+        print("{0} items could not be saved: {1}".format(len(failed_items), ', '.join(failed_items)))
+    report = get_report(timestamp=settings.get('TIMESTAMP'), failed_items=failed_items, request_stats=dict(request_stats),
+                        archive_file=archive_file, archive_size=archive_size)
+    write_report(settings, report)
+    metrics(args, settings, report)
+    return failed_items
+
+
+def upload_archive(target, upload_function, args, settings, archive_size):
+    start = time.time()
+    success = upload_function(args, settings)
+    report_upload(target, time.time() - start, archive_size or 0, success)
+
+
+def save_components(args, settings, backup_functions, arg_components):
+    if args.get('--all-orgs', False):
+        save_all_orgs(args, settings, backup_functions, arg_components)
+    elif arg_components:
+        arg_components_list = arg_components.replace("_", "-").split(',')
 
-    if influxdb_host:
-        influx(args, settings)
+        # Backup only the components that provided via an argument
+        for backup_function in arg_components_list:
+            with report_component(backup_function):
+                backup_functions[backup_function](args, settings)
+    else:
+        # Backup every component
+        for backup_function in backup_functions.keys():
+            with report_component(backup_function):
+                backup_functions[backup_function](args, settings)
+
+    return retry_deferred_items()
+
+
+def save_all_orgs(args, settings, backup_functions, arg_components):
+    grafana_url = settings.get('GRAFANA_URL')
+    http_get_headers_basic_auth = settings.get('HTTP_GET_HEADERS_BASIC_AUTH')
+    verify_ssl = settings.get('VERIFY_SSL')
+    client_cert = settings.get('CLIENT_CERT')
+    debug = settings.get('DEBUG')
+
+    if not http_get_headers_basic_auth:
+        print('[ERROR] Backing up all organizations needs to set GRAFANA_ADMIN_ACCOUNT and GRAFANA_ADMIN_PASSWORD first.')
+        sys.exit(1)
+
+    components = arg_components.replace("_", "-").split(',') if arg_components else ORG_COMPONENTS
+    orgs = get_all_orgs_in_grafana(grafana_url, http_get_headers_basic_auth, verify_ssl, client_cert, debug)
+    print_horizontal_line()
+
+    # The pre-checks already ran once for the whole server, every org only switches the org header
+    with ThreadPoolExecutor(max_workers=settings.get('ORG_WORKERS')) as executor:
+        futures = [executor.submit(save_org_components, args, get_org_settings(settings, org), backup_functions, components)
+                   for org in orgs]
+        for future in futures:
+            future.result()
+
+
+def get_org_settings(settings, org):
+    # Each org is saved with the admin account into its own partition of the backup: BACKUP_DIR/orgs/<org id>
+    org_settings = dict(settings)
+    org_header = {'X-Grafana-Org-Id': str(org['id'])}
+    org_settings['HTTP_GET_HEADERS'] = dict(settings.get('HTTP_GET_HEADERS_BASIC_AUTH'), **org_header)
+    org_settings['HTTP_POST_HEADERS'] = dict(settings.get('HTTP_POST_HEADERS_BASIC_AUTH'), **org_header)
+    org_settings['BACKUP_DIR'] = '{0}/orgs/{1}'.format(settings.get('BACKUP_DIR'), org['id'])
+    return org_settings
+
+
+def save_org_components(args, settings, backup_functions, components):
+    print("saving organization {0} to {1}".format(settings['HTTP_GET_HEADERS']['X-Grafana-Org-Id'], settings.get('BACKUP_DIR')))
+    for backup_function in components:
+        with report_component(backup_function):
+            backup_functions[backup_function](args, settings)
@@ -1,6 +1,7 @@
 import os
 from grafana_backup.dashboardApi import search_alert_channels
 from grafana_backup.commons import to_python2_and_3_compatible_string, print_horizontal_line, save_json
+from grafana_backup.report import count_found
 
 
 def main(args, settings):
@@ -29,6 +30,7 @@ def get_all_alert_channels_in_grafana(grafana_url, http_get_headers, verify_ssl,
     if status == 200:
         channels = content
         print("There are {0} channels:".format(len(channels)))
+        count_found(len(channels))
         for channel in channels:
             print("name: {0}".format(to_python2_and_3_compatible_string(channel['name'])))
         return channels
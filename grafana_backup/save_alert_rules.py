@@ -1,6 +1,7 @@
 import os
 from grafana_backup.dashboardApi import search_alert_rules, get_alert_rule, get_grafana_version
 from grafana_backup.commons import to_python2_and_3_compatible_string, print_horizontal_line, save_json
+from grafana_backup.report import count_found
 from packaging import version
 
 
@@ -48,6 +49,7 @@ def get_all_alert_rules_in_grafana(grafana_url, http_get_headers, verify_ssl, cl
     if status == 200:
         alert_rules = content
         print("There are {0} alert rules:".format(len(alert_rules)))
+        count_found(len(alert_rules))
         for alert_rule in alert_rules:
             print('name: {0}'.format(
                 to_python2_and_3_compatible_string(alert_rule['title'])))
@@ -2,6 +2,7 @@ import os
 import time
 from grafana_backup.dashboardApi import search_annotations
 from grafana_backup.commons import print_horizontal_line, save_json
+from grafana_backup.report import count_found
 
 
 def main(args, settings):
@@ -42,6 +43,7 @@ def get_all_annotations_and_save(folder_path, grafana_url, http_get_headers, ver
         if status_code_and_content[0] == 200:
             annotations_batch = status_code_and_content[1]
             print("There are {0} annotations:".format(len(annotations_batch)))
+            count_found(len(annotations_batch))
             for annotation in annotations_batch:
                 print(annotation)
                 save_annotation(str(annotation['id']), annotation, folder_path, pretty_print)
@@ -1,7 +1,8 @@
 import os
-from grafana_backup.dashboardApi import get_dashboard_versions, get_version
-from grafana_backup.save_dashboards import get_all_dashboards_in_grafana
-from grafana_backup.commons import print_horizontal_line, save_json, to_python2_and_3_compatible_string
+from grafana_backup.dashboardApi import get_dashboard_versions, get_version, is_transient_status, build_search_query
+from grafana_backup.save_dashboards import iter_dashboards_in_grafana
+from grafana_backup.commons import print_horizontal_line, save_json, to_python2_and_3_compatible_string, defer_item, load_checkpoint, checkpoint_item
+from grafana_backup.report import count_found
 
 
 def main(args, settings):
@@ -14,6 +15,7 @@ def main(args, settings):
     debug = settings.get('DEBUG')
     pretty_print = settings.get('PRETTY_PRINT')
     uid_support = settings.get('DASHBOARD_UID_SUPPORT')
+    search_query = build_search_query(args.get('--folder-uid', None), args.get('--tag', None), args.get('--uid', None))
 
     folder_path = '{0}/dashboard_versions/{1}'.format(backup_dir, timestamp)
     log_file = 'dashboard_versions_{0}.txt'.format(timestamp)
@@ -21,46 +23,77 @@ def main(args, settings):
     if not os.path.exists(folder_path):
         os.makedirs(folder_path)
 
-    save_dashboard_versions(folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support)
+    save_dashboard_versions(folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, settings.get('RESUME'), search_query)
 
 
-def save_dashboard_versions(folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support):
-    limit = 5000
-    current_page = 1
+def save_dashboard_versions(folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, resume=False, search_query=''):
+    completed_boards = load_checkpoint(folder_path) if resume else set()
+    dashboards = iter_dashboards_in_grafana(grafana_url, http_get_headers, verify_ssl, client_cert, debug, search_query)
+    get_versions_and_save(dashboards, folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, completed_boards, resume)
+    print_horizontal_line()
 
-    while True:
-        dashboards = get_all_dashboards_in_grafana(current_page, limit, grafana_url, http_get_headers, verify_ssl, client_cert, debug)
-        print_horizontal_line()
-        if len(dashboards) == 0:
-            break
-        else:
-            current_page += 1
-        get_versions_and_save(dashboards, folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support)
-        print_horizontal_line()
 
+def get_versions_and_save(dashboards, folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, completed_boards, resume):
+    for board in dashboards:
+        if board['uid'] in completed_boards:
+            continue
+        status = get_board_versions_and_save(board, folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, resume)
+        if is_transient_status(status):
+            defer_item('versions of dashboard {0}'.format(to_python2_and_3_compatible_string(board['title'])),
+                       retry_board_versions_and_save,
+                       board, folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, resume)
 
-def get_versions_and_save(dashboards, folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support):
-    if dashboards:
-        for board in dashboards:
-            board_folder_path = os.path.join(folder_path, board['uid'])
-            if not os.path.exists(board_folder_path):
-                os.makedirs(board_folder_path)
 
-            (status, content) = get_dashboard_versions(board['id'], grafana_url, http_get_headers, verify_ssl, client_cert, debug)
-            if status == 200:
-                print("found {0} versions for dashboard {1}".format(len(content), to_python2_and_3_compatible_string(board['title'])))
-                get_individual_versions(content, board_folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print)
+def get_board_versions_and_save(board, folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, resume):
+    board_folder_path = os.path.join(folder_path, board['uid'])
+    if not os.path.exists(board_folder_path):
+        os.makedirs(board_folder_path)
 
+    (status, content) = get_dashboard_versions(board['id'], grafana_url, http_get_headers, verify_ssl, client_cert, debug)
+    if status == 200:
+        print("found {0} versions for dashboard {1}".format(len(content), to_python2_and_3_compatible_string(board['title'])))
+        count_found(len(content))
+        if get_individual_versions(content, board_folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, resume):
+            # Versions never change once written, a board only needs to be visited again if some of them failed
+            checkpoint_item(folder_path, board['uid'])
+    return status
 
-def get_individual_versions(versions, folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print):
+
+def retry_board_versions_and_save(*args):
+    return get_board_versions_and_save(*args) == 200
+
+
+def get_individual_versions(versions, folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, resume=False):
     file_path = folder_path + '/' + log_file
+    completed_versions = load_checkpoint(folder_path) if resume else set()
+    all_saved = True
     if versions:
-        with open(u"{0}".format(file_path), 'w') as f:
+        with open(u"{0}".format(file_path), 'a' if resume else 'w') as f:
             for version in versions:
-                (status, content) = get_version(version['dashboardId'], version['version'], grafana_url, http_get_headers, verify_ssl, client_cert, debug)
-                if status == 200:
-                    save_version(str(version['version']), content, folder_path, pretty_print)
-                    f.write('{0}\n'.format(version['version']))
+                if str(version['version']) in completed_versions:
+                    continue
+                status = get_single_version_and_save(version, f, folder_path, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print)
+                if status != 200:
+                    all_saved = False
+                if is_transient_status(status):
+                    defer_item('dashboard {0} version {1}'.format(version['dashboardId'], version['version']),
+                               retry_single_version_and_save,
+                               version, file_path, folder_path, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print)
+    return all_saved
+
+
+def get_single_version_and_save(version, f, folder_path, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print):
+    (status, content) = get_version(version['dashboardId'], version['version'], grafana_url, http_get_headers, verify_ssl, client_cert, debug)
+    if status == 200:
+        save_version(str(version['version']), content, folder_path, pretty_print)
+        f.write('{0}\n'.format(version['version']))
+        checkpoint_item(folder_path, version['version'])
+    return status
+
+
+def retry_single_version_and_save(version, file_path, *args):
+    with open(u"{0}".format(file_path), 'a') as f:
+        return get_single_version_and_save(version, f, *args) == 200
 
 
 def save_version(file_name, version, folder_path, pretty_print):
@@ -1,6 +1,7 @@
 import os
-from grafana_backup.dashboardApi import search_dashboard, get_dashboard
-from grafana_backup.commons import to_python2_and_3_compatible_string, print_horizontal_line, save_json
+from grafana_backup.dashboardApi import search_dashboard, get_dashboard, is_transient_status, build_search_query
+from grafana_backup.commons import to_python2_and_3_compatible_string, print_horizontal_line, save_json, defer_item, load_checkpoint, checkpoint_item
+from grafana_backup.report import count_found
 
 
 def main(args, settings):
@@ -16,6 +17,7 @@ def main(args, settings):
     uid_support = settings.get('DASHBOARD_UID_SUPPORT')
     uid_dashboard_slug_suffix = settings.get('UID_DASHBOARD_SLUG_SUFFIX')
     paging_support = settings.get('PAGING_SUPPORT')
+    search_query = build_search_query(args.get('--folder-uid', None), args.get('--tag', None), args.get('--uid', None))
 
     folder_path = '{0}/dashboards/{1}'.format(backup_dir, timestamp)
     log_file = 'dashboards_{0}.txt'.format(timestamp)
@@ -23,19 +25,22 @@ def main(args, settings):
     if not os.path.exists(folder_path):
         os.makedirs(folder_path)
 
+    completed_items = load_checkpoint(folder_path) if settings.get('RESUME') else set()
+
     if paging_support:
-        save_dashboards_above_Ver6_2(folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, uid_dashboard_slug_suffix)
+        save_dashboards_above_Ver6_2(folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, uid_dashboard_slug_suffix, completed_items, search_query)
     else:
-        save_dashboards(folder_path, log_file, limit, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, uid_dashboard_slug_suffix)
+        save_dashboards(folder_path, log_file, limit, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, uid_dashboard_slug_suffix, completed_items, search_query)
 
 
-def get_all_dashboards_in_grafana(page, limit, grafana_url, http_get_headers, verify_ssl, client_cert, debug):
+def get_all_dashboards_in_grafana(page, limit, grafana_url, http_get_headers, verify_ssl, client_cert, debug, search_query=''):
     (status, content) = search_dashboard(page,
                                          limit,
                                          grafana_url,
                                          http_get_headers,
                                          verify_ssl, client_cert,
-                                         debug)
+                                         debug,
+                                         search_query)
     if status == 200:
         dashboards = content
         print("There are {0} dashboards:".format(len(dashboards)))
@@ -52,27 +57,49 @@ def save_dashboard_setting(dashboard_name, file_name, dashboard_settings, folder
     print("dashboard: {0} -> saved to: {1}".format(dashboard_name, file_path))
 
 
-def get_individual_dashboard_setting_and_save(dashboards, folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, slug_suffix):
+def get_individual_dashboard_setting_and_save(dashboards, folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, slug_suffix, completed_items):
+    # dashboards is a list or a generator of search hits, they are counted as they arrive
     file_path = folder_path + '/' + log_file
-    if dashboards:
-        with open(u"{0}".format(file_path), 'w') as f:
-            for board in dashboards:
-                if uid_support:
-                    board_uri = "uid/{0}".format(board['uid'])
-                else:
-                    board_uri = board['uri']
-
-                (status, content) = get_dashboard(board_uri, grafana_url, http_get_headers, verify_ssl, client_cert, debug)
-                if status == 200:
-                    file_name = build_filename(board_uri, content, uid_support, slug_suffix)
-                    save_dashboard_setting(
-                        to_python2_and_3_compatible_string(board['title']),
-                        file_name,
-                        content,
-                        folder_path,
-                        pretty_print
-                    )
-                    f.write('{0}\t{1}\n'.format(board_uri, to_python2_and_3_compatible_string(board['title'])))
+    # A resumed save keeps the log lines of the items saved before the interruption, they are skipped below
+    with open(u"{0}".format(file_path), 'a' if completed_items else 'w') as f:
+        for board in dashboards:
+            count_found(1)
+            if get_board_uri(board, uid_support) in completed_items:
+                continue
+            status = get_single_dashboard_setting_and_save(board, f, folder_path, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, slug_suffix)
+            if is_transient_status(status):
+                defer_item('dashboard {0}'.format(to_python2_and_3_compatible_string(board['title'])),
+                           retry_single_dashboard_setting_and_save,
+                           board, file_path, folder_path, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, slug_suffix)
+
+
+def get_board_uri(board, uid_support):
+    if uid_support:
+        return "uid/{0}".format(board['uid'])
+    return board['uri']
+
+
+def get_single_dashboard_setting_and_save(board, f, folder_path, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, slug_suffix):
+    board_uri = get_board_uri(board, uid_support)
+
+    (status, content) = get_dashboard(board_uri, grafana_url, http_get_headers, verify_ssl, client_cert, debug)
+    if status == 200:
+        file_name = build_filename(board_uri, content, uid_support, slug_suffix)
+        save_dashboard_setting(
+            to_python2_and_3_compatible_string(board['title']),
+            file_name,
+            content,
+            folder_path,
+            pretty_print
+        )
+        f.write('{0}\t{1}\n'.format(board_uri, to_python2_and_3_compatible_string(board['title'])))
+        checkpoint_item(folder_path, board_uri)
+    return status
+
+
+def retry_single_dashboard_setting_and_save(board, file_path, *args):
+    with open(u"{0}".format(file_path), 'a') as f:
+        return get_single_dashboard_setting_and_save(board, f, *args) == 200
 
 
 def build_filename(board_uri, content, uid_support, slug_suffix):
@@ -87,23 +114,33 @@ def build_filename(board_uri, content, uid_support, slug_suffix):
     return file_name
 
 
-def save_dashboards_above_Ver6_2(folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, slug_suffix):
+def iter_dashboards_in_grafana(grafana_url, http_get_headers, verify_ssl, client_cert, debug, search_query=''):
+    # Search hits are yielded page by page: the boards of a page are fetched before the next page is listed,
+    # so only one page is held in memory however large the instance is
     limit = 5000  # limit is 5000 above V6.2+
     current_page = 1
     while True:
-        dashboards = get_all_dashboards_in_grafana(current_page, limit, grafana_url, http_get_headers, verify_ssl, client_cert, debug)
-        print_horizontal_line()
-        if len(dashboards) == 0:
-            break
-        else:
-            current_page += 1
-        get_individual_dashboard_setting_and_save(dashboards, folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, slug_suffix)
-        print_horizontal_line()
+        (status, content) = search_dashboard(current_page, limit, grafana_url, http_get_headers, verify_ssl, client_cert, debug, search_query)
+        if status != 200:
+            print("get dashboards failed, status: {0}, msg: {1}".format(status, content))
+            return
+        if len(content) == 0:
+            return
+        print("There are {0} dashboards on page {1}".format(len(content), current_page))
+        for board in content:
+            yield board
+        current_page += 1
+
+
+def save_dashboards_above_Ver6_2(folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, slug_suffix, completed_items, search_query):
+    dashboards = iter_dashboards_in_grafana(grafana_url, http_get_headers, verify_ssl, client_cert, debug, search_query)
+    get_individual_dashboard_setting_and_save(dashboards, folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, slug_suffix, completed_items)
+    print_horizontal_line()
 
 
-def save_dashboards(folder_path, log_file, limit, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, slug_suffix):
+def save_dashboards(folder_path, log_file, limit, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, slug_suffix, completed_items, search_query):
     current_page = 1
-    dashboards = get_all_dashboards_in_grafana(current_page, limit, grafana_url, http_get_headers, verify_ssl, client_cert, debug)
+    dashboards = get_all_dashboards_in_grafana(current_page, limit, grafana_url, http_get_headers, verify_ssl, client_cert, debug, search_query)
     print_horizontal_line()
-    get_individual_dashboard_setting_and_save(dashboards, folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, slug_suffix)
+    get_individual_dashboard_setting_and_save(dashboards, folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, slug_suffix, completed_items)
     print_horizontal_line()
@@ -1,6 +1,7 @@
 import os
 from grafana_backup.dashboardApi import search_datasource
 from grafana_backup.commons import print_horizontal_line, save_json
+from grafana_backup.report import count_found
 
 
 def main(args, settings):
@@ -33,6 +34,7 @@ def get_all_datasources_and_save(folder_path, grafana_url, http_get_headers, ver
     if status_code_and_content[0] == 200:
         datasources = status_code_and_content[1]
         print("There are {0} datasources:".format(len(datasources)))
+        count_found(len(datasources))
         for datasource in datasources:
             print(datasource)
             if uid_support:
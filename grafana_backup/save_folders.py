@@ -1,7 +1,8 @@
 import os
 import json
-from grafana_backup.dashboardApi import search_folders, get_folder, get_folder_permissions
-from grafana_backup.commons import to_python2_and_3_compatible_string, print_horizontal_line, save_json
+from grafana_backup.dashboardApi import search_folders, get_folder, get_folder_permissions, is_transient_status
+from grafana_backup.commons import to_python2_and_3_compatible_string, print_horizontal_line, save_json, defer_item, load_checkpoint, checkpoint_item
+from grafana_backup.report import count_found
 
 
 def main(args, settings):
@@ -21,9 +22,11 @@ def main(args, settings):
     if not os.path.exists(folder_path):
         os.makedirs(folder_path)
 
+    completed_items = load_checkpoint(folder_path) if settings.get('RESUME') else set()
+
     folders = get_all_folders_in_grafana(grafana_url, http_get_headers, verify_ssl, client_cert, debug)
     print_horizontal_line()
-    get_individual_folder_setting_and_save(folders, folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support)
+    get_individual_folder_setting_and_save(folders, folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, completed_items)
     print_horizontal_line()
 
 
@@ -34,6 +37,7 @@ def get_all_folders_in_grafana(grafana_url, http_get_headers, verify_ssl, client
     if status == 200:
         folders = content
         print("There are {0} folders:".format(len(content)))
+        count_found(len(content))
         for folder in folders:
             print("name: {0}".format(to_python2_and_3_compatible_string(folder['title'])))
         return folders
@@ -50,25 +54,45 @@ def save_folder_setting(folder_name, file_name, folder_settings, folder_permissi
     print("folder permissions:{0} are saved to {1}".format(folder_name, file_path))
 
 
-def get_individual_folder_setting_and_save(folders, folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support):
+def get_individual_folder_setting_and_save(folders, folder_path, log_file, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support, completed_items):
     file_path = folder_path + '/' + log_file
-    with open(u"{0}".format(file_path), 'w+') as f:
+    with open(u"{0}".format(file_path), 'a' if completed_items else 'w') as f:
         for folder in folders:
-            if uid_support:
-                folder_uri = "uid/{0}".format(folder['uid'])
-            else:
-                folder_uri = folder['uri']
-
-            (status_folder_settings, content_folder_settings) = get_folder(folder['uid'], grafana_url, http_get_headers, verify_ssl, client_cert, debug)
-            (status_folder_permissions, content_folder_permissions) = get_folder_permissions(folder['uid'], grafana_url, http_get_headers, verify_ssl, client_cert, debug)
-
-            if status_folder_settings == 200 and status_folder_permissions == 200:
-                save_folder_setting(
-                    to_python2_and_3_compatible_string(folder['title']),
-                    folder_uri,
-                    content_folder_settings,
-                    content_folder_permissions,
-                    folder_path,
-                    pretty_print
-                )
-                f.write('{0}\t{1}\n'.format(folder_uri, to_python2_and_3_compatible_string(folder['title'])))
+            if folder['uid'] in completed_items:
+                continue
+            status = get_single_folder_setting_and_save(folder, f, folder_path, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support)
+            if is_transient_status(status):
+                defer_item('folder {0}'.format(to_python2_and_3_compatible_string(folder['title'])),
+                           retry_single_folder_setting_and_save,
+                           folder, file_path, folder_path, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support)
+
+
+def get_single_folder_setting_and_save(folder, f, folder_path, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, uid_support):
+    if uid_support:
+        folder_uri = "uid/{0}".format(folder['uid'])
+    else:
+        folder_uri = folder['uri']
+
+    (status_folder_settings, content_folder_settings) = get_folder(folder['uid'], grafana_url, http_get_headers, verify_ssl, client_cert, debug)
+    (status_folder_permissions, content_folder_permissions) = get_folder_permissions(folder['uid'], grafana_url, http_get_headers, verify_ssl, client_cert, debug)
+
+    if status_folder_settings == 200 and status_folder_permissions == 200:
+        save_folder_setting(
+            to_python2_and_3_compatible_string(folder['title']),
+            folder_uri,
+            content_folder_settings,
+            content_folder_permissions,
+            folder_path,
+            pretty_print
+        )
+        f.write('{0}\t{1}\n'.format(folder_uri, to_python2_and_3_compatible_string(folder['title'])))
+        checkpoint_item(folder_path, folder['uid'])
+        return 200
+    elif status_folder_settings != 200:
+        return status_folder_settings
+    return status_folder_permissions
+
+
+def retry_single_folder_setting_and_save(folder, file_path, *args):
+    with open(u"{0}".format(file_path), 'a') as f:
+        return get_single_folder_setting_and_save(folder, f, *args) == 200
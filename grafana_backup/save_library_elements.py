@@ -1,6 +1,7 @@
 import os
 from grafana_backup.dashboardApi import search_library_elements
 from grafana_backup.commons import to_python2_and_3_compatible_string, print_horizontal_line, save_json
+from grafana_backup.report import count_found
 
 
 def main(args, settings):
@@ -29,6 +30,7 @@ def get_all_library_elements_in_grafana(grafana_url, http_get_headers, verify_ss
     if status == 200:
         library_elements = content['result']['elements']
         print("There are {0} library element:".format(len(library_elements)))
+        count_found(len(library_elements))
         for library_element in library_elements:
             print("name: {0}".format(to_python2_and_3_compatible_string(library_element['name'])))
         return library_elements
@@ -1,6 +1,7 @@
 import os
 from grafana_backup.dashboardApi import search_notification_templates, get_grafana_version
 from grafana_backup.commons import to_python2_and_3_compatible_string, print_horizontal_line, save_json
+from grafana_backup.report import count_found
 from packaging import version
 
 
@@ -47,6 +48,7 @@ def get_all_notification_templates_in_grafana(grafana_url, http_get_headers, ver
     if status == 200:
         notification_templates = content
         print("There are {0} notification templates:".format(len(notification_templates)))
+        count_found(len(notification_templates))
 
         for notification_template in notification_templates:
             print('name: {0}'.format(
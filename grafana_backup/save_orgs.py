@@ -1,6 +1,7 @@
 import os
 from grafana_backup.dashboardApi import search_orgs, get_org
 from grafana_backup.commons import to_python2_and_3_compatible_string, print_horizontal_line, save_json
+from grafana_backup.report import count_found
 
 
 def main(args, settings):
@@ -35,6 +36,7 @@ def get_all_orgs_in_grafana(grafana_url, http_get_headers, verify_ssl, client_ce
     if status == 200:
         orgs = content
         print("There are {0} orgs:".format(len(orgs)))
+        count_found(len(orgs))
         for org in orgs:
             print('name: {0}'.format(to_python2_and_3_compatible_string(org['name'])))
         return orgs
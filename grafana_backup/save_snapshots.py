@@ -1,8 +1,9 @@
 import os
 import random
 import string
-from grafana_backup.dashboardApi import search_snapshot, get_snapshot
-from grafana_backup.commons import print_horizontal_line, save_json
+from grafana_backup.dashboardApi import search_snapshot, get_snapshot, is_transient_status
+from grafana_backup.commons import print_horizontal_line, save_json, defer_item, load_checkpoint, checkpoint_item
+from grafana_backup.report import count_found
 
 
 def main(args, settings):
@@ -21,7 +22,9 @@ def main(args, settings):
     if not os.path.exists(folder_path):
         os.makedirs(folder_path)
 
-    get_all_snapshots_and_save(folder_path, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print)
+    completed_items = load_checkpoint(folder_path) if settings.get('RESUME') else set()
+
+    get_all_snapshots_and_save(folder_path, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, completed_items)
     print_horizontal_line()
 
 
@@ -36,18 +39,30 @@ def get_single_snapshot_and_save(snapshot, grafana_url, http_get_headers, verify
     (status, content) = get_snapshot(snapshot['key'], grafana_url, http_get_headers, verify_ssl, client_cert, debug)
     if status == 200:
         save_snapshot(snapshot['name'], content, folder_path, pretty_print)
+        checkpoint_item(folder_path, snapshot['key'])
     else:
         print("getting snapshot {0} failed with {1}".format(snapshot['name'], status))
+    return status
+
+
+def retry_single_snapshot_and_save(*args):
+    return get_single_snapshot_and_save(*args) == 200
 
 
-def get_all_snapshots_and_save(folder_path, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print):
+def get_all_snapshots_and_save(folder_path, grafana_url, http_get_headers, verify_ssl, client_cert, debug, pretty_print, completed_items):
     status_code_and_content = search_snapshot(grafana_url, http_get_headers, verify_ssl, client_cert, debug)
     if status_code_and_content[0] == 200:
         snapshots = status_code_and_content[1]
         print("There are {0} snapshots:".format(len(snapshots)))
+        count_found(len(snapshots))
         for snapshot in snapshots:
+            if snapshot['key'] in completed_items:
+                continue
             print(snapshot)
-            get_single_snapshot_and_save(snapshot, grafana_url, http_get_headers, verify_ssl, client_cert, debug, folder_path, pretty_print)
+            status = get_single_snapshot_and_save(snapshot, grafana_url, http_get_headers, verify_ssl, client_cert, debug, folder_path, pretty_print)
+            if is_transient_status(status):
+                defer_item('snapshot {0}'.format(snapshot['name']), retry_single_snapshot_and_save,
+                           snapshot, grafana_url, http_get_headers, verify_ssl, client_cert, debug, folder_path, pretty_print)
     else:
         print("query snapshot failed, status: {0}, msg: {1}".format(status_code_and_content[0],
                                                                     status_code_and_content[1]))
@@ -1,6 +1,7 @@
 import os
 from grafana_backup.dashboardApi import search_teams, search_team_members
 from grafana_backup.commons import to_python2_and_3_compatible_string, print_horizontal_line, save_json
+from grafana_backup.report import count_found
 
 
 def main(args, settings):
@@ -42,6 +43,7 @@ def get_team_members_in_grafana(team_id, grafana_url, http_get_headers, verify_s
     if status == 200:
         team_members = content
         print("There are {0} team members in team {1}:".format(len(team_members), team_id))
+        count_found(len(team_members))
         for team_member in team_members:
             print("name: {0}".format(to_python2_and_3_compatible_string(team_member['name'])))
         return team_members
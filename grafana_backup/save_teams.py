@@ -1,6 +1,7 @@
 import os
 from grafana_backup.dashboardApi import search_teams
 from grafana_backup.commons import to_python2_and_3_compatible_string, print_horizontal_line, save_json
+from grafana_backup.report import count_found
 
 
 def main(args, settings):
@@ -29,6 +30,7 @@ def get_all_teams_in_grafana(grafana_url, http_get_headers, verify_ssl, client_c
     if status == 200:
         teams = content['teams']
         print("There are {0} teams:".format(len(teams)))
+        count_found(len(teams))
         for team in teams:
             print("name: {0}".format(to_python2_and_3_compatible_string(team['name'])))
         return teams
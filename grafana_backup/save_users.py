@@ -1,6 +1,7 @@
 import os
 from grafana_backup.dashboardApi import search_users, get_user_org, get_user
 from grafana_backup.commons import to_python2_and_3_compatible_string, print_horizontal_line, save_json
+from grafana_backup.report import count_found
 
 
 def main(args, settings):
@@ -38,6 +39,7 @@ def get_all_users(page, limit, grafana_url, http_get_headers, verify_ssl, client
     if status == 200:
         users = content
         print("There are {0} users:".format(len(users)))
+        count_found(len(users))
         for user in users:
             print('name: {0}'.format(to_python2_and_3_compatible_string(user['name'])))
         return users
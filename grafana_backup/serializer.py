@@ -0,0 +1,165 @@
+import json
+import math
+import re
+
+# Backends in order of preference for 'auto', the stdlib json module is always available
+JSON_BACKENDS = ('orjson', 'ujson', 'json')
+
+# The fast backends format some floats differently than the stdlib (1e16 vs 1e+16, 0.00001 vs 1e-05),
+# documents containing such numbers are serialized with the stdlib so the output is always identical
+ORJSON_EXPONENT_PATTERN = re.compile(br'e[-0-9]')
+UJSON_EXPONENT_PATTERN = re.compile(r'e[-+][0-9](?![0-9])')
+# Same characters as escaped by json.dumps with ensure_ascii
+NON_ASCII_PATTERN = re.compile(r'[^\x00-\x7e]')
+# orjson reads integers outside of 64 bit as floats, documents with 19 or more digits in a row are read by the
+# stdlib. Digits are mapped to 0 and the run searched with bytes.find, a regular expression is slower than the parse
+DIGITS_TO_ZERO = bytes.maketrans(b'123456789', b'000000000')
+LONG_NUMBER = b'0' * 19
+
+backend = {'name': 'json', 'module': json}
+
+
+def set_json_backend(name='auto'):
+    names = JSON_BACKENDS if name == 'auto' else (name,)
+    for backend_name in names:
+        if backend_name not in JSON_BACKENDS:
+            raise Exception("unknown json backend '{0}', supported backends: auto, {1}".format(name, ', '.join(JSON_BACKENDS)))
+        try:
+            module = __import__(backend_name)
+        except ImportError:
+            if name != 'auto':
+                raise Exception("json backend '{0}' is not installed, install it with: pip install {0}".format(name))
+            continue
+        backend['name'] = backend_name
+        backend['module'] = module
+        return backend_name
+
+
+def get_json_backend():
+    return backend['name']
+
+
+def escape_non_ascii(match):
+    code_point = ord(match.group(0))
+    if code_point < 0x10000:
+        return '\\u{0:04x}'.format(code_point)
+    code_point -= 0x10000
+    return '\\u{0:04x}\\u{1:04x}'.format(0xd800 | (code_point >> 10), 0xdc00 | (code_point & 0x3ff))
+
+
+def ensure_ascii(content):
+    if content.isascii() and '\x7f' not in content:
+        return content
+    return NON_ASCII_PATTERN.sub(escape_non_ascii, content)
+
+
+def stdlib_dumps(data, pretty_print):
+    if pretty_print:
+        return json.dumps(data, sort_keys=True, indent=4, separators=(',', ': '))
+    return json.dumps(data)
+
+
+def has_orjson_float_format(content):
+    if b'0.0000' in content:
+        return True
+    for match in ORJSON_EXPONENT_PATTERN.finditer(content):
+        if content[match.start() - 1:match.start()].isdigit():
+            return True
+    return False
+
+
+def has_non_finite_float(data):
+    # orjson writes NaN and Infinity as null where the stdlib writes NaN and Infinity. Parsed documents only
+    # hold the exact builtin types, which are checked first to keep the walk cheap
+    stack = [data]
+    pop = stack.pop
+    extend = stack.extend
+    while stack:
+        value = pop()
+        value_type = type(value)
+        if value_type is dict:
+            extend(value.values())
+        elif value_type is list or value_type is tuple:
+            extend(value)
+        elif value_type is float:
+            if not math.isfinite(value):
+                return True
+        elif value_type is str or value_type is int or value_type is bool or value is None:
+            continue
+        elif isinstance(value, dict):
+            extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            extend(value)
+        elif isinstance(value, float) and not math.isfinite(value):
+            return True
+    return False
+
+
+def indent_four_spaces(content):
+    # orjson only indents with 2 spaces. Strings never contain raw newlines or tabs, so the indentation is
+    # replaced level by level, deepest first, with tabs which are then expanded to 4 spaces each
+    depth = 1
+    while b'\n' + b'  ' * depth in content:
+        depth += 1
+    for level in range(depth - 1, 0, -1):
+        content = content.replace(b'\n' + b'  ' * level, b'\n' + b'\t' * level)
+    return content.replace(b'\t', b'    ')
+
+
+def orjson_dumps(orjson, data, pretty_print):
+    if not pretty_print:
+        # orjson has no separator option, adding the spaces of the compact stdlib output ('{"a": 1, "b": 2}')
+        # costs more than the C encoder of the stdlib takes
+        return None
+    content = orjson.dumps(data, option=orjson.OPT_SORT_KEYS | orjson.OPT_INDENT_2)
+    if has_orjson_float_format(content):
+        return None
+    if b'null' in content and has_non_finite_float(data):
+        return None
+    return ensure_ascii(indent_four_spaces(content).decode('utf8'))
+
+
+def ujson_dumps(ujson, data, pretty_print):
+    # allow_nan=False raises on NaN and Infinity, which ujson writes as NaN and Inf
+    if pretty_print:
+        content = ujson.dumps(data, sort_keys=True, indent=4, ensure_ascii=True, escape_forward_slashes=False, allow_nan=False)
+    else:
+        content = ujson.dumps(data, ensure_ascii=True, escape_forward_slashes=False, allow_nan=False, separators=(', ', ': '))
+    if UJSON_EXPONENT_PATTERN.search(content) or '\x7f' in content:
+        return None
+    return content
+
+
+def dumps_json(data, pretty_print=False):
+    # The output is byte identical to json.dumps for every backend, pretty printed (sorted keys, 4 spaces indent)
+    # or compact, so archives and the hashes of their index do not depend on the installed backend
+    content = None
+    try:
+        if backend['name'] == 'orjson':
+            content = orjson_dumps(backend['module'], data, pretty_print)
+        elif backend['name'] == 'ujson':
+            content = ujson_dumps(backend['module'], data, pretty_print)
+    except (TypeError, ValueError, OverflowError):
+        # e.g. integers above 64 bit or non string keys, which only the stdlib handles
+        content = None
+    if content is None:
+        content = stdlib_dumps(data, pretty_print)
+    return content
+
+
+def has_long_number(data):
+    if isinstance(data, str):
+        data = data.encode('utf8')
+    return data.translate(DIGITS_TO_ZERO).find(LONG_NUMBER) != -1
+
+
+def loads_json(data):
+    if backend['name'] == 'orjson' and has_long_number(data):
+        return json.loads(data)
+    if backend['name'] != 'json':
+        try:
+            return backend['module'].loads(data)
+        except (TypeError, ValueError, OverflowError):
+            # e.g. NaN or integers above 64 bit, let the stdlib decide
+            pass
+    return json.loads(data)
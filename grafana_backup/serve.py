@@ -0,0 +1,195 @@
+from grafana_backup.save import main as save
+from grafana_backup.archive import get_archive_file
+from grafana_backup.cron import parse_cron, get_next_run
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import queue
+import sys
+import threading
+import time
+import traceback
+
+# Name of the runs triggered with 'POST /run' without a schedule, they save every component
+MANUAL_RUN = 'manual'
+
+
+def main(args, settings):
+    schedules = get_schedules(settings)
+    state = {
+        'started': datetime.now().isoformat(),
+        'running': None,
+        'queued': [],
+        'schedules': schedules,
+        'lock': threading.Lock(),
+        'run_queue': queue.Queue(),
+        'stop': threading.Event(),
+    }
+
+    # Runs share module state (request stats, json writer, archive index) and are executed one after the other
+    worker = threading.Thread(target=run_worker, args=(args, settings, state), name='run-worker')
+    worker.daemon = True
+    worker.start()
+    scheduler = threading.Thread(target=run_scheduler, args=(state,), name='scheduler')
+    scheduler.daemon = True
+    scheduler.start()
+
+    server = ThreadingHTTPServer((settings.get('SERVE_HOST'), settings.get('SERVE_PORT')), ServeRequestHandler)
+    server.state = state
+    print('serving on http://{0}:{1}, schedules: {2}'.format(
+        settings.get('SERVE_HOST'), settings.get('SERVE_PORT'),
+        ', '.join('{0} ({1})'.format(name, schedule['cron']) for (name, schedule) in schedules.items()) or 'none'))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print('stopping, waiting for the current run to finish')
+    finally:
+        state['stop'].set()
+        state['run_queue'].put(None)
+        server.server_close()
+        worker.join()
+
+
+def get_schedules(settings):
+    schedules = {}
+    for schedule in settings.get('SERVE_SCHEDULES'):
+        name = schedule.get('name')
+        if not name or name == MANUAL_RUN or name in schedules:
+            print("[ERROR] every schedule needs a unique name other than '{0}': {1}".format(MANUAL_RUN, schedule))
+            sys.exit(1)
+        try:
+            parsed = parse_cron(schedule['cron'])
+        except (KeyError, ValueError) as e:
+            print("[ERROR] schedule '{0}' has no valid cron expression: {1}".format(name, e))
+            sys.exit(1)
+        schedules[name] = {
+            'cron': schedule['cron'],
+            'parsed': parsed,
+            'components': schedule.get('components'),
+            'all_orgs': schedule.get('all_orgs', False),
+            'next_run': get_next_run(parsed, datetime.now()),
+            'last_run': None,
+        }
+    return schedules
+
+
+def queue_run(state, name):
+    # A schedule is queued at most once, a run which is late because the previous one is still busy is not repeated
+    with state['lock']:
+        if name in state['queued']:
+            return False
+        state['queued'].append(name)
+    state['run_queue'].put(name)
+    return True
+
+
+def run_scheduler(state):
+    while not state['stop'].is_set():
+        now = datetime.now()
+        for (name, schedule) in state['schedules'].items():
+            if schedule['next_run'] <= now:
+                if not queue_run(state, name):
+                    print('[WARN] skipping schedule {0}, its previous run is still queued'.format(name))
+                schedule['next_run'] = get_next_run(schedule['parsed'], now)
+        # Wake up at the start of every minute, cron has a resolution of one minute
+        state['stop'].wait(60 - now.second - now.microsecond / 1000000.0)
+
+
+def run_worker(args, settings, state):
+    while True:
+        name = state['run_queue'].get()
+        if name is None:
+            return
+        with state['lock']:
+            state['queued'].remove(name)
+            state['running'] = {'name': name, 'started': datetime.now().isoformat()}
+
+        schedule = state['schedules'].get(name, {})
+        result = run_save(args, settings, name, schedule.get('components'), schedule.get('all_orgs', False))
+
+        with state['lock']:
+            state['running'] = None
+            if name in state['schedules']:
+                state['schedules'][name]['last_run'] = result
+            else:
+                state['last_manual_run'] = result
+
+
+def run_save(args, settings, name, components, all_orgs):
+    # Every run gets its own copy of the settings and its own archive, runs in the same minute must not overwrite each other
+    run_settings = dict(settings)
+    run_settings['TIMESTAMP'] = '{0}_{1}'.format(datetime.today().strftime(settings.get('BACKUP_FILE_FORMAT')), name)
+    run_args = dict(args)
+    run_args.update({'--components': components, '--all-orgs': all_orgs, '--no-archive': False, '--resume': False})
+
+    start = time.time()
+    result = {'timestamp': run_settings['TIMESTAMP'], 'started': datetime.now().isoformat(), 'status': 'failed',
+              'failed_items': [], 'archive_file': None}
+    print('starting run {0}'.format(run_settings['TIMESTAMP']))
+    try:
+        failed_items = save(run_args, run_settings)
+        result['failed_items'] = failed_items
+        result['status'] = 'partial' if failed_items else 'ok'
+        result['archive_file'] = get_archive_file(run_settings)
+    except SystemExit as e:
+        print('[ERROR] run {0} exited with status {1}'.format(run_settings['TIMESTAMP'], e.code))
+    except Exception:
+        traceback.print_exc()
+    result['duration'] = round(time.time() - start, 3)
+    print('finished run {0}: {1} in {2}s'.format(run_settings['TIMESTAMP'], result['status'], result['duration']))
+    return result
+
+
+def get_status(state):
+    with state['lock']:
+        return {
+            'started': state['started'],
+            'running': state['running'],
+            'queued': list(state['queued']),
+            'last_manual_run': state.get('last_manual_run'),
+            'schedules': dict((name, {
+                'cron': schedule['cron'],
+                'components': schedule['components'],
+                'all_orgs': schedule['all_orgs'],
+                'next_run': schedule['next_run'].isoformat(),
+                'last_run': schedule['last_run'],
+            }) for (name, schedule) in state['schedules'].items()),
+        }
+
+
+class ServeRequestHandler(BaseHTTPRequestHandler):
+    # GET /health, GET /status and POST /run/<schedule name> (or POST /run to save everything)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self.send_json(200, {'status': 'ok'})
+        elif self.path == '/status':
+            self.send_json(200, get_status(self.server.state))
+        else:
+            self.send_json(404, {'message': 'not found'})
+
+    def do_POST(self):
+        parts = self.path.strip('/').split('/')
+        if parts[0] != 'run' or len(parts) > 2:
+            self.send_json(404, {'message': 'not found'})
+            return
+        name = parts[1] if len(parts) == 2 else MANUAL_RUN
+        if name != MANUAL_RUN and name not in self.server.state['schedules']:
+            self.send_json(404, {'message': "unknown schedule '{0}'".format(name)})
+        elif queue_run(self.server.state, name):
+            self.send_json(202, {'message': "run '{0}' queued".format(name)})
+        else:
+            self.send_json(409, {'message': "run '{0}' is already queued".format(name)})
+
+    def send_json(self, status, data):
+        content = json.dumps(data, sort_keys=True, indent=4).encode('utf8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        # Keep the output of the runs readable, only failed requests are logged
+        if len(args) > 1 and str(args[1]).startswith(('4', '5')):
+            BaseHTTPRequestHandler.log_message(self, format, *args)
@@ -3,6 +3,8 @@ from grafana_backup.pause_alerts import main as pause_alerts
 from grafana_backup.unpause_alerts import main as unpause_alerts
 from grafana_backup.make_users_viewers import main as make_users_viewers
 from grafana_backup.restore_user_permissions import main as restore_user_permissions
+from grafana_backup.dashboardApi import configure_retries
+from grafana_backup.tracing import configure_tracing
 from docopt import docopt
 import sys
 
@@ -28,6 +30,9 @@ Options:
     args = docopt(docstring, help=False,
                   version='{0} {1}'.format(PKG_NAME, PKG_VERSION))
 
+    configure_retries(settings)
+    configure_tracing(settings)
+
     combined_args = precommand_args.copy()
     combined_args.update(args)
 
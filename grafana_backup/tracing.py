@@ -0,0 +1,156 @@
+from urllib.parse import urlparse
+import atexit
+import collections
+import re
+import threading
+
+# Upper bounds in seconds of the latency histogram buckets, the last bucket counts everything slower
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+# Endpoints called by the tool, literal paths come before the templates they would also match
+ENDPOINT_TEMPLATES = (
+    '/api/dashboards/db',
+    '/api/dashboards/db/{slug}',
+    '/api/dashboards/uid/{uid}',
+    '/api/dashboards/id/{id}/versions',
+    '/api/dashboards/id/{id}/versions/{version}',
+    '/api/dashboards/{slug}',
+    '/api/dashboard/snapshots',
+    '/api/snapshots/{key}',
+    '/api/datasources/uid/{uid}',
+    '/api/datasources/{id}',
+    '/api/folders/{uid}',
+    '/api/folders/{uid}/permissions',
+    '/api/library-elements/{uid}',
+    '/api/alert-notifications/uid/{uid}',
+    '/api/alert-notifications/{id}',
+    '/api/alerts/{id}/pause',
+    '/api/annotations/{id}',
+    '/api/teams/search',
+    '/api/teams/{id}',
+    '/api/teams/{id}/members',
+    '/api/teams/{id}/members/{user_id}',
+    '/api/org/users/{user_id}',
+    '/api/orgs/{id}',
+    '/api/orgs/{id}/users',
+    '/api/users/lookup',
+    '/api/users/{id}',
+    '/api/users/{id}/orgs',
+    '/api/v1/provisioning/alert-rules/{uid}',
+    '/api/v1/provisioning/contact-points/{uid}',
+    '/api/v1/provisioning/templates/{name}',
+)
+ENDPOINT_PATTERNS = [(re.compile('^' + re.sub(r'\\{\w+\\}', '[^/]+', re.escape(template)) + '$'), template)
+                     for template in ENDPOINT_TEMPLATES]
+# Status of requests which got no response
+NO_RESPONSE = 'error'
+
+# (method, endpoint template) -> counts, bytes and latency histogram of the requests
+endpoint_stats = collections.OrderedDict()
+endpoint_stats_lock = threading.Lock()
+# Called with (method, url, endpoint, status, size, start, elapsed) after every request attempt
+request_hooks = []
+tracer_provider = {'provider': None}
+
+
+def add_request_hook(hook):
+    if hook not in request_hooks:
+        request_hooks.append(hook)
+
+
+def remove_request_hook(hook):
+    if hook in request_hooks:
+        request_hooks.remove(hook)
+
+
+def get_endpoint_template(url):
+    # The path below '/api/', Grafana can be served from a sub path, query strings are dropped
+    path = urlparse(url).path
+    path = path[path.find('/api/'):] if '/api/' in path else path
+    path = path.rstrip('/') or '/'
+    for (pattern, template) in ENDPOINT_PATTERNS:
+        if pattern.match(path):
+            return template
+    # Unknown endpoints only keep their numeric ids out of the template
+    return re.sub(r'/\d+(?=/|$)', '/{id}', path)
+
+
+def trace_request(method, url, status, size, start, elapsed):
+    endpoint = get_endpoint_template(url)
+    with endpoint_stats_lock:
+        stats = endpoint_stats.get((method, endpoint))
+        if stats is None:
+            stats = endpoint_stats[(method, endpoint)] = {'statuses': collections.Counter(), 'bytes': 0, 'seconds': 0.0,
+                                                          'max_seconds': 0.0, 'buckets': [0] * len(LATENCY_BUCKETS)}
+        stats['statuses'][str(status)] += 1
+        stats['bytes'] += size
+        stats['seconds'] += elapsed
+        stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+        stats['buckets'][next(index for (index, bound) in enumerate(LATENCY_BUCKETS) if elapsed <= bound)] += 1
+    for hook in list(request_hooks):
+        hook(method, url, endpoint, status, size, start, elapsed)
+
+
+def reset_endpoint_stats():
+    with endpoint_stats_lock:
+        endpoint_stats.clear()
+
+
+def get_endpoint_stats():
+    with endpoint_stats_lock:
+        result = []
+        for ((method, endpoint), stats) in endpoint_stats.items():
+            count = sum(stats['buckets'])
+            result.append({
+                'method': method,
+                'endpoint': endpoint,
+                'requests': count,
+                'statuses': dict(stats['statuses']),
+                'bytes': stats['bytes'],
+                'seconds': round(stats['seconds'], 3),
+                'mean_ms': round(stats['seconds'] / count * 1000, 1),
+                'max_ms': round(stats['max_seconds'] * 1000, 1),
+                # Cumulative counts per upper bound, 'inf' for the last bucket
+                'histogram': [[str(bound), sum(stats['buckets'][:index + 1])] for (index, bound) in enumerate(LATENCY_BUCKETS)],
+            })
+    return sorted(result, key=lambda entry: -entry['seconds'])
+
+
+def configure_tracing(settings):
+    if not settings.get('OTEL_TRACES') or tracer_provider['provider'] is not None:
+        return
+    # The OpenTelemetry SDK is only imported when traces are enabled
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        raise Exception("otel_traces needs the OpenTelemetry SDK, install it with: pip install grafana-backup[otel]")
+
+    # The collector is configured with the standard OTEL_EXPORTER_OTLP_* environment variables
+    provider = TracerProvider(resource=Resource.create({'service.name': settings.get('OTEL_SERVICE_NAME')}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    tracer_provider['provider'] = provider
+    # Spans still buffered are sent before the process exits
+    atexit.register(provider.shutdown)
+    add_request_hook(get_span_hook(provider.get_tracer('grafana_backup')))
+
+
+def get_span_hook(tracer):
+    def emit_span(method, url, endpoint, status, size, start, elapsed):
+        parsed_url = urlparse(url)
+        span = tracer.start_span('{0} {1}'.format(method, endpoint), start_time=int(start * 1e9), attributes={
+            'http.request.method': method,
+            'url.full': url,
+            'url.template': endpoint,
+            'server.address': parsed_url.hostname or '',
+            'http.response.body.size': size,
+        })
+        if status == NO_RESPONSE:
+            span.set_attribute('error.type', 'connection')
+        else:
+            span.set_attribute('http.response.status_code', status)
+            if status >= 500:
+                span.set_attribute('error.type', str(status))
+        span.end(end_time=int((start + elapsed) * 1e9))
+    return emit_span
@@ -0,0 +1,22 @@
+from grafana_backup.serializer import dumps_json, loads_json
+from grafana_backup.dashboardApi import update_datasource, create_datasource
+
+
+def main(args, settings, file_path):
+    grafana_url = settings.get('GRAFANA_URL')
+    http_post_headers = settings.get('HTTP_POST_HEADERS')
+    verify_ssl = settings.get('VERIFY_SSL')
+    client_cert = settings.get('CLIENT_CERT')
+    debug = settings.get('DEBUG')
+
+    with open(file_path, 'r') as f:
+        data = f.read()
+
+    datasource = loads_json(data)
+    datasource.pop('id', None)
+    if datasource.get('uid'):
+        result = update_datasource(datasource['uid'], dumps_json(datasource), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
+    else:
+        # Datasources saved before uids existed can only be found by name, they are created as before
+        result = create_datasource(dumps_json(datasource), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
+    print("update datasource: {0}, status: {1}, msg: {2}".format(datasource['name'], result[0], result[1]))
@@ -0,0 +1,18 @@
+from grafana_backup.serializer import dumps_json, loads_json
+from grafana_backup.dashboardApi import update_folder
+
+
+def main(args, settings, file_path):
+    grafana_url = settings.get('GRAFANA_URL')
+    http_post_headers = settings.get('HTTP_POST_HEADERS')
+    verify_ssl = settings.get('VERIFY_SSL')
+    client_cert = settings.get('CLIENT_CERT')
+    debug = settings.get('DEBUG')
+
+    with open(file_path, 'r') as f:
+        data = f.read()
+
+    folder = loads_json(data)
+    payload = {'title': folder.get('title', ''), 'overwrite': True}
+    result = update_folder(folder['uid'], dumps_json(payload), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
+    print("update folder {0}, status: {1}, msg: {2}\n".format(folder.get('title', ''), result[0], result[1]))
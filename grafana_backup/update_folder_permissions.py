@@ -1,4 +1,4 @@
-import json
+from grafana_backup.serializer import loads_json
 from grafana_backup.dashboardApi import update_folder_permissions
 
 
@@ -12,7 +12,7 @@ def main(args, settings, file_path):
     with open(file_path, 'r') as f:
         data = f.read()
 
-    folder_permissions = json.loads(data)
+    folder_permissions = loads_json(data)
     if folder_permissions:
         result = update_folder_permissions(folder_permissions, grafana_url, http_post_headers, verify_ssl, client_cert, debug)
         print("update folder permissions {0}, status: {1}, msg: {2}\n".format(folder_permissions[0].get('title', ''), result[0], result[1]))
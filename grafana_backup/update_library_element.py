@@ -0,0 +1,33 @@
+from grafana_backup.serializer import dumps_json, loads_json
+from grafana_backup.dashboardApi import update_library_element, get_library_element
+
+
+def main(args, settings, file_path):
+    grafana_url = settings.get('GRAFANA_URL')
+    http_get_headers = settings.get('HTTP_GET_HEADERS')
+    http_post_headers = settings.get('HTTP_POST_HEADERS')
+    verify_ssl = settings.get('VERIFY_SSL')
+    client_cert = settings.get('CLIENT_CERT')
+    debug = settings.get('DEBUG')
+
+    with open(file_path, 'r') as f:
+        data = f.read()
+
+    library_element = loads_json(data)
+    # Grafana only accepts a change made against the current version of the element
+    (status, content) = get_library_element(library_element['uid'], grafana_url, http_get_headers, verify_ssl, client_cert, debug)
+    if status != 200:
+        print("query library_element {0} failed, status: {1}, msg: {2}".format(library_element['name'], status, content))
+        return
+
+    payload = {
+        'uid': library_element['uid'],
+        'name': library_element['name'],
+        'kind': library_element['kind'],
+        'model': library_element['model'],
+        'folderUid': library_element.get('meta', {}).get('folderUid', library_element.get('folderUid', '')),
+        'version': content['result']['version'],
+    }
+    result = update_library_element(library_element['uid'], dumps_json(payload), grafana_url, http_post_headers, verify_ssl,
+                                    client_cert, debug)
+    print("update library_elements: {0}, status: {1}, msg: {2}".format(library_element['name'], result[0], result[1]))
@@ -1,4 +1,4 @@
-import json
+from grafana_backup.serializer import dumps_json, loads_json
 from grafana_backup.dashboardApi import update_notification_policy, get_grafana_version
 from packaging import version
 
@@ -27,10 +27,10 @@ def main(args, settings, file_path):
         with open(file_path, 'r') as f:
             data = f.read()
 
-        notification_policies = json.loads(data)
+        notification_policies = loads_json(data)
         http_post_headers['x-disable-provenance'] = '*'
 
-        result = update_notification_policy(json.dumps(
+        result = update_notification_policy(dumps_json(
             notification_policies), grafana_url, http_post_headers, verify_ssl, client_cert, debug)
         print("update notification_policy, status: {0}, msg: {1}".format(
             result[0], result[1]))
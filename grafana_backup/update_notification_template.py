@@ -1,4 +1,4 @@
-import json
+from grafana_backup.serializer import dumps_json, loads_json
 from grafana_backup.dashboardApi import update_notification_template, get_grafana_version
 from packaging import version
 
@@ -27,11 +27,11 @@ def main(args, settings, file_path):
         with open(file_path, 'r') as f:
             data = f.read()
 
-        notification_template = json.loads(data)
+        notification_template = loads_json(data)
         http_post_headers['x-disable-provenance'] = '*'
 
         result = update_notification_template(
-            notification_template['name'], json.dumps(notification_template), grafana_url, http_post_headers, verify_ssl, client_cert, debug
+            notification_template['name'], dumps_json(notification_template), grafana_url, http_post_headers, verify_ssl, client_cert, debug
         )
         print("update notification template: {0}, status: {1}, msg: {2}".format(notification_template['name'], result[0], result[1]))
     else:
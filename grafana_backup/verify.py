@@ -0,0 +1,71 @@
+from grafana_backup.compression import open_archive_reader, iter_archive_members
+from grafana_backup.commons import load_archive_index, get_member_key, ARCHIVE_INDEX_FILE
+import hashlib
+import os
+import tarfile
+import zipfile
+import zlib
+
+# Members are hashed in blocks, a member is never held in memory as a whole
+HASH_BLOCK_SIZE = 1024 * 1024
+# Problems listed per kind, the counts are always complete
+MAX_LISTED_PROBLEMS = 20
+
+
+def main(args, settings):
+    # Returns True if every object of the archive matches the size and sha256 recorded in its archive index
+    archive_file = args.get('<archive_file>')
+    print('verifying {0}'.format(archive_file))
+
+    index = {}
+    members = {}
+    try:
+        archive = open_archive_reader(open(archive_file, 'rb'))
+        for (member_name, f) in iter_archive_members(archive):
+            if os.path.basename(member_name) == ARCHIVE_INDEX_FILE:
+                index.update(load_archive_index(line.decode('utf8') for line in f))
+            elif os.path.splitext(member_name)[1] != '.txt':
+                # Log files are not listed in the index
+                members[get_member_key(member_name)] = get_member_hash(f)
+    except (IOError, EOFError, tarfile.TarError, zipfile.BadZipFile, zlib.error) as e:
+        # Truncated archives and checksum errors of the compression end the stream
+        print('[ERROR] {0} is corrupt after {1} members: {2}'.format(archive_file, len(members), e))
+        return False
+
+    if not index:
+        print('[ERROR] {0} has no archive index, it was created before the index was added'.format(archive_file))
+        return False
+
+    problems = {'missing': [], 'unlisted': [], 'mismatched': [], 'unverifiable': []}
+    for (path, entry) in index.items():
+        if path not in members:
+            problems['missing'].append(path)
+        elif not entry.get('sha256'):
+            # Indexes written before the hashes were added
+            problems['unverifiable'].append(path)
+        elif members[path] != (entry['sha256'], entry.get('size')):
+            problems['mismatched'].append(path)
+    problems['unlisted'] = sorted(set(members) - set(index))
+
+    print('{0} objects in the archive index, {1} members checked'.format(len(index), len(members)))
+    for (problem, paths) in problems.items():
+        if paths:
+            print('{0}: {1}'.format(problem, len(paths)))
+        for path in sorted(paths)[:MAX_LISTED_PROBLEMS]:
+            print('  {0}'.format(path))
+        if len(paths) > MAX_LISTED_PROBLEMS:
+            print('  ... {0} more'.format(len(paths) - MAX_LISTED_PROBLEMS))
+
+    # Unverifiable objects are not an error, the archive is older than the hashes
+    verified = not (problems['missing'] or problems['unlisted'] or problems['mismatched'])
+    print('{0}: {1}'.format(archive_file, 'OK' if verified else 'FAILED'))
+    return verified
+
+
+def get_member_hash(f):
+    sha256 = hashlib.sha256()
+    size = 0
+    for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+        sha256.update(block)
+        size += len(block)
+    return (sha256.hexdigest(), size)
@@ -30,5 +30,13 @@ setup(
     },
     packages=find_packages(),
     install_requires=requires,
+    extras_require={
+        'zstd': ['zstandard'],
+        'lz4': ['lz4'],
+        'orjson': ['orjson'],
+        'ujson': ['ujson'],
+        'profile': ['pyinstrument'],
+        'otel': ['opentelemetry-sdk', 'opentelemetry-exporter-otlp-proto-http'],
+    },
     package_data={'': ['conf/*']},
 )
@@ -0,0 +1,112 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tarfile
+
+import pytest
+
+# The tests run the command modules against the fake Grafana of the benchmarks
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+sys.path.insert(0, ROOT)
+
+from fake_grafana import FakeGrafana  # noqa: E402
+from fixtures import Fixtures  # noqa: E402
+from grafana_backup.grafanaSettings import main as conf  # noqa: E402
+from grafana_backup.save import main as save  # noqa: E402
+from grafana_backup.archive import main as archive, get_archive_file  # noqa: E402
+from grafana_backup.commons import ARCHIVE_INDEX_FILE  # noqa: E402
+
+
+def run_quietly(function, *args):
+    # (return value, printed output) of a command
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        result = function(*args)
+    return (result, out.getvalue())
+
+
+def rewrite_archive(archive_file, change_member):
+    # Writes a gzip archive again with change_member(name, content) applied to every member, None leaves it out
+    with tarfile.open(archive_file, 'r:gz') as tar:
+        members = [(member, tar.extractfile(member).read() if member.isfile() else None) for member in tar]
+    with tarfile.open(archive_file, 'w:gz') as tar:
+        for (member, content) in members:
+            if content is None:
+                tar.addfile(member)
+                continue
+            content = change_member(member.name, content)
+            if content is None:
+                continue
+            member.size = len(content)
+            tar.addfile(member, io.BytesIO(content))
+
+
+def without_index(name, content):
+    # Member change of rewrite_archive giving an archive from before the archive index
+    return None if os.path.basename(name) == ARCHIVE_INDEX_FILE else content
+
+
+class Interrupted(Exception):
+    # Stands in for a crash or ^C in the middle of a run
+    pass
+
+
+def interrupt_after(monkeypatch, module, name, count):
+    # The function of the module raises Interrupted when it is called after count calls
+    function = getattr(module, name)
+    calls = []
+
+    def interrupted(*args, **kwargs):
+        if len(calls) >= count:
+            raise Interrupted('{0} interrupted after {1} calls'.format(name, count))
+        calls.append(args)
+        return function(*args, **kwargs)
+
+    monkeypatch.setattr(module, name, interrupted)
+
+
+@pytest.fixture
+def start_grafana():
+    # Starts fake Grafanas serving the given fixtures, they are stopped after the test
+    servers = []
+
+    def start(**fixtures):
+        grafana = FakeGrafana(Fixtures(**fixtures))
+        grafana.start()
+        servers.append(grafana)
+        return grafana
+
+    yield start
+    for grafana in servers:
+        grafana.stop()
+
+
+@pytest.fixture
+def make_settings(tmp_path):
+    # Settings of a grafana, every setting of the run shares the backup dir of the test
+    def make(grafana, **general):
+        config = {'general': dict({'debug': False, 'backup_dir': str(tmp_path), 'run_report': False, 'http_retries': 0},
+                                  **general),
+                  'grafana': {'url': grafana.url, 'token': 'test'}}
+        config_path = str(tmp_path / 'grafanaSettings.json')
+        with open(config_path, 'w') as f:
+            json.dump(config, f)
+        return conf(config_path)
+
+    return make
+
+
+@pytest.fixture
+def save_archive(make_settings):
+    # Saves a grafana into an archive named after the timestamp, two saves of a test need different timestamps
+    def save_archive(grafana, timestamp, components='folder,dashboard,datasource', **general):
+        settings = make_settings(grafana, **general)
+        settings['TIMESTAMP'] = timestamp
+        run_quietly(save, {'--components': components, '--no-archive': True}, settings)
+        run_quietly(archive, {}, settings)
+        return get_archive_file(settings)
+
+    return save_archive
@@ -0,0 +1,89 @@
+import collections
+import json
+
+import pytest
+
+from conftest import run_quietly
+from grafana_backup.archive import main as archive, get_archive_file
+from grafana_backup.compression import open_archive_reader, iter_archive_members
+from grafana_backup.restore import main as restore
+from grafana_backup.save import main as save
+
+
+def get_writes(grafana):
+    return dict((key, count) for (key, count) in grafana.requests.items() if key[0] != 'GET')
+
+
+@pytest.fixture
+def all_orgs_archive(start_grafana, make_settings, monkeypatch):
+    # Archive of 'save --all-orgs' of two organizations with 5 dashboards in 1 folder and 1 datasource each
+    monkeypatch.setenv('GRAFANA_ADMIN_ACCOUNT', 'admin')
+    monkeypatch.setenv('GRAFANA_ADMIN_PASSWORD', 'admin')
+    grafana = start_grafana(dashboards=5, folders=1, datasources=1, orgs=2)
+    settings = make_settings(grafana)
+    settings['TIMESTAMP'] = '202001010000'
+    run_quietly(save, {'--components': 'folder,dashboard,datasource', '--all-orgs': True, '--no-archive': True}, settings)
+    run_quietly(archive, {}, settings)
+    return get_archive_file(settings)
+
+
+def test_save_all_orgs_partitions_the_archive(all_orgs_archive):
+    with open(all_orgs_archive, 'rb') as f:
+        names = [name for (name, member) in iter_archive_members(open_archive_reader(f))]
+    dashboards = collections.Counter(name.split('/orgs/')[1].split('/')[0] for name in names if name.endswith('.dashboard'))
+    assert dashboards == {'1': 5, '2': 5}
+
+
+def test_restore_refuses_all_orgs_archive_without_org(all_orgs_archive, start_grafana, make_settings):
+    target = start_grafana(dashboards=0, folders=0, datasources=0)
+    with pytest.raises(SystemExit) as e:
+        run_quietly(restore, {'<archive_file>': all_orgs_archive}, make_settings(target))
+    assert e.value.code == 1
+    assert get_writes(target) == {}
+
+
+def test_restore_refuses_missing_org(all_orgs_archive, start_grafana, make_settings):
+    target = start_grafana(dashboards=0, folders=0, datasources=0)
+    with pytest.raises(SystemExit) as e:
+        run_quietly(restore, {'<archive_file>': all_orgs_archive, '--org': '3'}, make_settings(target))
+    assert e.value.code == 1
+    assert get_writes(target) == {}
+
+
+def test_restore_refuses_org_of_single_org_archive(start_grafana, save_archive, make_settings):
+    archive_file = save_archive(start_grafana(dashboards=5, folders=1), '202001010000')
+    target = start_grafana(dashboards=0, folders=0, datasources=0)
+    with pytest.raises(SystemExit) as e:
+        run_quietly(restore, {'<archive_file>': archive_file, '--org': '1'}, make_settings(target))
+    assert e.value.code == 1
+    assert get_writes(target) == {}
+
+
+def test_restore_one_org(all_orgs_archive, start_grafana, make_settings):
+    target = start_grafana(dashboards=0, folders=0, datasources=0)
+    run_quietly(restore, {'<archive_file>': all_orgs_archive, '--org': '2'}, make_settings(target))
+    assert target.created['dashboard'] == 5
+    assert target.created['folder'] == 1
+    assert target.created['datasource'] == 1
+    # Every write goes to the organization of the partition
+    assert list(target.write_orgs) == ['2']
+
+
+def test_plan_of_one_org(all_orgs_archive, start_grafana, make_settings):
+    target = start_grafana(dashboards=6, folders=1, datasources=1, orgs=2)
+    settings = make_settings(target)
+    run_quietly(restore, {'<archive_file>': all_orgs_archive, '--org': '2', '--plan': True}, settings)
+    with open(settings['RESTORE_PLAN'], 'r') as f:
+        plan = json.load(f)
+    assert len([item for item in plan['items'].values() if item['component'] == 'dashboard']) == 5
+    assert [(item['component'], item['uid']) for item in plan['deletes']] == [('dashboard', 'dashboard5')]
+
+    # The deletes of the plan are only applied to the organization it was made for
+    with pytest.raises(SystemExit) as e:
+        run_quietly(restore, {'<archive_file>': all_orgs_archive, '--org': '1', '--apply-plan': True}, make_settings(target))
+    assert e.value.code == 1
+    assert get_writes(target) == {}
+
+    run_quietly(restore, {'<archive_file>': all_orgs_archive, '--org': '2', '--apply-plan': True}, make_settings(target))
+    assert get_writes(target)[('DELETE', '/api/dashboards/uid/{id}')] == 1
+    assert list(target.write_orgs) == ['2']
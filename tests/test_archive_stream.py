@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from conftest import run_quietly, interrupt_after, Interrupted
+from grafana_backup import save_dashboards
+from grafana_backup.archive import get_archive_file
+from grafana_backup.compression import open_archive_reader, iter_archive_members
+from grafana_backup.diff import get_archive_hashes, get_changes
+from grafana_backup.save import main as save
+
+TIMESTAMP = '202001010000'
+
+
+def get_archived_dashboards(archive_file):
+    with open(archive_file, 'rb') as f:
+        return sorted(os.path.basename(name) for (name, member) in iter_archive_members(open_archive_reader(f))
+                      if name.endswith('.dashboard'))
+
+
+def get_loose_objects(backup_dir):
+    return [file_name for (root, dirnames, file_names) in os.walk(backup_dir) for file_name in file_names
+            if file_name.endswith(('.dashboard', '.folder', '.datasource'))]
+
+
+def test_stream_archive_matches_loose_file_archive(start_grafana, save_archive, tmp_path):
+    grafana = start_grafana(dashboards=10, folders=3)
+    streamed = save_archive(grafana, '202001010000', archive_stream=True)
+    # Streamed objects never touch the disk
+    assert get_loose_objects(str(tmp_path)) == []
+    loose = save_archive(grafana, '202001010100')
+
+    (hashes, titles) = run_quietly(get_archive_hashes, streamed)[0]
+    (other_hashes, other_titles) = run_quietly(get_archive_hashes, loose)[0]
+    changes = get_changes(hashes, other_hashes)
+    assert len(changes['unchanged']) == 21
+    assert not (changes['added'] or changes['removed'] or changes['changed'])
+
+
+def test_resume_after_interrupted_stream(start_grafana, make_settings, monkeypatch):
+    grafana = start_grafana(dashboards=10, folders=3)
+    settings = make_settings(grafana, archive_stream=True)
+    settings['TIMESTAMP'] = TIMESTAMP
+    interrupt_after(monkeypatch, save_dashboards, 'save_dashboard_setting', 5)
+    with pytest.raises(Interrupted):
+        run_quietly(save, {'--components': 'folder,dashboard'}, settings)
+    monkeypatch.undo()
+    # The partial archive is deleted with the objects written into it
+    assert not os.path.exists(get_archive_file(settings))
+
+    run_quietly(save, {'--components': 'folder,dashboard', '--resume': True, '<timestamp>': TIMESTAMP},
+                make_settings(grafana, archive_stream=True))
+    assert get_archived_dashboards(get_archive_file(settings)) == sorted(
+        'dashboard{0}.dashboard'.format(number) for number in range(10))
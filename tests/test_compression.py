@@ -0,0 +1,105 @@
+import gzip
+import io
+import os
+import random
+import tarfile
+
+import pytest
+
+from grafana_backup.compression import (ARCHIVE_EXTENSIONS, ParallelGzipWriter, open_archive_writer, open_archive_reader,
+                                        detect_codec, extract_archive, iter_archive_members, read_archive_member)
+
+# (codec, compression threads), gzip with more than one thread uses the parallel writer
+CODECS = [('gzip', 1), ('gzip', 4), ('xz', 1), ('none', 1), ('zip', 1), ('zstd', 1), ('zstd', 4), ('lz4', 1)]
+OPTIONAL_PACKAGES = {'zstd': 'zstandard', 'lz4': 'lz4.frame'}
+
+
+def make_backup_files(path):
+    # Loose files like save leaves them, one of them larger than a block of the parallel gzip writer
+    rand = random.Random(1)
+    files = {}
+    for (folder, count) in (('dashboards', 20), ('folders', 3)):
+        os.makedirs(os.path.join(path, folder, '202001010000'))
+        for number in range(count):
+            file_path = os.path.join(path, folder, '202001010000', '{0}{1}.{2}'.format(folder, number, folder[:-1]))
+            content = ''.join(rand.choice('{}[]":, abcdef0123456789\n') for _ in range(rand.randint(0, 5000))).encode('utf8')
+            with open(file_path, 'wb') as f:
+                f.write(content)
+            files[file_path.lstrip('/')] = content
+    large = os.path.join(path, 'dashboards', '202001010000', 'large.dashboard')
+    content = bytes(rand.getrandbits(8) for _ in range(100000)) + b'x' * 3000000
+    with open(large, 'wb') as f:
+        f.write(content)
+    files[large.lstrip('/')] = content
+    return files
+
+
+@pytest.fixture(params=CODECS, ids=['{0}-{1}'.format(codec, threads) for (codec, threads) in CODECS])
+def codec_settings(request):
+    (codec, threads) = request.param
+    if codec in OPTIONAL_PACKAGES:
+        pytest.importorskip(OPTIONAL_PACKAGES[codec])
+    return {'ARCHIVE_CODEC': codec, 'ARCHIVE_COMPRESSION_LEVEL': None, 'ARCHIVE_COMPRESSION_THREADS': threads}
+
+
+def write_archive(tmp_path, settings):
+    files = make_backup_files(str(tmp_path / 'backup'))
+    archive_file = str(tmp_path / ('archive' + ARCHIVE_EXTENSIONS[settings['ARCHIVE_CODEC']]))
+    streamed = b'{"uid": "streamed"}'
+    with open_archive_writer(archive_file, settings) as tar:
+        tar.add(str(tmp_path / 'backup'))
+        # Objects written while they are fetched, like 'save' without --no-archive
+        tarinfo = tarfile.TarInfo('streamed/index.jsonl')
+        tarinfo.size = len(streamed)
+        tar.addfile(tarinfo, io.BytesIO(streamed))
+    files['streamed/index.jsonl'] = streamed
+    return (archive_file, files)
+
+
+def test_archive_round_trip(tmp_path, codec_settings):
+    (archive_file, files) = write_archive(tmp_path, codec_settings)
+    with open(archive_file, 'rb') as f:
+        assert detect_codec(f) == codec_settings['ARCHIVE_CODEC']
+        members = dict((name, member.read()) for (name, member) in iter_archive_members(open_archive_reader(f)))
+    assert members == files
+
+
+def test_extract_archive_selected_members(tmp_path, codec_settings):
+    (archive_file, files) = write_archive(tmp_path, codec_settings)
+    with open(archive_file, 'rb') as f:
+        extract_archive(open_archive_reader(f), str(tmp_path / 'restore'), select=lambda name: name.endswith('.folder'))
+    extracted = {}
+    for (root, dirnames, filenames) in os.walk(str(tmp_path / 'restore')):
+        for file_name in filenames:
+            with open(os.path.join(root, file_name), 'rb') as f:
+                extracted[os.path.relpath(os.path.join(root, file_name), str(tmp_path / 'restore'))] = f.read()
+    assert extracted == dict((name, content) for (name, content) in files.items() if name.endswith('.folder'))
+
+
+def test_read_archive_member_only_from_zip(tmp_path, codec_settings):
+    (archive_file, files) = write_archive(tmp_path, codec_settings)
+    with open(archive_file, 'rb') as f:
+        content = read_archive_member(open_archive_reader(f), 'index.jsonl')
+    if codec_settings['ARCHIVE_CODEC'] == 'zip':
+        assert content == '{"uid": "streamed"}'
+    else:
+        assert content is None
+
+
+@pytest.mark.parametrize('size', [0, 1, 1000, 4096, 10000, 100000])
+def test_parallel_gzip_writer(size):
+    # Blocks are deflated with the end of the previous block as dictionary and concatenated into one gzip member
+    rand = random.Random(size)
+    data = bytes(rand.choice(b'abcdefgh ') for _ in range(size))
+    out = io.BytesIO()
+    with ParallelGzipWriter(out, 6, 3, block_size=4096) as compressed:
+        for start in range(0, size, 777):
+            compressed.write(data[start:start + 777])
+    assert gzip.decompress(out.getvalue()) == data
+
+
+def test_unknown_codec(tmp_path):
+    settings = {'ARCHIVE_CODEC': 'rar', 'ARCHIVE_COMPRESSION_LEVEL': None, 'ARCHIVE_COMPRESSION_THREADS': 1}
+    with pytest.raises(Exception, match="unknown archive codec 'rar'"):
+        with open_archive_writer(str(tmp_path / 'archive.rar'), settings):
+            pass
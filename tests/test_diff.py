@@ -0,0 +1,64 @@
+import pytest
+
+from conftest import run_quietly, rewrite_archive, without_index
+from grafana_backup import diff
+
+
+def get_changes(archive_file, other_archive_file, components=None):
+    ((hashes, titles), output) = run_quietly(diff.get_archive_hashes, archive_file, components)
+    ((other_hashes, other_titles), output) = run_quietly(diff.get_archive_hashes, other_archive_file, components)
+    changes = diff.get_changes(hashes, other_hashes)
+    return dict((change, len(object_keys)) for (change, object_keys) in changes.items())
+
+
+@pytest.fixture
+def archives(start_grafana, save_archive):
+    # Archives of the same instance saved twice and as zip, and of an instance where every dashboard changed and two
+    # were added
+    grafana = start_grafana(dashboards=20, folders=3)
+    changed = start_grafana(dashboards=22, folders=3, seed=7)
+    return {'first': save_archive(grafana, '202001010000'), 'second': save_archive(grafana, '202001010100'),
+            'zip': save_archive(grafana, '202001010200', archive_codec='zip'),
+            'changed': save_archive(changed, '202001010300')}
+
+
+def test_diff_of_the_same_instance(archives):
+    args = {'<archive_file>': archives['first'], '<other_archive_file>': archives['second']}
+    (differ, output) = run_quietly(diff.main, args, {})
+    assert differ is False
+    assert 'using the hashes of the archive index' in output
+    assert get_changes(archives['first'], archives['second']) == {'added': 0, 'removed': 0, 'changed': 0, 'unchanged': 31}
+
+
+def test_diff_does_not_depend_on_the_codec(archives):
+    assert get_changes(archives['first'], archives['zip'])['unchanged'] == 31
+
+
+def test_diff_of_a_changed_instance(archives):
+    args = {'<archive_file>': archives['first'], '<other_archive_file>': archives['changed'], '--json-diff': True}
+    (differ, output) = run_quietly(diff.main, args, {})
+    assert differ is True
+    assert '+ dashboards/dashboard21.dashboard (Dashboard 21)' in output
+    assert '\n~ dashboards/dashboard0.dashboard\n' in output
+    assert get_changes(archives['first'], archives['changed']) == {'added': 2, 'removed': 0, 'changed': 20, 'unchanged': 11}
+    datasource_changes = get_changes(archives['first'], archives['changed'], ['datasource'])
+    assert datasource_changes == {'added': 0, 'removed': 0, 'changed': 0, 'unchanged': 5}
+
+
+def test_diff_without_index_hashes(archives):
+    # Objects of archives without an archive index are hashed as they are read
+    rewrite_archive(archives['second'], without_index)
+    assert get_changes(archives['first'], archives['second'])['unchanged'] == 31
+
+
+def test_get_object_key():
+    assert diff.get_object_key('backup/dashboards/202001010000/abc.dashboard') == 'dashboards/abc.dashboard'
+    assert diff.get_object_key('backup/orgs/2/folders/202001010000/x.folder') == 'orgs/2/folders/x.folder'
+    assert diff.get_object_key('dashboards/folders/202001010000/folders.folder') == 'folders/folders.folder'
+
+
+def test_get_json_changes():
+    value = {'title': 'a', 'panels': [{'id': 1}, {'id': 2}], 'tags': ['x']}
+    other_value = {'title': 'b', 'panels': [{'id': 1}], 'tags': ['x'], 'uid': 'c'}
+    assert list(diff.get_json_changes(value, other_value)) == [('.panels[1]', {'id': 2}, diff.MISSING),
+                                                               ('.title', 'a', 'b'), ('.uid', diff.MISSING, 'c')]
@@ -0,0 +1,13 @@
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+
+def test_cloud_sdks_are_not_imported_at_startup():
+    # Same check as the 'Check startup imports' step of the CI workflow
+    bench_importtime = os.path.join(ROOT, 'benchmarks', 'bench_importtime.py')
+    process = subprocess.run([sys.executable, bench_importtime, '--repeat=1', '--check'],
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    assert process.returncode == 0, process.stdout
@@ -0,0 +1,63 @@
+import collections
+
+import pytest
+
+from conftest import run_quietly, interrupt_after, Interrupted
+from grafana_backup import restore as restore_module
+from grafana_backup.commons import load_restore_journal
+from grafana_backup.restore import main as restore
+
+
+def get_writes(grafana):
+    return sum(count for (key, count) in grafana.requests.items() if key[0] != 'GET')
+
+
+def restore_archive(make_settings, grafana, archive_file, **args):
+    settings = make_settings(grafana, http_retries=0, http_retry_backoff=0.01)
+    run_quietly(restore, dict({'<archive_file>': archive_file}, **args), settings)
+    return load_restore_journal(settings['RESTORE_JOURNAL'])
+
+
+@pytest.fixture
+def archive_file(start_grafana, save_archive):
+    return save_archive(start_grafana(dashboards=10, folders=3), '202001010000')
+
+
+def test_restore_journal(archive_file, start_grafana, make_settings):
+    target = start_grafana(dashboards=0, folders=0, datasources=0)
+    journal = restore_archive(make_settings, target, archive_file)
+    # 10 dashboards, 3 folders with their permissions and 5 datasources
+    assert len(journal) == 21
+    assert collections.Counter(journal.values()) == {'created': 21}
+
+
+def test_resume_skips_confirmed_items(archive_file, start_grafana, make_settings, monkeypatch):
+    complete = start_grafana(dashboards=0, folders=0, datasources=0)
+    restore_archive(make_settings, complete, archive_file)
+
+    target = start_grafana(dashboards=0, folders=0, datasources=0)
+    interrupt_after(monkeypatch, restore_module, 'restore_single_item', 8)
+    with pytest.raises(Interrupted):
+        restore_archive(make_settings, target, archive_file)
+    monkeypatch.undo()
+    interrupted_writes = get_writes(target)
+
+    journal = restore_archive(make_settings, target, archive_file, **{'--resume': True})
+    assert collections.Counter(journal.values()) == {'created': 21}
+    # Every item was sent exactly once over both runs
+    assert get_writes(target) == get_writes(complete)
+    assert interrupted_writes < get_writes(complete)
+
+
+def test_only_failed_retries_failed_items(archive_file, start_grafana, make_settings):
+    target = start_grafana(dashboards=0, folders=0, datasources=0)
+    # The first dashboard fails, and again when it is retried at the end of the run
+    target.add_faults('POST', '/api/dashboards/db', 503, None, None, None, None, None, None, None, None, None, 503)
+    journal = restore_archive(make_settings, target, archive_file)
+    assert collections.Counter(journal.values()) == {'created': 20, 'failed': 1}
+
+    target.requests.clear()
+    journal = restore_archive(make_settings, target, archive_file, **{'--only-failed': True})
+    assert collections.Counter(journal.values()) == {'created': 21}
+    assert dict((key, count) for (key, count) in target.requests.items() if key[0] != 'GET') == {
+        ('POST', '/api/dashboards/db'): 1}
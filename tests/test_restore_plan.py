@@ -0,0 +1,161 @@
+import json
+import os
+
+import pytest
+
+from conftest import run_quietly
+from grafana_backup import restore_plan
+from grafana_backup.restore import main as restore
+
+
+def get_writes(grafana):
+    # Requests which change the fake Grafana, by (method, path template)
+    return dict((key, count) for (key, count) in grafana.requests.items() if key[0] != 'GET')
+
+
+def make_plan(make_settings, grafana, archive_file, **args):
+    settings = make_settings(grafana)
+    run_quietly(restore, dict({'<archive_file>': archive_file, '--plan': True}, **args), settings)
+    with open(settings['RESTORE_PLAN'], 'r') as f:
+        return json.load(f)
+
+
+def get_plan_counts(plan):
+    counts = {}
+    for item in plan['items'].values():
+        counts[(item['component'], item['action'])] = counts.get((item['component'], item['action']), 0) + 1
+    for item in plan['deletes']:
+        counts[(item['component'], 'delete')] = counts.get((item['component'], 'delete'), 0) + 1
+    return counts
+
+
+@pytest.fixture
+def source(start_grafana, save_archive):
+    # (archive file, grafana) of a saved instance with 20 dashboards in 3 folders and 5 datasources
+    grafana = start_grafana(dashboards=20, folders=3)
+    return (save_archive(grafana, '202001010000'), grafana)
+
+
+def test_plan_of_identical_grafana(source, start_grafana, make_settings):
+    (archive_file, grafana) = source
+    target = start_grafana(dashboards=20, folders=3)
+    plan = make_plan(make_settings, target, archive_file)
+    assert get_plan_counts(plan) == {('folder', 'unchanged'): 3, ('folder_permission', 'restore'): 3,
+                                     ('datasource', 'unchanged'): 5, ('dashboard', 'unchanged'): 20}
+    assert plan['grafana_url'] == target.url
+    assert plan['archive_file'] == os.path.abspath(archive_file)
+    # Planning only reads
+    assert get_writes(target) == {}
+
+    run_quietly(restore, {'<archive_file>': archive_file, '--apply-plan': True}, make_settings(target))
+    assert ('POST', '/api/dashboards/db') not in get_writes(target)
+
+
+def test_plan_of_changed_grafana(source, start_grafana, make_settings):
+    (archive_file, grafana) = source
+    target = start_grafana(dashboards=20, folders=3, seed=7)
+    plan = make_plan(make_settings, target, archive_file)
+    assert get_plan_counts(plan) == {('folder', 'unchanged'): 3, ('folder_permission', 'restore'): 3,
+                                     ('datasource', 'unchanged'): 5, ('dashboard', 'update'): 20}
+
+    run_quietly(restore, {'<archive_file>': archive_file, '--apply-plan': True}, make_settings(target))
+    assert get_writes(target)[('POST', '/api/dashboards/db')] == 20
+
+
+def test_plan_deletes_objects_missing_from_the_archive(source, start_grafana, make_settings):
+    (archive_file, grafana) = source
+    target = start_grafana(dashboards=23, folders=4, datasources=6)
+    plan = make_plan(make_settings, target, archive_file)
+    deletes = sorted((item['component'], item['uid']) for item in plan['deletes'])
+    assert deletes == [('dashboard', 'dashboard20'), ('dashboard', 'dashboard21'), ('dashboard', 'dashboard22'),
+                       ('datasource', 'datasource5'), ('folder', 'folder3')]
+
+    run_quietly(restore, {'<archive_file>': archive_file, '--apply-plan': True}, make_settings(target))
+    writes = get_writes(target)
+    assert writes[('DELETE', '/api/dashboards/uid/{id}')] == 3
+    assert writes[('DELETE', '/api/datasources/uid/{id}')] == 1
+    assert writes[('DELETE', '/api/folders/{id}')] == 1
+
+
+def test_filtered_plan_has_no_deletes(source, start_grafana, make_settings):
+    (archive_file, grafana) = source
+    target = start_grafana(dashboards=23, folders=4, datasources=6)
+    plan = make_plan(make_settings, target, archive_file, **{'--title-glob': 'Dashboard 1*'})
+    assert plan['deletes'] == []
+
+
+def test_apply_plan_refuses_another_grafana(source, start_grafana, make_settings):
+    (archive_file, grafana) = source
+    target = start_grafana(dashboards=20, folders=3)
+    other = start_grafana(dashboards=25, folders=3)
+    make_plan(make_settings, target, archive_file)
+
+    with pytest.raises(SystemExit) as e:
+        run_quietly(restore, {'<archive_file>': archive_file, '--apply-plan': True}, make_settings(other))
+    assert e.value.code == 1
+    assert get_writes(other) == {}
+
+
+def test_apply_plan_refuses_another_archive(source, start_grafana, make_settings):
+    (archive_file, grafana) = source
+    target = start_grafana(dashboards=23, folders=3)
+    make_plan(make_settings, target, archive_file)
+    # An archive of the same name in another directory shares the plan file
+    other_archive_file = os.path.join(os.path.dirname(archive_file), 'other', os.path.basename(archive_file))
+    os.makedirs(os.path.dirname(other_archive_file))
+    os.rename(archive_file, other_archive_file)
+
+    with pytest.raises(SystemExit) as e:
+        run_quietly(restore, {'<archive_file>': other_archive_file, '--apply-plan': True}, make_settings(target))
+    assert e.value.code == 1
+    assert get_writes(target) == {}
+
+
+def test_plan_stops_when_the_live_state_is_incomplete(source, start_grafana, make_settings, monkeypatch):
+    (archive_file, grafana) = source
+    target = start_grafana(dashboards=20, folders=3)
+    search_dashboard = restore_plan.search_dashboard
+    # The second page of the listing fails, a plan made from the first one would delete every dashboard after it
+    monkeypatch.setattr(restore_plan, 'search_dashboard',
+                        lambda page, *args: (500, 'error') if page == 2 else search_dashboard(page, *args))
+    settings = make_settings(target)
+
+    with pytest.raises(SystemExit) as e:
+        run_quietly(restore, {'<archive_file>': archive_file, '--plan': True}, settings)
+    assert e.value.code == 1
+    assert not os.path.exists(settings['RESTORE_PLAN'])
+
+
+def test_skip_unchanged(source, start_grafana, make_settings):
+    (archive_file, grafana) = source
+    same = start_grafana(dashboards=20, folders=3)
+    run_quietly(restore, {'<archive_file>': archive_file, '--skip-unchanged': True}, make_settings(same))
+    assert ('POST', '/api/dashboards/db') not in get_writes(same)
+
+    changed = start_grafana(dashboards=20, folders=3, seed=7)
+    run_quietly(restore, {'<archive_file>': archive_file, '--skip-unchanged': True}, make_settings(changed))
+    assert get_writes(changed)[('POST', '/api/dashboards/db')] == 20
+    assert not any(method == 'DELETE' for (method, path) in get_writes(changed))
+
+
+def test_plan_lists_every_page_of_folders(source, start_grafana, make_settings):
+    (archive_file, grafana) = source
+    # More folders than the 1000 hits a search returns without paging
+    target = start_grafana(dashboards=20, folders=1005)
+    plan = make_plan(make_settings, target, archive_file)
+    assert get_plan_counts(plan)[('folder', 'unchanged')] == 3
+    assert sorted(int(item['uid'][len('folder'):]) for item in plan['deletes']) == list(range(3, 1005))
+
+
+def test_plan_stops_when_a_folder_page_fails(source, start_grafana, make_settings, monkeypatch):
+    (archive_file, grafana) = source
+    target = start_grafana(dashboards=20, folders=4)
+    search_folder_page = restore_plan.search_folder_page
+    monkeypatch.setattr(restore_plan, 'search_folder_page',
+                        lambda page, limit, *args: (500, 'error') if page == 2 else search_folder_page(page, 2, *args))
+    settings = make_settings(target)
+
+    with pytest.raises(SystemExit) as e:
+        run_quietly(restore, {'<archive_file>': archive_file, '--plan': True}, settings)
+    assert e.value.code == 1
+    assert not os.path.exists(settings['RESTORE_PLAN'])
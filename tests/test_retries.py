@@ -0,0 +1,97 @@
+import collections
+import time
+
+import pytest
+
+from conftest import run_quietly
+from fake_grafana import STALL, STALL_SECONDS
+from grafana_backup import dashboardApi
+from grafana_backup.commons import load_restore_journal
+from grafana_backup.compression import open_archive_reader, iter_archive_members
+from grafana_backup.restore import main as restore
+
+# Short backoff and timeout so failing requests cost no time
+RETRY_SETTINGS = {'http_retry_backoff': 0.01, 'http_retry_max_backoff': 0.01, 'http_timeout': 0.5}
+
+
+def get_saved_dashboards(archive_file):
+    with open(archive_file, 'rb') as f:
+        return sorted(name.rsplit('/', 1)[1] for (name, member) in iter_archive_members(open_archive_reader(f))
+                      if name.endswith('.dashboard'))
+
+
+def restore_archive(make_settings, grafana, archive_file, **general):
+    settings = make_settings(grafana, **dict(RETRY_SETTINGS, **general))
+    run_quietly(restore, {'<archive_file>': archive_file}, settings)
+    return collections.Counter(load_restore_journal(settings['RESTORE_JOURNAL']).values())
+
+
+def test_gateway_errors_are_retried(start_grafana, save_archive):
+    grafana = start_grafana(dashboards=5, folders=1)
+    grafana.add_faults('GET', '/api/dashboards/uid/{id}', 503, 502)
+    archive_file = save_archive(grafana, '202001010000', 'dashboard', http_retries=3, **RETRY_SETTINGS)
+    assert len(get_saved_dashboards(archive_file)) == 5
+    assert grafana.requests[('GET', '/api/dashboards/uid/{id}')] == 7
+    assert dashboardApi.request_stats['retries'] == 2
+    assert dashboardApi.request_stats['failed'] == 0
+
+
+def test_stalled_request_times_out_and_is_retried(start_grafana, save_archive):
+    grafana = start_grafana(dashboards=5, folders=1)
+    grafana.add_faults('GET', '/api/dashboards/uid/{id}', STALL)
+    start = time.time()
+    archive_file = save_archive(grafana, '202001010000', 'dashboard', http_retries=3, **RETRY_SETTINGS)
+    assert time.time() - start < STALL_SECONDS
+    assert len(get_saved_dashboards(archive_file)) == 5
+    assert dashboardApi.request_stats['retries'] == 1
+
+
+def test_request_without_response_is_deferred(start_grafana, save_archive):
+    grafana = start_grafana(dashboards=5, folders=1)
+    grafana.add_faults('GET', '/api/dashboards/uid/{id}', STALL)
+    archive_file = save_archive(grafana, '202001010000', 'dashboard', http_retries=0, **RETRY_SETTINGS)
+    # The dashboard is fetched again at the end of the run
+    assert len(get_saved_dashboards(archive_file)) == 5
+    assert grafana.requests[('GET', '/api/dashboards/uid/{id}')] == 6
+
+
+def test_request_without_response_fails_the_item(start_grafana, save_archive):
+    grafana = start_grafana(dashboards=5, folders=1)
+    # The first dashboard gets no response, and again when it is fetched at the end of the run
+    grafana.add_faults('GET', '/api/dashboards/uid/{id}', STALL, None, None, None, None, STALL)
+    archive_file = save_archive(grafana, '202001010000', 'dashboard', http_retries=0, **RETRY_SETTINGS)
+    # The run goes on with the other dashboards
+    assert get_saved_dashboards(archive_file) == ['dashboard{0}.dashboard'.format(number) for number in range(1, 5)]
+    assert dashboardApi.request_stats['failed'] == 2
+
+
+def test_connection_error_returns_no_response_status():
+    dashboardApi.configure_retries({'HTTP_RETRIES': 1, 'HTTP_RETRY_BACKOFF': 0.01, 'HTTP_TIMEOUT': 0.5})
+    (response, output) = run_quietly(dashboardApi.send_grafana_request, 'GET', 'http://127.0.0.1:1/api/health', True)
+    assert response.status_code == dashboardApi.NO_RESPONSE_STATUS
+    assert 'retrying (1/1)' in output
+
+
+@pytest.fixture
+def archive_file(start_grafana, save_archive):
+    return save_archive(start_grafana(dashboards=10, folders=3), '202001010000')
+
+
+def test_idempotent_item_is_deferred_and_restored(archive_file, start_grafana, make_settings):
+    target = start_grafana(dashboards=0, folders=0, datasources=0)
+    # Dashboards are posted with overwrite, the failed one is sent again at the end of the run
+    target.add_faults('POST', '/api/dashboards/db', 503)
+    statuses = restore_archive(make_settings, target, archive_file, http_retries=0)
+    assert target.requests[('POST', '/api/dashboards/db')] == 11
+    assert target.created['dashboard'] == 10
+    assert statuses['failed'] == 0
+
+
+def test_non_idempotent_item_is_not_sent_again(archive_file, start_grafana, make_settings):
+    target = start_grafana(dashboards=0, folders=0, datasources=0)
+    # A folder create which got a gateway error may have been applied, it is neither retried nor deferred
+    target.add_faults('POST', '/api/folders', 502)
+    statuses = restore_archive(make_settings, target, archive_file, http_retries=3)
+    assert target.requests[('POST', '/api/folders')] == 3
+    assert target.created['folder'] == 2
+    assert statuses['failed'] == 1
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from conftest import run_quietly, interrupt_after, Interrupted
+from grafana_backup import save_dashboards
+from grafana_backup.archive import get_archive_file
+from grafana_backup.commons import CHECKPOINT_FILE
+from grafana_backup.compression import open_archive_reader, iter_archive_members
+from grafana_backup.save import main as save
+
+TIMESTAMP = '202001010000'
+
+
+def get_archived_objects(archive_file):
+    with open(archive_file, 'rb') as f:
+        return sorted(os.path.basename(name) for (name, member) in iter_archive_members(open_archive_reader(f))
+                      if name.endswith(('.dashboard', '.folder')))
+
+
+def save_interrupted(monkeypatch, settings, count):
+    # A save which stops after writing count dashboards
+    interrupt_after(monkeypatch, save_dashboards, 'save_dashboard_setting', count)
+    with pytest.raises(Interrupted):
+        run_quietly(save, {'--components': 'folder,dashboard', '--no-archive': True}, settings)
+    monkeypatch.undo()
+
+
+def test_resume_fetches_only_missing_objects(start_grafana, make_settings, monkeypatch):
+    grafana = start_grafana(dashboards=10, folders=3)
+    settings = make_settings(grafana)
+    settings['TIMESTAMP'] = TIMESTAMP
+    save_interrupted(monkeypatch, settings, 5)
+    assert grafana.requests[('GET', '/api/dashboards/uid/{id}')] == 6
+    assert grafana.requests[('GET', '/api/folders/{id}')] == 3
+
+    grafana.requests.clear()
+    run_quietly(save, {'--components': 'folder,dashboard', '--resume': True, '<timestamp>': TIMESTAMP}, make_settings(grafana))
+    # The folders and the first five dashboards are in the checkpoint journals
+    assert grafana.requests[('GET', '/api/dashboards/uid/{id}')] == 5
+    assert ('GET', '/api/folders/{id}') not in grafana.requests
+    expected = ['dashboard{0}.dashboard'.format(number) for number in range(10)]
+    expected += ['folder{0}.folder'.format(number) for number in range(3)]
+    assert get_archived_objects(get_archive_file(settings)) == sorted(expected)
+
+
+def test_resume_keeps_the_log_of_the_interrupted_run(start_grafana, make_settings, monkeypatch):
+    grafana = start_grafana(dashboards=10, folders=3)
+    settings = make_settings(grafana)
+    settings['TIMESTAMP'] = TIMESTAMP
+    save_interrupted(monkeypatch, settings, 5)
+    run_quietly(save, {'--components': 'folder,dashboard', '--resume': True, '<timestamp>': TIMESTAMP,
+                       '--no-archive': True}, make_settings(grafana))
+
+    folder_path = '{0}/dashboards/{1}'.format(settings['BACKUP_DIR'], TIMESTAMP)
+    with open('{0}/dashboards_{1}.txt'.format(folder_path, TIMESTAMP), 'r') as f:
+        logged = [line.split('\t')[0] for line in f]
+    assert sorted(logged) == sorted('uid/dashboard{0}'.format(number) for number in range(10))
+    with open(os.path.join(folder_path, CHECKPOINT_FILE), 'r') as f:
+        assert len(f.read().splitlines()) == 10
+
+
+def test_save_without_resume_starts_over(start_grafana, make_settings, monkeypatch):
+    grafana = start_grafana(dashboards=10, folders=3)
+    settings = make_settings(grafana)
+    settings['TIMESTAMP'] = TIMESTAMP
+    save_interrupted(monkeypatch, settings, 5)
+
+    grafana.requests.clear()
+    settings = make_settings(grafana)
+    settings['TIMESTAMP'] = TIMESTAMP
+    run_quietly(save, {'--components': 'folder,dashboard'}, settings)
+    assert grafana.requests[('GET', '/api/dashboards/uid/{id}')] == 10
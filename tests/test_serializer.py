@@ -0,0 +1,73 @@
+import json
+import random
+
+import pytest
+
+from grafana_backup import serializer
+
+# Values the fast backends format or reject differently than the stdlib
+SPECIAL_VALUES = [None, True, False, 0, -1, 12.0, 1e16, 1e-05, 0.00001, 123456789.123, 2 ** 63, 2 ** 70, -2 ** 70,
+                  float('nan'), float('inf'), -float('inf'), '', 'a, b: c', 'é x\U0001f600', '\x7f/\\"', '\t\n']
+
+
+def get_installed_backends():
+    backends = []
+    for name in serializer.JSON_BACKENDS:
+        try:
+            __import__(name)
+        except ImportError:
+            continue
+        backends.append(name)
+    return backends
+
+
+def get_random_value(rand, depth=0):
+    choice = rand.random()
+    if depth > 4 or choice < 0.3:
+        return rand.choice(SPECIAL_VALUES + [rand.randint(-10 ** 6, 10 ** 6), rand.random() * 10 ** rand.randint(-8, 20)])
+    if choice < 0.65:
+        return [get_random_value(rand, depth + 1) for _ in range(rand.randint(0, 4))]
+    return dict((str(rand.randint(0, 50)) + rand.choice(['', 'ü', ' x']), get_random_value(rand, depth + 1))
+                for _ in range(rand.randint(0, 4)))
+
+
+@pytest.fixture(params=get_installed_backends())
+def json_backend(request):
+    serializer.set_json_backend(request.param)
+    yield request.param
+    serializer.set_json_backend('json')
+
+
+@pytest.mark.parametrize('pretty_print', [True, False])
+def test_dumps_json_is_identical_to_stdlib(json_backend, pretty_print):
+    for seed in range(2000):
+        data = get_random_value(random.Random(seed))
+        if pretty_print:
+            expected = json.dumps(data, sort_keys=True, indent=4, separators=(',', ': '))
+        else:
+            expected = json.dumps(data)
+        assert serializer.dumps_json(data, pretty_print) == expected, 'seed {0}'.format(seed)
+
+
+@pytest.mark.parametrize('value', SPECIAL_VALUES)
+def test_dumps_json_special_values(json_backend, value):
+    data = {'panels': [{'value': value, 'nested': {'list': [value, 1]}}]}
+    assert serializer.dumps_json(data, True) == json.dumps(data, sort_keys=True, indent=4, separators=(',', ': '))
+    assert serializer.dumps_json(data) == json.dumps(data)
+
+
+def test_dumps_json_non_string_keys(json_backend):
+    data = {1: 'a', 2.5: 'b', None: 'c'}
+    assert serializer.dumps_json(data) == json.dumps(data)
+
+
+def test_loads_json_round_trip(json_backend):
+    for seed in range(500):
+        data = get_random_value(random.Random(seed))
+        content = serializer.dumps_json(data, True)
+        assert serializer.dumps_json(serializer.loads_json(content), True) == content
+
+
+def test_set_json_backend_unknown():
+    with pytest.raises(Exception, match='unknown json backend'):
+        serializer.set_json_backend('simplejson')
@@ -0,0 +1,57 @@
+import pytest
+
+from conftest import run_quietly, rewrite_archive, without_index
+from grafana_backup import verify
+
+
+def verify_archive(archive_file):
+    return run_quietly(verify.main, {'<archive_file>': archive_file}, {})
+
+
+@pytest.fixture
+def archive_file(start_grafana, save_archive):
+    return save_archive(start_grafana(dashboards=20, folders=3), '202001010000')
+
+
+@pytest.mark.parametrize('codec', ['gzip', 'zip', 'none'])
+def test_verify_archive(start_grafana, save_archive, codec):
+    archive_file = save_archive(start_grafana(dashboards=20, folders=3), '202001010000', archive_codec=codec)
+    (verified, output) = verify_archive(archive_file)
+    assert verified is True, output
+    assert '31 objects in the archive index, 31 members checked' in output
+
+
+def test_verify_changed_member(archive_file):
+    def change_dashboard(name, content):
+        if name.endswith('dashboard0.dashboard'):
+            return content.replace(b'Dashboard', b'Board')
+        return content
+
+    rewrite_archive(archive_file, change_dashboard)
+    (verified, output) = verify_archive(archive_file)
+    assert verified is False
+    assert 'mismatched: 1' in output
+
+
+def test_verify_missing_member(archive_file):
+    rewrite_archive(archive_file, lambda name, content: None if name.endswith('.datasource') else content)
+    (verified, output) = verify_archive(archive_file)
+    assert verified is False
+    assert 'missing: 5' in output
+
+
+def test_verify_truncated_archive(archive_file):
+    with open(archive_file, 'rb') as f:
+        content = f.read()
+    with open(archive_file, 'wb') as f:
+        f.write(content[:len(content) // 2])
+    (verified, output) = verify_archive(archive_file)
+    assert verified is False
+    assert 'is corrupt' in output
+
+
+def test_verify_archive_without_index(archive_file):
+    rewrite_archive(archive_file, without_index)
+    (verified, output) = verify_archive(archive_file)
+    assert verified is False
+    assert 'has no archive index' in output